@@ -0,0 +1,64 @@
+"""
+Async Runner
+One long-lived event loop per process on a background thread. The sync API
+(Streamlit, CLI) submits coroutines to it, so pooled async clients stay bound
+to a single loop and keep their connections between calls.
+"""
+import asyncio
+import queue
+import threading
+
+_lock = threading.Lock()
+_loop = None
+_thread = None
+
+
+def get_loop():
+    """Return the background event loop, starting it on first use"""
+    global _loop, _thread
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            _thread = threading.Thread(target=_loop.run_forever, name="async-runner", daemon=True)
+            _thread.start()
+    return _loop
+
+
+def run_sync(coro):
+    """Run a coroutine on the background loop and block until it finishes"""
+    if threading.current_thread() is _thread:
+        coro.close()
+        raise RuntimeError("run_sync() called from the async runner thread, await the coroutine instead")
+    return asyncio.run_coroutine_threadsafe(coro, get_loop()).result()
+
+
+def run_sync_with_events(make_coro, on_event):
+    """
+    Like run_sync, but forwards events to the calling thread
+
+    Args:
+        make_coro: Function taking an emit(*event) callback and returning the coroutine
+        on_event: Callback invoked with each event on the calling thread,
+                  e.g. to update Streamlit widgets that must not be touched
+                  from other threads
+
+    Returns:
+        The coroutine's result
+    """
+    events = queue.Queue()
+    done = object()
+
+    future = asyncio.run_coroutine_threadsafe(make_coro(lambda *event: events.put(event)), get_loop())
+    future.add_done_callback(lambda _: events.put(done))
+
+    try:
+        while True:
+            event = events.get()
+            if event is done:
+                break
+            on_event(*event)
+    except BaseException:
+        # Caller gave up (error in the callback, Streamlit stopped the script)
+        future.cancel()
+        raise
+    return future.result()
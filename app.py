@@ -1,14 +1,18 @@
 import streamlit as st
 import main
-import anthropic
-import os
 from generator import get_seo_keywords_for_topic
 from image_generator import generate_image_prompt, generate_article_image_realistic, generate_article_image_iconic
 from pdf_generator import generate_pdf, generate_html
-from pick_strongest_model import pick_strongest_model
+import model_registry
+import model_routing
+import llm
+from clients import get_http_session
+from edits import format_change
+from response_cache import get_cache
+from semrush_cache import get_semrush_cache
+from keyword_store import get_keyword_store
 from dotenv import load_dotenv
 load_dotenv() 
-claude_client = anthropic.Anthropic(api_key=os.getenv("CLAUDE_API_KEY"))
 # =======================
 # SIMPLE PASSWORD GATE
 # =======================
@@ -68,12 +72,15 @@ def process_reference_info(ref_info_source, topic):
 # ============================================================================
 # ARTICLE GENERATION PIPELINE
 # ============================================================================
-def generate_complete_article(topic, target_length=None):
-    """Generate complete article with debug output"""
+def generate_complete_article(topic, target_length=None, parallel_sections=False, profile=None,
+                              resume_run_id=None):
+    """Generate complete article with debug output (or continue a checkpointed run)"""
     
     # Initialize progress tracking
     progress = st.progress(0)
     status = st.empty()
+    live_output = st.empty()
+    live_streams = {}
     log_container = st.container()
     
     # Setup logging container
@@ -93,143 +100,173 @@ def generate_complete_article(topic, target_length=None):
     add_log("🚀 Starte Artikel-Generierung...")
     add_log(f" Content-Thema: '{topic}'")
     
-    # ------------------------------------------------------------------------
-    # STEP 1: OUTLINE (Use edited outline or generate new)
-    # ------------------------------------------------------------------------
+    # Use edited outline and selected keywords from the UI, the scheduler skips those stages
+    edited_outline = st.session_state.get('edited_outline')
+    keywords_available = 'seo_keywords' in st.session_state and st.session_state.seo_keywords
+    keywords = st.session_state.seo_keywords if keywords_available else []
     
-    # Check if we have an edited outline from the UI
-    if 'edited_outline' in st.session_state and st.session_state.edited_outline:
-        status.text("Schritt 1/5: Verwende bearbeitete Gliederung...")
-        progress.progress(0.12)
-        add_log("✅ Verwende bearbeitete Gliederung aus Editor")
-        outline = st.session_state.edited_outline
-        st.session_state.outline = outline
-        
-        with st.expander(" Verwendete Gliederung"):
-            st.markdown(outline)
-        
-        add_log(f" Gliederung hat {len(outline.split('#'))} Hauptabschnitte")
-        progress.progress(0.24)
-    else:
-        # Generate new outline if not already edited
-        status.text("Schritt 1/5: Erstelle Gliederung...")
-        progress.progress(0.12)
-        
-        try:
-            add_log("⏳ Generiere Gliederung...")
-            outline = main.generate_outline(topic)
-            st.session_state.outline = outline
-            add_log("✅ Gliederung erfolgreich erstellt")
-            
-            with st.expander(" Zeige Gliederungs-Output"):
-                st.markdown(outline)
-            
-            add_log(f" Gliederung hat {len(outline.split('#'))} Hauptabschnitte")
-            progress.progress(0.24)
-        except Exception as e:
-            add_log(f"❌ Fehler bei Gliederungserstellung: {str(e)}")
-            st.error(f"Fehler: {str(e)}")
-            return
+    step_status = {
+        "outline": "Schritt 1/5: Erstelle Gliederung...",
+        "draft": "Schritt 2/5: Generiere kompletten Artikel...",
+        "legal_review": "Schritt 3/5: Prüfe und korrigiere rechtliche Fehler...",
+        "seo": "Schritt 4/5: Integriere SEO-Keywords...",
+        "humanized": "Schritt 5/5: Humanisiere Text...",
+        "seo_humanized": "Schritt 4/4: Integriere SEO-Keywords und humanisiere Text...",
+        "pipelined": "Schritt 2/3: Entwurf, Prüfung und Humanisierung laufen abschnittsweise...",
+    }
+    step_progress = {"outline": 0.24, "draft": 0.40, "verified": 0.56, "seo": 0.72, "humanized": 1.0,
+                     "seo_humanized": 1.0, "pipelined": 0.64}
     
-    try:
-        
-        # ------------------------------------------------------------------------
-        # STEP 2: CONTENT GENERATION
-        # ------------------------------------------------------------------------
-        status.text("Schritt 2/5: Generiere kompletten Artikel...")
-        add_log("⏳ Generiere vollständigen Artikel-Inhalt...")
-
-        if main.reference_information:
-            add_log(" Nutze zusätzliche Referenz-Informationen")
-
-        complete_content = main.generate_complete_content(topic, outline, target_length)
-        st.session_state.complete_article = complete_content
-        
-        word_count = len(complete_content.split())
-        char_count = len(complete_content)
-        add_log(f"✅ Original-Artikel generiert: {word_count:,} Wörter, {char_count:,} Zeichen")
+    def on_stage_event(stage, event, result):
+        """Render scheduler events (called on the script thread)"""
+        if event == "progress":
+            # Show the text of the running stage while it is written (parallel streams side by side in order)
+            streams = live_streams.setdefault(stage, {})
+            streams[result["stream"]] = result["text"]
+            status.text(f"{step_status.get(stage, stage)} {main.format_progress(result)}")
+            with live_output.container():
+                st.caption(f"✍️ Live-Ausgabe: {stage}")
+                st.markdown("\n\n".join(streams[stream] for stream in sorted(streams)))
+            return
         
-        with st.expander("📄 Zeige Content-Output (erste 1000 Zeichen)"):
-            st.markdown(complete_content[:1000] + "...")
+        if event == "done" and live_streams.pop(stage, None) is not None and not live_streams:
+            live_output.empty()
         
-        progress.progress(0.40)
+        if event == "restored":
+            add_log(f"♻️ {stage}: aus Checkpoint übernommen")
         
-        # ------------------------------------------------------------------------
-        # STEP 3: LEGAL VERIFICATION
-        # ------------------------------------------------------------------------
-        status.text("Schritt 3/5: Prüfe und korrigiere rechtliche Fehler...")
-        add_log("⏳ Starte rechtliche Prüfung und Korrektur...")
+        if event == "projection":
+            add_log("📊 Token-Prognose:")
+            for line in main.format_projection(result):
+                add_log(f" • {line}")
+            return
         
-        corrected_content = main.verify_and_fix_legal_content(complete_content, topic)
-        st.session_state.corrected_article = corrected_content
+        if event == "start":
+            if stage in step_status:
+                status.text(step_status[stage])
+            if stage == "outline":
+                progress.progress(0.12)
+                add_log("⏳ Generiere Gliederung...")
+            elif stage == "draft":
+                add_log("⏳ Generiere vollständigen Artikel-Inhalt...")
+                if main.reference_information:
+                    add_log(" Nutze zusätzliche Referenz-Informationen")
+            elif stage == "legal_review":
+                add_log("⏳ Starte rechtliche Prüfung und Korrektur...")
+            elif stage == "seo":
+                add_log(f"🔍 Keywords verfügbar: {'Ja' if keywords_available else 'Nein'}")
+                if keywords_available:
+                    add_log(f" Anzahl Keywords: {len(keywords)}")
+                    add_log("⏳ Starte SEO-Integration...")
+                else:
+                    add_log("ℹ️ Keine SEO-Keywords - verwende korrigierte Version")
+            elif stage == "humanized":
+                add_log("⏳ Starte Humanisierung des Textes...")
+            elif stage == "seo_humanized":
+                add_log("⏳ Starte SEO-Integration und Humanisierung in einem Durchgang...")
+            elif stage == "pipelined":
+                add_log("⏳ Starte Pipeline: fertige Abschnitte werden geprüft und humanisiert, "
+                        "während der Entwurf noch läuft...")
+            return
         
-        corrected_words = len(corrected_content.split())
-        corrected_chars = len(corrected_content)
-        add_log(f"✅ Rechtliche Prüfung abgeschlossen")
-        add_log(f" Korrigierte Version: {corrected_words:,} Wörter, {corrected_chars:,} Zeichen")
+        if event == "skipped":
+            if stage == "outline":
+                status.text("Schritt 1/5: Verwende bearbeitete Gliederung...")
+                add_log("✅ Verwende bearbeitete Gliederung aus Editor")
+                st.session_state.outline = result
+                with st.expander(" Verwendete Gliederung"):
+                    st.markdown(result)
+                add_log(f" Gliederung hat {len(result.split('#'))} Hauptabschnitte")
+                progress.progress(step_progress["outline"])
+            return
         
-        if complete_content == corrected_content:
-            add_log("ℹ️ Keine rechtlichen Fehler gefunden")
+        if stage == "outline":
+            st.session_state.outline = result
+            add_log("✅ Gliederung erfolgreich erstellt")
+            with st.expander(" Zeige Gliederungs-Output"):
+                st.markdown(result)
+            add_log(f" Gliederung hat {len(result.split('#'))} Hauptabschnitte")
+        
+        elif stage == "draft":
+            st.session_state.complete_article = result
+            add_log(f"✅ Original-Artikel generiert: {len(result.split()):,} Wörter, {len(result):,} Zeichen")
+            with st.expander("📄 Zeige Content-Output (erste 1000 Zeichen)"):
+                st.markdown(result[:1000] + "...")
+        
+        elif stage == "legal_review":
+            add_log(f"✅ Rechtliche Prüfung abgeschlossen")
+            if not result:
+                add_log("ℹ️ Keine rechtlichen Fehler gefunden")
+            else:
+                add_log(f"✏️ {len(result)} Korrekturen vorgenommen:")
+                for change in result:
+                    add_log(f" • {format_change(change)}")
+        
+        elif stage == "verified":
+            st.session_state.corrected_article = result
+            add_log(f" Korrigierte Version: {len(result.split()):,} Wörter, {len(result):,} Zeichen")
+        
+        elif stage == "seo":
+            st.session_state.seo_optimized_article = result
+            if keywords_available:
+                add_log(f"✅ SEO-Integration abgeschlossen")
+                add_log(f" SEO-Version: {len(result.split()):,} Wörter, {len(result):,} Zeichen")
+                with st.expander(" Zeige kompletten SEO-Output", expanded=True):
+                    st.markdown(result)
+        
+        elif stage == "humanized":
+            st.session_state.humanized_article = result
+            add_log(f"✅ Humanisierung abgeschlossen")
+            add_log(f" Finale Version: {len(result.split()):,} Wörter, {len(result):,} Zeichen")
+            with st.expander("👨🏼 Zeige Humanisierungs-Output", expanded=True):
+                st.markdown(result)
+        
+        elif stage == "seo_humanized":
+            st.session_state.seo_optimized_article = result
+            st.session_state.humanized_article = result
+            add_log(f"✅ SEO-Integration und Humanisierung abgeschlossen")
+            add_log(f" Finale Version: {len(result.split()):,} Wörter, {len(result):,} Zeichen")
+            with st.expander("👨🏼 Zeige finalen Output", expanded=True):
+                st.markdown(result)
+        
+        elif stage == "pipelined":
+            # Verified and humanized text, the "Original" tab keeps showing only real drafts
+            st.session_state.humanized_article = result
+            add_log(f"✅ Pipeline abgeschlossen (Entwurf, Prüfung und Humanisierung)")
+            add_log(f" Finale Version: {len(result.split()):,} Wörter, {len(result):,} Zeichen")
+            with st.expander("👨🏼 Zeige finalen Output", expanded=True):
+                st.markdown(result)
+        
+        if stage in step_progress:
+            progress.progress(step_progress[stage])
+    
+    try:
+        if resume_run_id:
+            add_log(f"♻️ Setze Lauf {resume_run_id} fort")
+            values = main.resume_article_sync(resume_run_id, on_event=on_stage_event)
         else:
-            char_diff = corrected_chars - char_count
-            add_log(f"✏️ Änderungen vorgenommen: {char_diff:+,} Zeichen")
-        
-        progress.progress(0.56)
-        
-        # Check if keywords are available
-        keywords_available = 'seo_keywords' in st.session_state and st.session_state.seo_keywords
-        add_log(f"🔍 Keywords verfügbar: {'Ja' if keywords_available else 'Nein'}")
-        
-        if keywords_available:
-            add_log(f" Anzahl Keywords: {len(st.session_state.seo_keywords)}")
-        
-        # ------------------------------------------------------------------------
-        # STEP 4: SEO INTEGRATION
-        # ------------------------------------------------------------------------
-        status.text("Schritt 4/5: Integriere SEO-Keywords...")
-        
-        if keywords_available:
-            add_log("⏳ Starte SEO-Integration...")
-            seo_optimized_content = main.rework_complete_content(
-                corrected_content,
-                topic, 
-                st.session_state.seo_keywords
+            run_id = main.new_run_id(topic)
+            st.session_state.last_run_id = run_id
+            add_log(f" Lauf-ID: {run_id}")
+            values = main.generate_article_sync(
+                topic,
+                target_length=target_length,
+                outline=edited_outline or None,
+                keywords=keywords,
+                parallel_sections=parallel_sections,
+                profile=profile,
+                run_id=run_id,
+                on_event=on_stage_event,
             )
-            st.session_state.seo_optimized_article = seo_optimized_content
-            
-            seo_length = len(seo_optimized_content)
-            seo_words = len(seo_optimized_content.split())
-            
-            add_log(f"✅ SEO-Integration abgeschlossen")
-            add_log(f" SEO-Version: {seo_words:,} Wörter, {seo_length:,} Zeichen")
-            
-            with st.expander(" Zeige kompletten SEO-Output", expanded=True):
-                st.markdown(seo_optimized_content)
-        else:
-            add_log("ℹ️ Keine SEO-Keywords - verwende korrigierte Version")
-            seo_optimized_content = corrected_content
-            st.session_state.seo_optimized_article = seo_optimized_content
-        
-        progress.progress(0.72)
-        
-        # ------------------------------------------------------------------------
-        # STEP 5: HUMANIZATION
-        # ------------------------------------------------------------------------
-        status.text("Schritt 5/5: Humanisiere Text...")
-        add_log("⏳ Starte Humanisierung des Textes...")
-        
-        humanized_content = main.humanize_content(seo_optimized_content, topic)
-        st.session_state.humanized_article = humanized_content
-        
-        humanized_words = len(humanized_content.split())
-        humanized_chars = len(humanized_content)
-        add_log(f"✅ Humanisierung abgeschlossen")
-        add_log(f" Finale Version: {humanized_words:,} Wörter, {humanized_chars:,} Zeichen")
-        
-        with st.expander("👨🏼 Zeige Humanisierungs-Output", expanded=True):
-            st.markdown(humanized_content)
-        
+        # Profiles without humanization end earlier, show their last text as the final article
+        st.session_state.humanized_article = values["article"]
+        for stage, reasons in values["degraded"].items():
+            add_log(f"⚠️ {stage} unvollständig: {'; '.join(reasons)}")
+        if values["degraded"]:
+            st.warning("⚠️ Teile des Artikels wurden nicht geprüft - 'Lauf fortsetzen' wiederholt die Prüfung")
+        live_output.empty()
         progress.progress(1.0)
+        
         status.text("✅ Artikel erfolgreich erstellt!")
         add_log("🎉 Generierung erfolgreich abgeschlossen!")
         
@@ -237,6 +274,7 @@ def generate_complete_article(topic, target_length=None):
         
     except Exception as e:
         add_log(f"❌ Fehler aufgetreten: {str(e)}")
+        add_log("💾 Fertige Schritte sind gespeichert - 'Lauf fortsetzen' macht beim fehlenden Schritt weiter")
         st.error(f"Fehler bei der Artikelerstellung: {e}")
         status.text("❌ Fehler bei der Generierung")
 
@@ -393,6 +431,33 @@ def sidebar_info():
         st.sidebar.write(f"Zeichen: {len(st.session_state.humanized_article):,}")
         st.sidebar.write("👨🏼 Humanisiert")
     
+    # Response cache statistics (this server process)
+    cache_stats = get_cache().stats()
+    if cache_stats["hits"] or cache_stats["misses"]:
+        st.sidebar.subheader("💾 Antwort-Cache")
+        st.sidebar.write(f"Treffer: {cache_stats['hits']} • Neu angefragt: {cache_stats['misses']}")
+        if st.sidebar.button("Cache leeren"):
+            get_cache().clear()
+            st.sidebar.write("✅ Cache geleert")
+    
+    # SEMrush responses and API units (units are shared by all processes)
+    semrush_stats = get_semrush_cache().stats()
+    if semrush_stats["hits"] or semrush_stats["misses"]:
+        st.sidebar.subheader("🔎 SEMrush-Cache")
+        budget = f" / {semrush_stats['daily_units']:,}" if semrush_stats["daily_units"] else ""
+        st.sidebar.write(f"Treffer: {semrush_stats['hits']} • Neu angefragt: {semrush_stats['misses']}")
+        st.sidebar.write(f"Einheiten heute: {semrush_stats['units_today']:,}{budget}")
+        store_stats = get_keyword_store().stats()
+        st.sidebar.write(f"Keyword-Speicher: {store_stats['keywords']:,} Keywords aus {store_stats['topics']} Themen")
+    
+    # Anthropic prompt cache: share of prompt tokens read from the cached system prefix
+    usage = llm.usage_stats()
+    if usage:
+        st.sidebar.subheader("⚡ Prompt-Cache")
+        for stage, stats in usage.items():
+            st.sidebar.write(f"{stage}: {stats['cache_read_share']:.0%} aus Cache "
+                             f"({stats['cache_read_input_tokens']:,} Tokens)")
+    
     # Reset button
     if st.sidebar.button("🔄 Neu starten"):
         for key in list(st.session_state.keys()):
@@ -404,6 +469,9 @@ def sidebar_info():
 # MAIN APPLICATION
 # ============================================================================
 def main_app():
+    # Model chosen in Agent Settings, used by every stage routed to the selected model (see model_routing)
+    model_routing.selected_model.set(st.session_state.get('confirmed_model'))
+    
     st.title(" Legal SEO Content Generator")
     
     tab1, tab2, tab3 = st.tabs(["📝 Artikel Generator", "🖼️ Bild Generator", "🤖 Agent Settings"])
@@ -559,12 +627,27 @@ def main_app():
                         help="Anzahl der Wörter, die der Artikel ungefähr haben soll."
                     )
 
-            # Save to session state for use later
-            if article_length == "custom" and custom_length:
-                st.session_state.article_length = (max(100, custom_length - 500), min(10000, custom_length + 500))
+            # Save to session state for use later (custom lengths as a word count)
+            if article_length == "custom":
+                st.session_state.article_length = int(custom_length) if custom_length else None
             else:
                 st.session_state.article_length = article_length
 
+        # Optional section-parallel drafting
+        parallel_sections = st.checkbox(
+            "Abschnitte parallel schreiben",
+            help="Jeder Hauptabschnitt der Gliederung wird gleichzeitig geschrieben - deutlich schneller bei langen Artikeln",
+            key="parallel_sections"
+        )
+
+        # Pipeline profile (which stages run, see profiles.json)
+        profile = st.selectbox(
+            "Pipeline-Profil",
+            options=main.profile_names(),
+            index=main.profile_names().index(main.DEFAULT_PROFILE),
+            format_func=lambda name: f"{name} - {main.get_profile(name)['description']}",
+            key="pipeline_profile"
+        )
 
         # --------------------------------------------------------------------
         # OUTLINE GENERATION AND EDITING
@@ -583,9 +666,30 @@ def main_app():
         if st.button("✅ SEO-optimierten Artikel generieren", type="primary", use_container_width=True, disabled=not outline_exists):
             generate_complete_article(
                 topic, 
-                article_length if use_length_control else None,
+                st.session_state.article_length if use_length_control else None,
+                parallel_sections=parallel_sections,
+                profile=profile,
             )
         
+        # Resume a run that failed or whose session was closed (checkpoints are on disk)
+        unfinished_runs = {run["run_id"]: run for run in main.list_runs(unfinished_only=True, limit=10)}
+        if unfinished_runs:
+            with st.expander("♻️ Unterbrochene Läufe fortsetzen"):
+                resume_run_id = st.selectbox(
+                    "Lauf wählen:",
+                    options=list(unfinished_runs),
+                    format_func=lambda run_id: (
+                        f"{unfinished_runs[run_id]['params']['topic']} ({run_id}) - "
+                        f"fertig: {', '.join(unfinished_runs[run_id]['stages']) or '-'}"
+                    ),
+                    key="resume_run_id"
+                )
+                if st.button("▶️ Lauf fortsetzen", use_container_width=True):
+                    generate_complete_article(
+                        unfinished_runs[resume_run_id]["params"]["topic"],
+                        resume_run_id=resume_run_id,
+                    )
+        
         st.divider()
         
         # Display and allow editing of outline (only if generated)
@@ -622,15 +726,19 @@ def main_app():
             with col2:
                 if st.button("🔄 Tiefer humanisieren", use_container_width=True):
                     with st.spinner("Führe tiefere Humanisierung durch..."):
-                        deep_humanized = main.humanize_content(
-                            st.session_state.humanized_article,
-                            st.session_state.topic,
-                            deep_mode=True
-                        )
-                        st.session_state.humanized_article = deep_humanized
-                        st.session_state.deep_humanized = True
-                        st.success("✅ Tiefere Humanisierung abgeschlossen!")
-                        st.rerun()
+                        try:
+                            deep_humanized = main.humanize_content(
+                                st.session_state.humanized_article,
+                                st.session_state.topic,
+                                deep_mode=True
+                            )
+                        except Exception as e:
+                            st.error(f"❌ Tiefere Humanisierung fehlgeschlagen: {e}")
+                        else:
+                            st.session_state.humanized_article = deep_humanized
+                            st.session_state.deep_humanized = True
+                            st.success("✅ Tiefere Humanisierung abgeschlossen!")
+                            st.rerun()
     # ========================================================================
     # TAB 2: IMAGE GENERATOR
     # ========================================================================
@@ -767,9 +875,8 @@ def main_app():
             
             
             with col2:
-                import requests
                 try:
-                    response = requests.get(st.session_state.standalone_image_url)
+                    response = get_http_session().get(st.session_state.standalone_image_url, timeout=30)
                     st.download_button(
                         label="💾 Bild herunterladen",
                         data=response.content,
@@ -793,7 +900,7 @@ def main_app():
         st.success("✅ **Aktuell verwendetes Modell:**")
         try:
             if not hasattr(st.session_state, 'displayed_auto_model'):
-                auto_model = pick_strongest_model(claude_client)
+                auto_model = model_registry.strongest_model()
                 st.session_state.displayed_auto_model = auto_model
             
             current_model = st.session_state.get('confirmed_model', st.session_state.get('displayed_auto_model'))
@@ -894,40 +1001,7 @@ def main_app():
         if confirm_button:
             with st.spinner(f"Suche neuestes {model_family.capitalize()}-Modell..."):
                 try:
-                    # Import temporarily to get specific family
-                    import re
-                    
-                    def pick_strongest_in_family(client, family):
-                        """Pick strongest model from specific family"""
-                        try:
-                            raw = client.models.list()
-                        except Exception as e:
-                            raise RuntimeError(f"Failed to fetch models: {e}")
-                        
-                        ids = []
-                        for item in raw:
-                            mid = getattr(item, "id", None) or (item.get("id") if isinstance(item, dict) else item)
-                            if isinstance(mid, str):
-                                ids.append(mid)
-                        
-                        if not ids:
-                            raise RuntimeError("No models returned by API.")
-                        
-                        # Filter for selected family
-                        family_models = [m for m in ids if family.lower() in m.lower()]
-                        
-                        if not family_models:
-                            raise RuntimeError(f"No {family} models available.")
-                        
-                        def extract_date(model_id: str) -> int:
-                            m = re.search(r'(\d{8})', model_id)
-                            return int(m.group(1)) if m else 0
-                        
-                        # Sort by date, newest first
-                        best = sorted(family_models, key=extract_date, reverse=True)[0]
-                        return best
-                    
-                    selected_model = pick_strongest_in_family(claude_client, model_family)
+                    selected_model = model_registry.strongest_in_family(model_family)
                     
                     # Save to session state
                     st.session_state.confirmed_model = selected_model
@@ -982,9 +1056,20 @@ def main_app():
             - ✅ Automatische Verbesserungen bei neuen Releases
             - ✅ Keine Code-Änderungen notwendig
             
-            **Hinweis:** Das System priorisiert immer die gewählte Familie. 
-            Wenn Sie Sonnet wählen, wird niemals auf Opus oder Haiku gewechselt.
+            **Hinweis:** Gliederung, Entwurf, rechtliche Prüfung, SEO und Humanisierung verwenden 
+            immer das gewählte Modell. Nur kleine Hilfsschritte (Keyword-Gruppierung, 
+            Referenzanalyse, Bildvorschläge) laufen auf Haiku.
             """)
+        
+        # --------------------------------------------------------------------
+        # MODEL PER STAGE
+        # --------------------------------------------------------------------
+        with st.expander("🧭 Modell je Schritt"):
+            try:
+                for stage, model in model_routing.describe_routes().items():
+                    st.write(f"**{stage}:** `{model}`")
+            except Exception as e:
+                st.error(f"Fehler beim Laden: {str(e)}")
 # ============================================================================
 # APPLICATION ENTRY POINT
 # ============================================================================
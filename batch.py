@@ -0,0 +1,219 @@
+"""
+Batch Article Generator
+Runs the article pipeline non-interactively for a CSV or JSONL topic file
+with bounded concurrency and writes every stage output to disk.
+
+Input columns / keys:
+    topic          (required) Legal topic, e.g. "§ 29 BtMG"
+    keyword_topic  (optional) Topic for SEMrush research
+    length         (optional) "short", "medium", "long" or a word count
+    reference      (optional) URL or file path with reference information
+
+Usage:
+    python batch.py topics.csv --out output --concurrency 4
+    python batch.py topics.csv --out output --bulk
+
+With --bulk all articles run at once and every Claude request is sent via the
+Message Batches API: each stage of all topics becomes one batch at half the
+price, results arrive within minutes to hours. Meant for overnight runs.
+
+Every article is checkpointed under a run ID derived from the output folder,
+so running the same command again after a failure only repeats missing or
+changed stages.
+"""
+import argparse
+import asyncio
+import csv
+import hashlib
+import json
+import os
+import re
+import time
+import traceback
+import llm
+import main
+import model_routing
+from message_batches import BatchCollector, active_collector
+from response_cache import get_cache
+
+STAGE_FILES = {
+    "reference_information": "reference_information.md",
+    "outline": "outline.md",
+    "draft": "draft.md",
+    "legal_review": "legal_review.json",
+    "verified": "verified.md",
+    "keywords": "keywords.txt",
+    "seo": "seo.md",
+    "humanized": "humanized.md",
+    "seo_humanized": "seo_humanized.md",
+    "pipelined": "pipelined.md",
+}
+
+
+def read_topic_file(path):
+    """Read jobs from a CSV (header row required) or JSONL file"""
+    jobs = []
+    with open(path, 'r', encoding='utf-8-sig') as file:
+        if path.lower().endswith(('.jsonl', '.ndjson')):
+            rows = (json.loads(line) for line in file if line.strip())
+        else:
+            rows = csv.DictReader(file)
+        for row in rows:
+            row = {k.strip().lower(): (v.strip() if isinstance(v, str) else v) for k, v in row.items() if k}
+            if not row.get("topic"):
+                continue
+            length = row.get("length") or None
+            if isinstance(length, str) and length.isdigit():
+                length = int(length)
+            if length and not main.target_words(length):
+                print(f"[WARN] Unbekannte Länge '{length}' für '{row['topic']}', ignoriert")
+                length = None
+            jobs.append({
+                "topic": row["topic"],
+                "keyword_topic": row.get("keyword_topic") or None,
+                "length": length,
+                "reference": row.get("reference") or None,
+            })
+    return jobs
+
+
+def slugify(text):
+    """File system friendly directory name for a topic"""
+    slug = text.lower()
+    for umlaut, replacement in (("ä", "ae"), ("ö", "oe"), ("ü", "ue"), ("ß", "ss")):
+        slug = slug.replace(umlaut, replacement)
+    slug = re.sub(r'[^a-z0-9]+', '_', slug).strip('_')
+    return slug[:60] or "artikel"
+
+
+def batch_run_id(directory):
+    """Stable checkpoint ID for an article folder, so re-running a batch resumes it"""
+    digest = hashlib.sha1(os.path.abspath(directory).encode('utf-8')).hexdigest()[:8]
+    return f"batch-{digest}-{os.path.basename(directory)}"
+
+
+def write_stage_output(directory, stage, result):
+    filename = STAGE_FILES.get(stage)
+    if filename is None or result is None:
+        return
+    with open(os.path.join(directory, filename), 'w', encoding='utf-8') as file:
+        if filename.endswith('.json'):
+            json.dump(result, file, ensure_ascii=False, indent=2)
+        elif isinstance(result, list):
+            file.write("\n".join(result))
+        else:
+            file.write(result)
+
+
+async def run_job(index, job, out_dir, semaphore, parallel_sections=False, profile=None):
+    """Generate one article, writing each stage as soon as it completes"""
+    directory = os.path.join(out_dir, f"{index:04d}_{slugify(job['topic'])}")
+    os.makedirs(directory, exist_ok=True)
+    report = {"topic": job["topic"], "output_dir": directory, "stage_seconds": {}}
+    stage_started = {}
+
+    def on_event(stage, event, result):
+        if event == "start":
+            stage_started[stage] = time.perf_counter()
+        elif event == "done":
+            report["stage_seconds"][stage] = round(time.perf_counter() - stage_started[stage], 2)
+            write_stage_output(directory, stage, result)
+        elif event == "restored":
+            report.setdefault("restored", []).append(stage)
+            write_stage_output(directory, stage, result)
+        elif event == "projection":
+            report["projected_tokens"] = {step: tokens["input_tokens"] + tokens["output_tokens"]
+                                          for step, tokens in result.items()}
+
+    async with semaphore:
+        started = time.perf_counter()
+        print(f"[INFO] ({index}) Starte: {job['topic']}")
+        try:
+            values = await main.generate_article(
+                job["topic"],
+                keyword_topic=job["keyword_topic"],
+                target_length=job["length"],
+                reference_source=job["reference"],
+                parallel_sections=parallel_sections,
+                profile=profile,
+                run_id=batch_run_id(directory),
+                on_event=on_event,
+            )
+            with open(os.path.join(directory, "article.md"), 'w', encoding='utf-8') as file:
+                file.write(values["article"])
+            report["status"] = "ok"
+            if values["degraded"]:
+                # Written with a fallback, running the batch again repeats these stages
+                report["degraded"] = values["degraded"]
+                print(f"[WARN] ({index}) Unvollständig geprüft: {', '.join(values['degraded'])}")
+        except Exception as e:
+            report["status"] = "failed"
+            report["error"] = f"{type(e).__name__}: {e}"
+            with open(os.path.join(directory, "error.txt"), 'w', encoding='utf-8') as file:
+                file.write(traceback.format_exc())
+        report["seconds"] = round(time.perf_counter() - started, 2)
+
+    marker = "✅" if report["status"] == "ok" else "❌"
+    print(f"{marker} ({index}) {job['topic']} - {report['seconds']}s {report.get('error', '')}")
+    return report
+
+
+async def run_batch(jobs, out_dir, concurrency=4, parallel_sections=False, profile=None, bulk=False, model=None):
+    """Run all jobs with at most `concurrency` articles in flight (all of them in bulk mode)"""
+    os.makedirs(out_dir, exist_ok=True)
+    if model:
+        # Model id or family for the stages routed to the selected model, see model_routing
+        model_routing.selected_model.set(model)
+    if bulk:
+        # Every stage task inherits the collector, so all topics share each stage's batch
+        active_collector.set(BatchCollector())
+        concurrency = max(len(jobs), 1)
+    semaphore = asyncio.Semaphore(concurrency)
+    return await asyncio.gather(*[
+        run_job(index, job, out_dir, semaphore, parallel_sections, profile) for index, job in enumerate(jobs, 1)
+    ])
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Generate articles for a topic file without prompts")
+    parser.add_argument("topic_file", help="CSV or JSONL with topic, keyword_topic, length, reference")
+    parser.add_argument("--out", default="output", help="Output directory (default: output)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Articles generated at the same time")
+    parser.add_argument("--parallel-sections", action="store_true", help="Draft outline sections concurrently")
+    parser.add_argument("--bulk", action="store_true",
+                        help="Send all Claude requests via the Message Batches API (cheaper, not interactive)")
+    parser.add_argument("--profile", default=main.DEFAULT_PROFILE, choices=main.profile_names(),
+                        help=f"Pipeline profile from profiles.json (default: {main.DEFAULT_PROFILE})")
+    parser.add_argument("--model", help="Model id or family (opus, sonnet, haiku) for the legal stages "
+                                        "(default: strongest model)")
+    args = parser.parse_args()
+
+    jobs = read_topic_file(args.topic_file)
+    if not jobs:
+        print("❌ Keine Themen in der Datei gefunden.")
+        return
+
+    mode = "Message Batches" if args.bulk else f"{args.concurrency} parallel"
+    print(f"=== Batch: {len(jobs)} Artikel, {mode}, Profil '{args.profile}' ===")
+    started = time.perf_counter()
+    reports = asyncio.run(run_batch(jobs, args.out, args.concurrency, args.parallel_sections, args.profile,
+                                    args.bulk, args.model))
+
+    with open(os.path.join(args.out, "report.json"), 'w', encoding='utf-8') as file:
+        json.dump(reports, file, ensure_ascii=False, indent=2)
+
+    failed = [r for r in reports if r["status"] != "ok"]
+    print("\n" + "="*50)
+    print(f"Fertig: {len(reports) - len(failed)} erfolgreich, {len(failed)} fehlgeschlagen "
+          f"({time.perf_counter() - started:.1f}s)")
+    for report in failed:
+        print(f"  ❌ {report['topic']}: {report['error']}")
+    cache_stats = get_cache().stats()
+    print(f"Antwort-Cache: {cache_stats['hits']} Treffer, {cache_stats['misses']} neu angefragt")
+    for line in llm.format_usage_stats():
+        print(f"  {line}")
+    print(f"Bericht: {os.path.join(args.out, 'report.json')}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,100 @@
+"""
+Run Checkpoints
+Every stage output of an article run is saved under the run ID together
+with a hash of the stage inputs. Resuming a run re-executes only stages
+whose checkpoint is missing or whose inputs changed (stale), so a failure
+late in the pipeline never costs the tokens of the stages before it.
+Degraded stages (partial results, see pipeline.mark_degraded) get no
+checkpoint and leave the run in status "degraded".
+
+Layout: RUNS_DIR/<run_id>/run.json (parameters and status) and one
+<stage>.json per finished stage.
+"""
+import hashlib
+import json
+import os
+import secrets
+import time
+from config import RUNS_DIR
+from storage import read_json, write_json
+
+
+def new_run_id(topic=""):
+    """Sortable, unique run ID, e.g. 20250101-120000-btmg-3fa2"""
+    slug = "".join(c if c.isalnum() else "-" for c in topic.lower())[:30].strip("-")
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{slug or 'artikel'}-{secrets.token_hex(2)}"
+
+
+def inputs_hash(stage, args, params=None):
+    """Hash of everything that determines a stage result"""
+    payload = json.dumps([stage, args, params or {}], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class RunCheckpoint:
+    """Checkpoint store of one run, used by pipeline.run_stages"""
+
+    def __init__(self, run_id, directory=RUNS_DIR):
+        self.run_id = run_id
+        self.directory = os.path.join(directory, run_id)
+        # stage -> reasons for stages that finished with a fallback in this process
+        self.degraded_stages = {}
+
+    def _stage_path(self, stage):
+        return os.path.join(self.directory, f"{stage}.json")
+
+    def lookup(self, stage, args, params=None):
+        """(True, value) if the stage finished before with the same inputs, else (False, None)"""
+        saved = read_json(self._stage_path(stage))
+        if saved is None or saved.get("inputs_hash") != inputs_hash(stage, args, params):
+            return False, None
+        return True, saved["value"]
+
+    def store(self, stage, args, params, value):
+        try:
+            write_json(self._stage_path(stage), {
+                "stage": stage,
+                "inputs_hash": inputs_hash(stage, args, params),
+                "saved_at": time.time(),
+                "value": value,
+            })
+        except (OSError, TypeError, ValueError) as e:
+            # A checkpoint is a safety net, never a reason to fail the run
+            print(f"[WARN] Checkpoint for '{stage}' could not be saved: {e}")
+
+    def degraded(self, stage, reasons):
+        """Keep no checkpoint for a partial result, a resume runs the stage again"""
+        self.degraded_stages[stage] = list(reasons)
+        print(f"[WARN] Stage '{stage}' is incomplete, no checkpoint saved: {'; '.join(reasons)}")
+
+    def load_run(self):
+        """Run parameters and status, or None for an unknown run"""
+        return read_json(os.path.join(self.directory, "run.json"))
+
+    def save_run(self, params, status, error=None):
+        run = self.load_run() or {"run_id": self.run_id, "created": time.time()}
+        run.update(params=params, status=status, error=error, updated=time.time())
+        write_json(os.path.join(self.directory, "run.json"), run)
+
+    def finished_stages(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name[:-5] for name in os.listdir(self.directory)
+                      if name.endswith(".json") and name != "run.json")
+
+
+def list_runs(directory=RUNS_DIR, unfinished_only=False, limit=20):
+    """Recent runs (newest first) with run_id, status, params and finished stages"""
+    if not os.path.isdir(directory):
+        return []
+    runs = []
+    for run_id in sorted(os.listdir(directory), reverse=True):
+        checkpoint = RunCheckpoint(run_id, directory)
+        run = checkpoint.load_run()
+        if run is None or (unfinished_only and run.get("status") == "done"):
+            continue
+        run["stages"] = checkpoint.finished_stages()
+        runs.append(run)
+        if len(runs) >= limit:
+            break
+    return runs
@@ -0,0 +1,110 @@
+"""
+Client Registry
+Builds each provider client on first use and keeps one instance per process.
+Every provider gets a single keep-alive transport, so warm requests reuse
+open TLS connections instead of handshaking again. Streamlit reruns re-execute
+app.py but not this module, so the clients survive reruns.
+
+Async clients are kept per event loop, because pooled async connections
+cannot be shared between loops (see aio.py for the shared background loop).
+"""
+import asyncio
+import os
+import threading
+import weakref
+import anthropic
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Long streams (verification, SEO rework) can run for minutes, connects should fail fast
+CLAUDE_TIMEOUT = anthropic.Timeout(connect=10.0, read=600.0, write=30.0, pool=30.0)
+CLAUDE_POOL = {"max_connections": 50, "max_keepalive_connections": 20, "keepalive_expiry": 120.0}
+
+# DALL-E requests take up to a minute, a handful of parallel calls is plenty
+OPENAI_TIMEOUT = 120.0
+OPENAI_POOL = {"max_connections": 10, "max_keepalive_connections": 5, "keepalive_expiry": 60.0}
+
+# SEMrush, reference URLs and image downloads
+HTTP_POOL_SIZE = 10
+
+# Same httpx Limits class the SDKs are built on
+_Limits = type(anthropic.DEFAULT_CONNECTION_LIMITS)
+
+_lock = threading.Lock()
+_clients = {}
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def _get_or_create(name, factory):
+    client = _clients.get(name)
+    if client is None:
+        with _lock:
+            client = _clients.get(name)
+            if client is None:
+                client = factory()
+                _clients[name] = client
+    return client
+
+
+def _get_or_create_for_loop(name, factory):
+    loop = asyncio.get_running_loop()
+    with _lock:
+        per_loop = _async_clients.setdefault(loop, {})
+        if name not in per_loop:
+            per_loop[name] = factory()
+        return per_loop[name]
+
+
+def _claude_kwargs(http_client_class):
+    return {
+        "api_key": os.getenv("CLAUDE_API_KEY"),
+        "timeout": CLAUDE_TIMEOUT,
+        # Retries happen in rate_limiter.call, which shares backoff across callers
+        "max_retries": 0,
+        "http_client": http_client_class(limits=_Limits(**CLAUDE_POOL), timeout=CLAUDE_TIMEOUT),
+    }
+
+
+def _openai_kwargs(http_client_class):
+    return {
+        "api_key": os.getenv("OPENAI_API_KEY"),
+        "timeout": OPENAI_TIMEOUT,
+        "max_retries": 0,
+        "http_client": http_client_class(limits=_Limits(**OPENAI_POOL), timeout=OPENAI_TIMEOUT),
+    }
+
+
+def get_claude_client():
+    """Shared synchronous Anthropic client"""
+    def build():
+        return anthropic.Anthropic(**_claude_kwargs(anthropic.DefaultHttpxClient))
+    return _get_or_create("claude", build)
+
+
+def get_async_claude_client():
+    """AsyncAnthropic client for the running event loop"""
+    def build():
+        return anthropic.AsyncAnthropic(**_claude_kwargs(anthropic.DefaultAsyncHttpxClient))
+    return _get_or_create_for_loop("claude", build)
+
+
+def get_async_openai_client():
+    """AsyncOpenAI client (DALL-E), imported only when the image tab needs it"""
+    def build():
+        import openai
+        return openai.AsyncOpenAI(**_openai_kwargs(openai.DefaultAsyncHttpxClient))
+    return _get_or_create_for_loop("openai", build)
+
+
+def get_http_session():
+    """Shared requests session with a keep-alive connection pool"""
+    def build():
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+    return _get_or_create("http", build)
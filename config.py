@@ -0,0 +1,74 @@
+"""
+Runtime Settings
+Shared locations, cache lifetimes and stage modes, overridable via .env
+"""
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Shared by all processes (Streamlit workers, CLI runs)
+CACHE_DIR = os.getenv("SEO_CACHE_DIR", os.path.join(BASE_DIR, ".cache"))
+
+# Model catalog is re-fetched after this many seconds
+MODEL_CACHE_TTL = int(os.getenv("MODEL_CACHE_TTL", 6 * 60 * 60))
+
+# "edits": legal verification returns a list of corrections applied locally,
+# "rewrite": the model re-emits every corrected chunk
+VERIFICATION_MODE = os.getenv("VERIFICATION_MODE", "edits")
+
+# Same choice for SEO keyword integration ("edits" or "rewrite")
+SEO_MODE = os.getenv("SEO_MODE", "edits")
+
+# Pipeline profiles (stage selection and per-stage model settings)
+PROFILES_FILE = os.getenv("PIPELINE_PROFILES", os.path.join(BASE_DIR, "profiles.json"))
+
+# Response cache for Claude and DALL-E calls (RESPONSE_CACHE_MAX_MB=0 disables it)
+RESPONSE_CACHE_MAX_BYTES = int(float(os.getenv("RESPONSE_CACHE_MAX_MB", 200)) * 1024 * 1024)
+RESPONSE_CACHE_MAX_AGE = int(os.getenv("RESPONSE_CACHE_MAX_AGE", 7 * 24 * 60 * 60))
+RESPONSE_CACHE_MEMORY_ITEMS = int(os.getenv("RESPONSE_CACHE_MEMORY_ITEMS", 256))
+# Stages whose purpose is a fresh sample on every click
+RESPONSE_CACHE_SKIP_STAGES = [
+    stage.strip() for stage in os.getenv("RESPONSE_CACHE_SKIP_STAGES", "humanized_deep,image_prompt").split(",")
+    if stage.strip()
+]
+
+# Stage checkpoints of article runs (kept apart from the disposable caches)
+RUNS_DIR = os.getenv("SEO_RUNS_DIR", os.path.join(BASE_DIR, "runs"))
+
+# Bulk mode (batch.py --bulk): requests are submitted as one message batch after
+# this many quiet seconds, running batches are polled at the second interval
+BULK_FLUSH_SECONDS = float(os.getenv("BULK_FLUSH_SECONDS", 10))
+BULK_POLL_SECONDS = float(os.getenv("BULK_POLL_SECONDS", 60))
+
+# SEMrush responses are re-fetched after this many seconds (search volumes change monthly)
+SEMRUSH_CACHE_TTL = int(os.getenv("SEMRUSH_CACHE_TTL", 30 * 24 * 60 * 60))
+# API units per day before requests fail fast and stale cache entries are served (0: no limit)
+SEMRUSH_DAILY_UNITS = int(os.getenv("SEMRUSH_DAILY_UNITS", 0))
+
+# Keyword research fan-out: SEMrush reports and databases queried for every seed
+SEMRUSH_REPORTS = [r.strip() for r in os.getenv("SEMRUSH_REPORTS", "phrase_related,phrase_fullsearch,phrase_questions").split(",") if r.strip()]
+SEMRUSH_DATABASES = [d.strip() for d in os.getenv("SEMRUSH_DATABASES", "de,at,ch").split(",") if d.strip()]
+# Base URL, point it at a local stub server to test keyword research offline
+SEMRUSH_API_URL = os.getenv("SEMRUSH_API_URL", "https://api.semrush.com/")
+
+# Keyword filter rule sets per client (city exclusions, service regions, minimum volume)
+KEYWORD_RULES_FILE = os.getenv("KEYWORD_RULES", os.path.join(BASE_DIR, "keyword_rules.json"))
+KEYWORD_CLIENT = os.getenv("KEYWORD_CLIENT", "default")
+
+# "local": the highest-volume keyword clusters become the SEO keywords,
+# "claude": Claude picks and names the clusters (one extra request)
+KEYWORD_SELECTION = os.getenv("KEYWORD_SELECTION", "local")
+
+# Keyword knowledge base (SQLite): every harvested SEMrush row with its topic and cluster
+KEYWORD_STORE = os.getenv("KEYWORD_STORE", os.path.join(RUNS_DIR, "keywords.sqlite"))
+# A topic's own seed is not fetched once this many matching keywords of neighbouring topics are known
+KEYWORD_STORE_MIN_ROWS = int(os.getenv("KEYWORD_STORE_MIN_ROWS", 40))
+
+# Model family per stage on top of the default routing (see model_routing), e.g. "outline=haiku,humanized=opus"
+STAGE_MODELS = dict(
+    (part.split("=", 1)[0].strip(), part.split("=", 1)[1].strip())
+    for part in os.getenv("STAGE_MODELS", "").split(",") if "=" in part
+)
@@ -0,0 +1,107 @@
+"""
+Continuation
+Recovers responses that stop early: a response that hits max_tokens or a
+stream that breaks off after text arrived is cut back to its last clean
+boundary (paragraph break, else line break) and the model is asked to
+continue from there. The pieces are spliced at that boundary, so a failure
+costs only the missing tail instead of a full regeneration.
+
+Text is handed to on_text consumers only up to a clean boundary, so a
+continuation never has to take back what a consumer already received.
+"""
+
+# Follow-up requests per response before the text is returned as it is
+MAX_CONTINUATIONS = 3
+
+CONTINUE_PROMPT = (
+    "Deine Antwort wurde unterbrochen. Setze sie genau an der Stelle fort, an der sie endet. "
+    "Wiederhole nichts und beginne ohne Vorbemerkung."
+)
+
+
+def clean_boundary(text):
+    """Length of the longest prefix of text ending at a paragraph break, else at a line break (0 if none)"""
+    cut = text.rfind("\n\n")
+    if cut >= 0:
+        return cut + 2
+    return text.rfind("\n") + 1
+
+
+def continuation_params(params, kept):
+    """Messages API parameters asking the model to continue after kept"""
+    return dict(params, messages=params["messages"] + [
+        {"role": "assistant", "content": kept.rstrip()},
+        {"role": "user", "content": CONTINUE_PROMPT},
+    ])
+
+
+def _appended(kept, continuation):
+    """The part of a continuation that splice adds after kept"""
+    continuation = continuation.lstrip("\n")
+    last_line = kept.rstrip().rsplit("\n", 1)[-1].strip()
+    if last_line and continuation.startswith(last_line):
+        continuation = continuation[len(last_line):].lstrip("\n")
+    return continuation
+
+
+def splice(kept, continuation):
+    """Join kept text and its continuation, dropping a repeated last line"""
+    return kept + _appended(kept, continuation)
+
+
+class TextDelivery:
+    """
+    Forwards a growing response to on_text, up to its last clean boundary until it is final
+
+    Stream chunks come in through add(). Only the chunks since the last
+    delivery are joined, so a long response is not copied again at every line.
+    """
+
+    def __init__(self, on_text):
+        self.on_text = on_text
+        self.delivered = 0
+        self._last = ""          # Last delivered character, a paragraph break may span the offset
+        self._paragraphs = False  # Delivered text has a paragraph break, line breaks no longer count
+        self._kept = ""
+        self._pending = []
+
+    def restart(self, kept=""):
+        """Start a new stream that continues kept (empty for the first request)"""
+        self._kept = kept
+        self._pending = []
+
+    async def add(self, chunk):
+        if self.on_text is None:
+            return
+        self._pending.append(chunk)
+        if "\n" not in chunk:
+            return
+        tail = "".join(self._pending)
+        if self._kept:
+            # Not delivered yet: the end of kept, then the continuation without its repeated head
+            tail = self._kept[self.delivered:] + _appended(self._kept, tail)
+        boundary = self._boundary(tail)
+        if boundary:
+            await self._deliver(tail[:boundary])
+            self._pending = [tail[boundary:]]
+            self._kept = ""
+
+    async def finish(self, text):
+        if self.on_text is not None and len(text) > self.delivered:
+            await self._deliver(text[self.delivered:])
+
+    def _boundary(self, tail):
+        """clean_boundary of the whole text, as an offset into the undelivered tail (0 if none)"""
+        text = self._last + tail
+        cut = text.rfind("\n\n")
+        if cut >= 0:
+            return max(cut + 2 - len(self._last), 0)
+        if self._paragraphs:
+            return 0
+        return max(text.rfind("\n") + 1 - len(self._last), 0)
+
+    async def _deliver(self, text):
+        await self.on_text(text)
+        self._paragraphs = self._paragraphs or "\n\n" in self._last + text
+        self._last = text[-1:]
+        self.delivered += len(text)
@@ -0,0 +1,168 @@
+"""
+Text Edits
+Stages that only correct a few spots ask Claude for a list of edits instead
+of the whole text again. The edits are located in the original text,
+validated and applied locally, and double as an exact change report.
+
+Edit format expected from the model (JSON array):
+    [{"action": "replace", "find": "exact text", "replace": "new text", "reason": "..."},
+     {"action": "delete", "find": "exact text", "reason": "..."},
+     {"action": "bold", "find": "exact text", "reason": "..."}]
+
+Locked patterns (paragraph citations, penalty ranges) are checked
+mechanically: a change is rejected unless it keeps every locked match of
+the original and adds none.
+"""
+import json
+import re
+from collections import Counter
+
+ACTIONS = ("replace", "delete", "bold")
+
+_NUMBER = r'(?:\d+(?:[.,]\d+)?|ein(?:e[mnr]?)?|zwei|drei|vier|fünf|sechs|sieben|acht|neun|zehn|elf|zwölf|fünfzehn|zwanzig)'
+
+# Legal facts that text edits for style or SEO must never alter
+LEGAL_PATTERNS = [
+    # § 29 Abs. 1 Nr. 3 BtMG, §§ 223, 224 StGB
+    re.compile(r'§§?\s*\d+[a-z]?(?:\s*(?:,|und|bis|-|–)\s*\d+[a-z]?)*'
+               r'(?:\s*(?:Abs\.|Absatz)\s*\d+[a-z]?)?(?:\s*(?:S\.|Satz)\s*\d+)?(?:\s*(?:Nr\.|Nummer)\s*\d+[a-z]?)?'
+               r'(?:\s+[A-ZÄÖÜ][a-zäöü]*[A-Z]\w*)?'),
+    # bis zu 5 Jahren, 1 bis 15 Jahre, nicht unter einem Jahr, 90 Tagessätze, 2.500 Euro
+    # (with the bound, so "nicht unter" cannot become "bis zu")
+    re.compile(r'\b(?:(?:nicht\s+unter|nicht\s+über|nicht\s+mehr\s+als|mindestens|höchstens|bis\s+zu)\s+)?'
+               + _NUMBER + r'(?:\s*(?:bis(?:\s+zu)?|-|–|und)\s*' + _NUMBER + r')?\s*'
+               r'(?:Jahre?n?|Monate?n?|Woche?n?|Tagessätzen?|Tage?n?|Stunden?|Euro|€)(?!\w)', re.IGNORECASE),
+]
+
+
+def parse_edits(response):
+    """
+    Extract the edit list from a model response
+
+    Accepts a bare JSON array or one wrapped in a ```json fence or prose.
+
+    Raises:
+        ValueError: If no JSON array can be decoded
+    """
+    start, end = response.find("["), response.rfind("]")
+    if start == -1 or end < start:
+        raise ValueError("No JSON array in response")
+    edits = json.loads(response[start:end + 1])
+    if not isinstance(edits, list):
+        raise ValueError("Edit list is not a JSON array")
+    return [edit for edit in edits if isinstance(edit, dict)]
+
+
+def locate(text, snippet):
+    """
+    Find the unique position of snippet in text
+
+    Falls back to a whitespace-insensitive match, because models often
+    normalise line breaks and double spaces when quoting.
+
+    Returns:
+        (start, end) or None if the snippet is missing or ambiguous
+    """
+    if not snippet.strip():
+        return None
+    count = text.count(snippet)
+    if count == 1:
+        start = text.index(snippet)
+        return start, start + len(snippet)
+    if count > 1:
+        return None
+
+    pattern = r'\s+'.join(re.escape(word) for word in snippet.split())
+    matches = list(re.finditer(pattern, text))
+    if len(matches) == 1:
+        return matches[0].span()
+    return None
+
+
+def locked_matches(text, patterns=LEGAL_PATTERNS):
+    """Locked matches of text, ignoring bold markers and whitespace differences"""
+    plain = " ".join(text.replace("**", "").split())
+    return Counter(" ".join(m.group(0).split()) for pattern in patterns for m in pattern.finditer(plain))
+
+
+def resolve_edits(text, edits, offset=0, locked_patterns=None):
+    """
+    Turn model edits into validated, non-overlapping changes
+
+    Args:
+        text: Text the edits refer to
+        edits: Parsed edit dicts
+        offset: Position of text inside the full document (for chunked input)
+        locked_patterns: Reject changes that alter matches of these patterns
+
+    Returns:
+        (changes, rejected) where changes are dicts with start, end, old, new,
+        reason (positions relative to the full document) and rejected are the
+        edits that could not be applied, with an "error" key
+    """
+    changes = []
+    rejected = []
+    for edit in edits:
+        action = edit.get("action")
+        find = edit.get("find") or ""
+        new = "" if action == "delete" else edit.get("replace")
+
+        error = None
+        span = None
+        if action not in ACTIONS:
+            error = f"unknown action {action!r}"
+        elif action == "replace" and not isinstance(new, str):
+            error = "replace text missing"
+        else:
+            span = locate(text, find)
+            if span is None:
+                error = "text not found or not unique"
+            elif any(span[0] < c["end"] - offset and c["start"] - offset < span[1] for c in changes):
+                error = "overlaps another edit"
+
+        if span is not None and not error:
+            old = text[span[0]:span[1]]
+            if action == "bold":
+                new = old if old.startswith("**") else f"**{old.strip()}**"
+            if locked_patterns and locked_matches(old, locked_patterns) != locked_matches(new, locked_patterns):
+                error = "changes locked text"
+
+        if error:
+            rejected.append(dict(edit, error=error))
+            continue
+        if old == new:
+            continue
+        changes.append({
+            "start": span[0] + offset,
+            "end": span[1] + offset,
+            "old": old,
+            "new": new,
+            "reason": edit.get("reason", ""),
+        })
+    return changes, rejected
+
+
+def apply_changes(text, changes):
+    """Apply resolved changes (positions in text), tidying gaps left by deletions"""
+    result = text
+    for change in sorted(changes, key=lambda c: c["start"], reverse=True):
+        result = result[:change["start"]] + change["new"] + result[change["end"]:]
+    if any(not change["new"] for change in changes):
+        result = re.sub(r'\n{3,}', '\n\n', result)
+    return result
+
+
+def _shorten(text, limit=80):
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+
+def format_change(change):
+    """One-line description of a change for logs"""
+    if not change["new"]:
+        line = f'gelöscht: "{_shorten(change["old"])}"'
+    else:
+        line = f'"{_shorten(change["old"])}" → "{_shorten(change["new"])}"'
+    if change.get("reason"):
+        line += f' ({change["reason"]})'
+    return line
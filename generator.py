@@ -1,50 +1,99 @@
 import os
+import re
+import sys
+import asyncio
 from dotenv import load_dotenv
-import requests
-import anthropic
-from pick_strongest_model import pick_strongest_model
+import llm
+import rate_limiter
+from clients import get_http_session
+from aio import run_sync
+from semrush_cache import get_semrush_cache, check_response, response_rows, unit_cost, SemrushBudgetExceeded
+from config import SEMRUSH_REPORTS, SEMRUSH_DATABASES, SEMRUSH_API_URL, KEYWORD_SELECTION, KEYWORD_STORE_MIN_ROWS
+from keyword_filters import get_keyword_filter, parse_lines
+from keyword_clusters import cluster_keywords
+from keyword_store import get_keyword_store
 
 load_dotenv()
 SEMRUSH_API_KEY = os.getenv("SEMRUSH_API_KEY")
-client = anthropic.Anthropic(api_key=os.getenv("CLAUDE_API_KEY"))
-CLAUDE_MODEL = pick_strongest_model(client)
 
-# Cities to exclude from keyword results, KEEP: Hamburg, Frankfurt, München, Neumünster (client service regions)
-CITY_MODIFIERS = [
-    "berlin", "bonn", "duisburg", "augsburg", "aachen", "köln", "leipzig", "stuttgart",
-    "bremen", "düsseldorf", "hannover", "kiel", "saarbrücken", "potsdam", "erfurt",
-    "mainz", "wiesbaden", "dortmund", "essen"
-]
+# (connect, read) seconds, SEMrush answers within seconds or not at all
+SEMRUSH_TIMEOUT = (5, 30)
 
-def get_semrush_raw_keywords(topic, max_keywords=50):
-    """Get raw keywords from SEMrush API"""
-    print(f"[INFO] SEMrush API called with topic: '{topic}'")
-    url = (
-        f"https://api.semrush.com/?type=phrase_related&key={SEMRUSH_API_KEY}"
-        f"&phrase={topic}&database=de&export_columns=Ph,Nq&display_limit={max_keywords}"
-    )
+# Paragraph citation inside a topic, e.g. "§ 29 BtMG" in "Strafen nach § 29 BtMG"
+PARAGRAPH_RE = re.compile(r'§§?\s*\d+[a-z]?(?:\s*(?:Abs\.|Absatz)\s*\d+)?\s+([A-Za-zÄÖÜäöü]+)')
+
+# Law abbreviation -> legal area people search for
+LAW_AREAS = {
+    "btmg": "betäubungsmittelstrafrecht",
+    "stpo": "strafprozessrecht",
+    "stvg": "verkehrsstrafrecht",
+    "ao": "steuerstrafrecht",
+    "waffg": "waffenrecht",
+    "owig": "ordnungswidrigkeiten",
+    "jgg": "jugendstrafrecht",
+}
 
+async def fetch_semrush_report_async(report_type, phrase, database="de", display_limit=50):
+    """
+    Raw CSV response of a SEMrush report, answered from the cache while fresh
+    
+    Raises:
+        SemrushBudgetExceeded: Daily unit budget exhausted and nothing cached
+        SemrushError: SEMrush answered with an error and nothing is cached
+    """
+    request = {"type": report_type, "phrase": phrase, "database": database, "display_limit": display_limit}
+    cache = get_semrush_cache()
+    entry, fresh = cache.lookup(request)
+    if fresh:
+        print(f"[INFO] SEMrush ({report_type}, '{phrase}', {database}) aus Cache")
+        return entry["text"]
+    
     try:
-        response = requests.get(url)
+        reserved = cache.reserve_units(request)
+    except SemrushBudgetExceeded as e:
+        if entry is None:
+            raise
+        return cache.serve_stale(entry, str(e))
+    
+    print(f"[INFO] SEMrush API called: {report_type} '{phrase}' ({database})")
+    params = dict(request, key=SEMRUSH_API_KEY, export_columns="Ph,Nq")
+    
+    async def send():
+        response = await asyncio.to_thread(get_http_session().get, SEMRUSH_API_URL, params=params,
+                                           timeout=SEMRUSH_TIMEOUT)
         response.raise_for_status()
+        return response.text, None, None
+    
+    try:
+        text = await rate_limiter.call("semrush", "api", send)
+        check_response(text)
+    except BaseException as e:
+        # Also releases the reservation of a cancelled request
+        cache.settle_units(reserved, 0, answered=False)
+        if entry is None or not isinstance(e, Exception):
+            raise
+        return cache.serve_stale(entry, f"request failed ({e})")
+    
+    rows = response_rows(text)
+    cache.settle_units(reserved, unit_cost(report_type, rows))
+    cache.store(request, text)
+    print(f"[INFO] SEMrush lieferte {rows} Zeilen ({unit_cost(report_type, rows)} Einheiten)")
+    return text
 
-        print("📦 SEMrush Raw Response:")
-        print(response.text)
-
-        lines = response.text.strip().split('\n')
-        if len(lines) < 2:
-            return []
-
-        keywords = []
-        for line in lines[1:]:
-            try:
-                phrase, volume = line.strip().split(";")
-                volume = int(volume)
-                if volume >= 10 and not any(city in phrase.lower() for city in CITY_MODIFIERS):
-                    keywords.append((phrase.strip(), volume))
-            except ValueError:
-                continue
+def parse_keyword_rows(text, client=None):
+    """
+    (phrase, volume) rows of a Ph,Nq SEMrush response that pass the client's
+    keyword rules (volume threshold, cities outside the service regions),
+    see keyword_filters
+    """
+    return list(get_keyword_filter(client).filter_lines(text.strip().splitlines()))
 
+async def get_semrush_raw_keywords_async(topic, max_keywords=50):
+    """Get raw keywords from SEMrush API (cached, see fetch_semrush_report_async)"""
+    try:
+        text = await fetch_semrush_report_async("phrase_related", topic, "de", max_keywords)
+        keywords = parse_keyword_rows(text)
+        
         print(f"[INFO] SEMrush found {len(keywords)} cleaned keywords")
         keywords.sort(key=lambda x: x[1], reverse=True)
         return keywords
@@ -53,63 +102,228 @@ def get_semrush_raw_keywords(topic, max_keywords=50):
         print(f"[ERROR] SEMrush fetch failed: {e}")
         return []
 
-def select_and_group_keywords_with_claude(topic, keyword_volume_list):
-    """Use Claude to select and group similar keywords, returning 20 keywords"""
-    if not keyword_volume_list:
-        return []
+def derive_seeds(topic):
+    """
+    Search phrases for a topic: the topic itself, a paragraph citation it
+    contains and the legal area of the cited law
     
-    print(f"[INFO] Claude analyzing {len(keyword_volume_list)} keywords for grouping and selection")
-    keyword_block = "\n".join([f"{kw} — {vol}" for kw, vol in keyword_volume_list])
+    "Strafen nach § 29 BtMG" -> ["Strafen nach § 29 BtMG", "§ 29 BtMG", "betäubungsmittelstrafrecht"]
+    """
+    seeds = [topic.strip()]
+    match = PARAGRAPH_RE.search(topic)
+    if match:
+        seeds.append(" ".join(match.group(0).split()))
+        area = LAW_AREAS.get(match.group(1).lower())
+        if area:
+            seeds.append(area)
+    return list(dict.fromkeys(seed for seed in seeds if seed))
 
-    prompt = f"""
-Keywords with search volume:
+def topic_law(topic):
+    """Law abbreviation cited by a topic ("btmg" for "Strafen nach § 29 BtMG"), None without citation"""
+    match = PARAGRAPH_RE.search(topic)
+    return match.group(1).lower() if match else None
 
-{keyword_block}
+def merge_keywords(results):
+    """
+    Merge keyword rows of several reports, seeds and databases
+    
+    Args:
+        results: list of (database, [(phrase, volume), ...])
+    
+    Returns:
+        list of (phrase, volume) sorted by volume: duplicates (case and
+        whitespace insensitive) are merged, the volume is the sum over the
+        databases of the highest volume reported per database
+    """
+    volumes = {}
+    spelling = {}
+    for database, rows in results:
+        for phrase, volume in rows:
+            key = " ".join(phrase.lower().split())
+            spelling.setdefault(key, " ".join(phrase.split()))
+            per_database = volumes.setdefault(key, {})
+            per_database[database] = max(per_database.get(database, 0), volume)
+    merged = [(spelling[key], sum(per_database.values())) for key, per_database in volumes.items()]
+    merged.sort(key=lambda x: x[1], reverse=True)
+    return merged
 
-You are given a list of keywords (with search volume) from SEMrush. Your task is to:
+async def expand_keywords_async(topic, seeds=None, reports=None, databases=None, max_keywords=50):
+    """
+    Keyword research across several seeds, report types and databases at once
+    
+    Answered from the keyword store first: requests another topic already
+    harvested (shared seeds like the legal area) are not fetched again.
+    Neighbouring topics cite the same law on the same or the next paragraph
+    ("§ 29 BtMG" and "§ 30 BtMG" for "§ 29a BtMG"); of their keywords only
+    those containing the topic's own words or paragraph number are added.
+    With KEYWORD_STORE_MIN_ROWS of them, its own seed is skipped as well.
+    The remaining requests run concurrently (bounded by the SEMrush rate
+    limiter and the pooled HTTP session) and are recorded in the store;
+    failed requests are skipped.
+    
+    Returns:
+        list of (phrase, volume), merged and sorted by volume
+    """
+    seeds = seeds or derive_seeds(topic)
+    reports = reports or SEMRUSH_REPORTS
+    databases = databases or SEMRUSH_DATABASES
+    combinations = [(report, seed, database) for seed in seeds for report in reports for database in databases]
+    print(f"[INFO] Keyword-Recherche: {len(seeds)} Seeds × {len(reports)} Reports × {len(databases)} Datenbanken")
+    
+    store = get_keyword_store()
+    keyword_filter = get_keyword_filter()
+    law = topic_law(topic)
+    neighbours, related = store.neighbour_rows(topic, law)
+    results = [(database, keyword_filter.filter_rows(rows)) for database, rows in neighbours]
+    neighbour_count = sum(len(rows) for _, rows in results)
+    if neighbour_count:
+        print(f"[INFO] Keyword-Speicher: {neighbour_count} Keywords verwandter Themen zum Thema "
+              f"({', '.join(related[:5])})")
+    
+    gaps = []
+    for report, seed, database in combinations:
+        rows = store.harvested_rows(report, seed, database)
+        if rows is not None:
+            results.append((database, keyword_filter.filter_rows(rows)))
+        elif neighbour_count >= KEYWORD_STORE_MIN_ROWS and seed == seeds[0] and len(seeds) > 1:
+            continue
+        else:
+            gaps.append((report, seed, database))
+    print(f"[INFO] Keyword-Speicher: {len(combinations) - len(gaps)} Anfragen bekannt, "
+          f"{len(gaps)} Anfragen an SEMrush")
+    
+    responses = await asyncio.gather(
+        *[fetch_semrush_report_async(report, seed, database, max_keywords)
+          for report, seed, database in gaps],
+        return_exceptions=True,
+    )
+    for (report, seed, database), response in zip(gaps, responses):
+        if isinstance(response, Exception):
+            print(f"[WARN] SEMrush {report} '{seed}' ({database}) fehlgeschlagen: {response}")
+            continue
+        rows = list(parse_lines(response.strip().splitlines()))
+        store.record(topic, law, report, seed, database, rows)
+        results.append((database, keyword_filter.filter_rows(rows)))
+    
+    keywords = merge_keywords(results)
+    print(f"[INFO] SEMrush found {len(keywords)} cleaned keywords "
+          f"({sum(len(rows) for _, rows in results)} vor dem Zusammenführen)")
+    return keywords
 
-Group Similar Keywords:
-Identify keywords that are just variations, typos, synonyms of the same concept.
-Merge them into one descriptive representative keyword.
+# Keywords handed to the article pipeline
+FINAL_KEYWORD_COUNT = 20
 
-Select 20 Final Keywords:
-Pick the 20 most relevant and descriptive grouped keywords that cover the whole topic area.
+# Largest clusters shown to Claude when it ranks them
+MAX_CLUSTERS_FOR_CLAUDE = 100
+
+async def rank_clusters_with_claude_async(topic, clusters):
+    """Let Claude pick and name the best keyword clusters (empty list if the call fails)"""
+    lines = []
+    for cluster in clusters[:MAX_CLUSTERS_FOR_CLAUDE]:
+        line = f"{cluster['representative']} — {cluster['volume']}"
+        variants = [phrase for phrase, _ in cluster["keywords"] if phrase != cluster["representative"]]
+        if variants:
+            line += f" (variants: {', '.join(variants[:5])})"
+        lines.append(line)
+    cluster_block = "\n".join(lines)
+    
+    prompt = f"""
+Keyword clusters for the topic "{topic}" (representative keyword — summed search volume, variants):
+
+{cluster_block}
+
+Each line is a group of keyword variations, typos and synonyms that were already merged.
+
+Select {FINAL_KEYWORD_COUNT} Final Keywords:
+Pick the {FINAL_KEYWORD_COUNT} most relevant clusters that cover the whole topic area.
 Prioritize keywords that are legally precise, descriptive, and commonly used.
-Avoid duplicates, redundant forms, or overly generic terms.
-Keep keywords that are comprehensive and representative of the topic.
+For each picked cluster return its most descriptive keyword (the representative or one of its variants).
+Avoid overly generic terms.
 
 Output Format:
-Return the final 20 grouped keywords each in one line without numbering.
+Return the final keywords each in one line without numbering.
 No extra commentary, just the clean list.
-
-Goal: Get the 20 strongest, most descriptive grouped keywords that represent the essence of the topic.
 """
-
+    
     try:
-        response = client.messages.create(
-            model=CLAUDE_MODEL,
-            max_tokens=800,
-            temperature=0.3,
-            messages=[{"role": "user", "content": prompt}]
-        )
-        keywords_text = response.content[0].text.strip()
+        keywords_text = (await llm.complete(prompt, max_tokens=800, temperature=0.3,
+                                            stage="keyword_selection")).strip()
         keywords_list = [kw.strip() for kw in keywords_text.split('\n') if kw.strip()]
         print(f"[INFO] Claude selected {len(keywords_list)} grouped keywords")
         return keywords_list
     except Exception as e:
-        print(f"[ERROR] Claude keyword grouping failed: {e}")
+        print(f"[ERROR] Claude keyword ranking failed: {e}")
         return []
 
-def get_seo_keywords_for_topic(topic):
+async def select_keywords_async(topic, keyword_volume_list):
+    """
+    Group similar keywords locally and return the FINAL_KEYWORD_COUNT best
+    
+    With KEYWORD_SELECTION=claude, Claude ranks and names the clusters; the
+    local ranking by search volume is the fallback.
+    """
+    if not keyword_volume_list:
+        return []
+    
+    clusters = cluster_keywords(keyword_volume_list)
+    print(f"[INFO] {len(keyword_volume_list)} Keywords in {len(clusters)} Gruppen zusammengefasst")
+    get_keyword_store().assign_clusters(clusters)
+    if KEYWORD_SELECTION == "claude":
+        selected = await rank_clusters_with_claude_async(topic, clusters)
+        if selected:
+            return selected
+    return [cluster["representative"] for cluster in clusters[:FINAL_KEYWORD_COUNT]]
+
+async def get_seo_keywords_for_topic_async(topic):
     """Main function to get grouped SEO keywords for a topic"""
-    raw_keywords = get_semrush_raw_keywords(topic)
+    raw_keywords = await expand_keywords_async(topic)
     if raw_keywords:
-        grouped_keywords = select_and_group_keywords_with_claude(topic, raw_keywords)
+        grouped_keywords = await select_keywords_async(topic, raw_keywords)
         return grouped_keywords
     return []
 
+def get_semrush_raw_keywords(topic, max_keywords=50):
+    """Get raw keywords from SEMrush API"""
+    return run_sync(get_semrush_raw_keywords_async(topic, max_keywords))
+
+def select_keywords(topic, keyword_volume_list):
+    """Group similar keywords and return the FINAL_KEYWORD_COUNT best"""
+    return run_sync(select_keywords_async(topic, keyword_volume_list))
+
+def get_seo_keywords_for_topic(topic):
+    """Main function to get grouped SEO keywords for a topic"""
+    return run_sync(get_seo_keywords_for_topic_async(topic))
+
+async def warm_semrush_cache_async(topics, max_keywords=50):
+    """Fetch the keyword research of every topic into the SEMrush cache (no Claude calls)"""
+    results = await asyncio.gather(*[expand_keywords_async(topic, max_keywords=max_keywords) for topic in topics])
+    return dict(zip(topics, results))
+
+def warm_semrush_cache(path):
+    """Pre-warm the SEMrush cache from a file with one keyword topic per line"""
+    with open(path, 'r', encoding='utf-8-sig') as file:
+        topics = list(dict.fromkeys(line.strip() for line in file if line.strip() and not line.startswith("#")))
+    results = run_sync(warm_semrush_cache_async(topics))
+    for topic, keywords in results.items():
+        print(f"{'✅' if keywords else '❌'} {topic}: {len(keywords)} Keywords")
+    stats = get_semrush_cache().stats()
+    budget = f" von {stats['daily_units']}" if stats["daily_units"] else ""
+    print(f"SEMrush-Einheiten heute: {stats['units_today']}{budget}")
+    store_stats = get_keyword_store().stats()
+    print(f"Keyword-Speicher: {store_stats['keywords']:,} Keywords aus {store_stats['topics']} Themen")
+
 # Test Run
 if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "--warm":
+        # python generator.py --warm topics.txt
+        warm_semrush_cache(sys.argv[2])
+        sys.exit(0)
+    if len(sys.argv) > 2 and sys.argv[1] == "--lookup":
+        # python generator.py --lookup "btm str" - known keywords without a SEMrush call
+        for phrase, volume in get_keyword_store().lookup_prefix(" ".join(sys.argv[2:])):
+            print(f"{volume:>8}  {phrase}")
+        sys.exit(0)
+    
     topic = "betäubungsmittelstrafrecht"
     keywords = get_seo_keywords_for_topic(topic)
     print("Final Grouped Keywords:")
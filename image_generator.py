@@ -1,15 +1,15 @@
-import os
 from dotenv import load_dotenv
-from openai import OpenAI
-import anthropic
-from pick_strongest_model import pick_strongest_model
+import llm
+import rate_limiter
+from clients import get_async_openai_client
+from response_cache import get_cache, make_key
+from aio import run_sync
 
 load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-claude = anthropic.Anthropic(api_key=os.getenv("CLAUDE_API_KEY"))
-CLAUDE_MODEL = pick_strongest_model(claude)
+# DALL-E image URLs expire after an hour, cached URLs must still be loadable
+IMAGE_URL_MAX_AGE = 50 * 60
 
-def generate_image_prompt(topic):
+async def generate_image_prompt_async(topic):
     print(f"Generating image prompt suggestions for topic: '{topic}'...")
 
     prompt = f"""
@@ -19,18 +19,39 @@ Avoid full scenes or descriptions — just clear, symbolic objects or visuals.
 Return only the 5 suggestions, one per line, no numbering, no explanations.
 """
 
-    response = claude.messages.create(
-        model=CLAUDE_MODEL,
-        messages=[{"role": "user", "content": prompt}],
-        max_tokens=100,
-        temperature=0.8,
-    )
-
-    image_prompt_suggestions = response.content[0].text.strip()
+    image_prompt_suggestions = (await llm.complete(prompt, max_tokens=100, temperature=0.8,
+                                                   stage="image_prompt")).strip()
     print(f"Image prompt suggestions:\n{image_prompt_suggestions}")
     return image_prompt_suggestions
 
-def generate_article_image_realistic(image_prompt, size="1024x1024", quality="standard"):
+async def _generate_dalle_image(prompt, size, quality):
+    """Single DALL-E 3 request through the shared OpenAI rate limiter (cached while the URL is valid)"""
+    cache = get_cache()
+    use_cache = cache.enabled_for("image")
+    if use_cache:
+        key = make_key(kind="image", model="dall-e-3", prompt=prompt, size=size, quality=quality, stage="image")
+        cached = cache.get(key, "image", max_age=IMAGE_URL_MAX_AGE)
+        if cached is not None:
+            return cached
+    
+    async def request():
+        raw = await get_async_openai_client().images.with_raw_response.generate(
+            model="dall-e-3",
+            prompt=prompt,
+            size=size,
+            quality=quality,
+            n=1
+        )
+        response = await raw.parse()
+        return response, raw.headers, None
+
+    response = await rate_limiter.call("openai", "dall-e-3", request)
+    image_url = response.data[0].url
+    if use_cache:
+        cache.put(key, image_url, "image")
+    return image_url
+
+async def generate_article_image_realistic_async(image_prompt, size="1024x1024", quality="standard"):
     """
     Generate a professional legal article image using DALL-E with custom options
     
@@ -56,15 +77,7 @@ point that instantly conveys the essence in a memorable way.
 """
     
     try:
-        response = client.images.generate(
-            model="dall-e-3",
-            prompt=prompt,
-            size=size,
-            quality=quality,
-            n=1
-        )
-        
-        image_url = response.data[0].url
+        image_url = await _generate_dalle_image(prompt, size, quality)
         print(f"✅ Bild erfolgreich generiert: {image_url}")
         return image_url
         
@@ -72,7 +85,7 @@ point that instantly conveys the essence in a memorable way.
         print(f"[ERROR] Bild-Generierung fehlgeschlagen: {e}")
         return None
 
-def generate_article_image_iconic(image_prompt, size="1024x1024", quality="standard"):
+async def generate_article_image_iconic_async(image_prompt, size="1024x1024", quality="standard"):
     """
     Generate an iconic legal article image using DALL-E with custom options
     
@@ -96,15 +109,7 @@ The image should be professional, instantly communicating the key idea.
 """
     
     try:
-        response = client.images.generate(
-            model="dall-e-3",
-            prompt=prompt,
-            size=size,
-            quality=quality,
-            n=1
-        )
-        
-        image_url = response.data[0].url
+        image_url = await _generate_dalle_image(prompt, size, quality)
         print(f"✅ Ikonisches Bild erfolgreich generiert: {image_url}")
         return image_url
         
@@ -112,6 +117,18 @@ The image should be professional, instantly communicating the key idea.
         print(f"[ERROR] Ikonische Bild-Generierung fehlgeschlagen: {e}")
         return None
 
+def generate_image_prompt(topic):
+    """Suggest 5 short iconic visuals for a legal topic"""
+    return run_sync(generate_image_prompt_async(topic))
+
+def generate_article_image_realistic(image_prompt, size="1024x1024", quality="standard"):
+    """Generate a professional legal article image using DALL-E with custom options"""
+    return run_sync(generate_article_image_realistic_async(image_prompt, size, quality))
+
+def generate_article_image_iconic(image_prompt, size="1024x1024", quality="standard"):
+    """Generate an iconic legal article image using DALL-E with custom options"""
+    return run_sync(generate_article_image_iconic_async(image_prompt, size, quality))
+
 # Test the function
 if __name__ == "__main__":
     topic = "Raub § 249 StGB"
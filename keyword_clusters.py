@@ -0,0 +1,110 @@
+"""
+Keyword Clustering
+Groups variants, typos and reorderings of the same search phrase locally,
+without a model call. Phrases are normalized (lowercase, ä/ö/ü/ß spelled
+out, punctuation dropped), turned into IDF-weighted character trigram
+vectors of their words (hashed into a fixed number of dimensions, so the
+result is the same on every run) and clustered greedily in order of search
+volume: a phrase joins the most similar existing cluster if the cosine
+similarity to that cluster's leading phrase reaches the threshold.
+
+Each cluster reports its member keywords, the summed volume and a
+representative: the member with the highest volume-weighted similarity to
+all members.
+"""
+import re
+import zlib
+import numpy as np
+
+DIMENSIONS = 2048
+NGRAM = 3
+SIMILARITY_THRESHOLD = 0.65
+
+# Rows compared against the existing clusters in one matrix product
+BLOCK_SIZE = 256
+
+_UMLAUTS = (("ä", "ae"), ("ö", "oe"), ("ü", "ue"), ("ß", "ss"))
+_NON_WORD = re.compile(r'[^a-z0-9§]+')
+
+
+def normalize(phrase):
+    """Comparable form of a phrase: "Betäubungsmittel-Gesetz" -> "betaeubungsmittel gesetz" """
+    text = phrase.lower()
+    for umlaut, replacement in _UMLAUTS:
+        text = text.replace(umlaut, replacement)
+    return " ".join(_NON_WORD.sub(" ", text).split())
+
+
+def _word_features(word):
+    """Hashed trigrams of a padded word"""
+    padded = f" {word} "
+    return [zlib.crc32(padded[i:i + NGRAM].encode('utf-8')) % DIMENSIONS
+            for i in range(max(len(padded) - NGRAM + 1, 1))]
+
+
+def vectorize(phrases):
+    """Row-normalized IDF-weighted trigram matrix (len(phrases) x DIMENSIONS)"""
+    # Trigrams of each word, so word order does not matter; words repeat a lot across phrases
+    word_features = {}
+    rows, columns = [], []
+    for row, phrase in enumerate(phrases):
+        for word in normalize(phrase).split():
+            features = word_features.get(word)
+            if features is None:
+                features = word_features[word] = _word_features(word)
+            rows.extend([row] * len(features))
+            columns.extend(features)
+    matrix = np.zeros((len(phrases), DIMENSIONS), dtype=np.float32)
+    np.add.at(matrix, (np.array(rows, dtype=np.intp), np.array(columns, dtype=np.intp)), 1.0)
+    # Trigrams every phrase shares (usually the topic itself) say nothing about the variant
+    document_frequency = np.count_nonzero(matrix, axis=0)
+    matrix *= np.log((1 + len(phrases)) / (1 + document_frequency)) + 1
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-9)
+
+
+def cluster_keywords(keyword_volume_list, threshold=SIMILARITY_THRESHOLD):
+    """
+    Cluster (phrase, volume) rows
+
+    Returns:
+        list of dicts with "representative", "volume" (sum of members) and
+        "keywords" (member (phrase, volume) rows, highest volume first),
+        sorted by volume
+    """
+    rows = sorted(keyword_volume_list, key=lambda row: row[1], reverse=True)
+    if not rows:
+        return []
+    vectors = vectorize([phrase for phrase, _ in rows])
+
+    leaders = np.zeros((len(rows), DIMENSIONS), dtype=np.float32)
+    members = []
+    for start in range(0, len(rows), BLOCK_SIZE):
+        block = vectors[start:start + BLOCK_SIZE]
+        known = len(members)
+        known_similarities = block @ leaders[:known].T
+        for offset, vector in enumerate(block):
+            # Clusters opened earlier in this block are few, compare them one by one
+            similarities = np.concatenate([known_similarities[offset], leaders[known:len(members)] @ vector])
+            if len(similarities):
+                best = int(np.argmax(similarities))
+                if similarities[best] >= threshold:
+                    members[best].append(start + offset)
+                    continue
+            leaders[len(members)] = vector
+            members.append([start + offset])
+
+    volumes = np.array([volume for _, volume in rows], dtype=np.float32)
+    clusters = []
+    for indices in members:
+        block = vectors[indices]
+        # Volume-weighted medoid: the phrase closest to where the search demand is
+        # Rounded, so reorderings with equal vectors tie and the higher-volume spelling wins
+        scores = np.round((block @ block.T) @ volumes[indices], 3)
+        clusters.append({
+            "representative": rows[indices[int(np.argmax(scores))]][0],
+            "volume": int(volumes[indices].sum()),
+            "keywords": [rows[i] for i in indices],
+        })
+    clusters.sort(key=lambda cluster: cluster["volume"], reverse=True)
+    return clusters
@@ -0,0 +1,153 @@
+"""
+Keyword Filters
+Per-client rule sets for SEMrush keyword rows, defined in keyword_rules.json
+(path overridable via KEYWORD_RULES, active client via KEYWORD_CLIENT):
+
+    min_volume       rows below this monthly search volume are dropped
+    exclude_cities   cities outside the client's service regions
+    keep_cities      service regions, never excluded even if listed above
+    exclude_terms    further unwanted words (e.g. "jobs", "gehalt")
+
+All exclusions of a rule set are compiled into one regular expression.
+Terms match as whole words (hyphens and spaces separate words) including
+inflected forms like "berliner" or "kölns", and in umlaut-free spelling
+("koeln"). Terms listed with a trailing "*" also match as the first part of
+a compound ("cannabis*" matches "cannabisanbau"). A city never matches
+inside another word, so "münster" leaves "neumünster" alone and "essen"
+leaves "interessen" alone.
+"""
+import re
+import sys
+from config import KEYWORD_RULES_FILE, KEYWORD_CLIENT
+from storage import read_json
+
+DEFAULT_CLIENT = "default"
+RULE_KEYS = ("description", "min_volume", "exclude_cities", "keep_cities", "exclude_terms")
+
+# Inflection endings accepted after a whole-word term (Berliner, Kölns, Hamburgerin)
+SUFFIXES = ("er", "ern", "erin", "s")
+
+_LETTER = "a-zäöüß0-9"
+_UMLAUTS = (("ä", "ae"), ("ö", "oe"), ("ü", "ue"), ("ß", "ss"))
+
+
+def _spellings(term):
+    plain = term
+    for umlaut, replacement in _UMLAUTS:
+        plain = plain.replace(umlaut, replacement)
+    return {term, plain}
+
+
+def compile_exclusions(terms):
+    """One pattern for all terms (see module docstring), None if there are none"""
+    words, prefixes = set(), set()
+    for term in terms:
+        term = " ".join(term.lower().split())
+        if term.endswith("*"):
+            prefixes |= _spellings(term[:-1].strip())
+        elif term:
+            words |= _spellings(term)
+    alternatives = []
+    if words:
+        # Longest first, so "frankfurt am main" wins over "frankfurt"
+        names = "|".join(re.escape(w) for w in sorted(words, key=len, reverse=True))
+        suffixes = "|".join(SUFFIXES)
+        alternatives.append(rf"(?:{names})(?:{suffixes})?(?![{_LETTER}])")
+    if prefixes:
+        alternatives.append("(?:" + "|".join(re.escape(p) for p in sorted(prefixes, key=len, reverse=True)) + ")")
+    if not alternatives:
+        return None
+    return re.compile(rf"(?<![{_LETTER}])(?:{'|'.join(alternatives)})")
+
+
+class KeywordFilter:
+    """Compiled rule set of one client"""
+
+    def __init__(self, rules):
+        self.min_volume = rules.get("min_volume", 10)
+        keep = {" ".join(city.lower().split()) for city in rules.get("keep_cities", [])}
+        excluded = [city for city in rules.get("exclude_cities", []) if " ".join(city.lower().split()) not in keep]
+        self.pattern = compile_exclusions(excluded + rules.get("exclude_terms", []))
+
+    def excluded(self, phrase):
+        return self.pattern is not None and self.pattern.search(phrase.lower()) is not None
+
+    def accepts(self, phrase, volume):
+        return volume >= self.min_volume and not self.excluded(phrase)
+
+    def filter_rows(self, rows):
+        """Accepted (phrase, volume) rows"""
+        return [(phrase, volume) for phrase, volume in rows if self.accepts(phrase, volume)]
+
+    def filter_lines(self, lines):
+        """
+        Parse and filter "phrase;volume" lines one at a time, see parse_lines
+
+        Yields:
+            (phrase, volume) of accepted rows
+        """
+        for phrase, volume in parse_lines(lines):
+            if self.accepts(phrase, volume):
+                yield phrase, volume
+
+
+def parse_lines(lines):
+    """
+    Parse "phrase;volume" lines one at a time
+
+    The first line is the CSV header. Works on any iterable of lines, e.g.
+    an open file, so large exports are never loaded at once.
+
+    Yields:
+        (phrase, volume) of every well-formed row
+    """
+    rows = iter(lines)
+    next(rows, None)
+    for line in rows:
+        try:
+            phrase, volume = line.strip().split(";")
+            volume = int(volume)
+        except ValueError:
+            continue
+        yield phrase.strip(), volume
+
+
+def load_rules():
+    """
+    Read and validate all client rule sets
+
+    Raises:
+        ValueError: If the file is missing or a rule set is invalid
+    """
+    rules = read_json(KEYWORD_RULES_FILE)
+    if not isinstance(rules, dict) or DEFAULT_CLIENT not in rules:
+        raise ValueError(f"No '{DEFAULT_CLIENT}' keyword rules in {KEYWORD_RULES_FILE}")
+    for client, rule_set in rules.items():
+        unknown = [key for key in rule_set if key not in RULE_KEYS]
+        if unknown:
+            raise ValueError(f"Keyword rules '{client}': unknown keys {unknown}")
+    return rules
+
+
+_filters = {}
+
+
+def get_keyword_filter(client=None):
+    """Compiled filter of a client (default: KEYWORD_CLIENT), built once per process"""
+    client = client or KEYWORD_CLIENT
+    if client not in _filters:
+        rules = load_rules()
+        if client not in rules:
+            raise ValueError(f"Unknown keyword rules '{client}' (available: {', '.join(rules)})")
+        # Clients inherit every rule they do not set from the default rules
+        _filters[client] = KeywordFilter(dict(rules[DEFAULT_CLIENT], **rules[client]))
+    return _filters[client]
+
+
+if __name__ == "__main__":
+    # python keyword_filters.py export.csv [client] > filtered.csv
+    keyword_filter = get_keyword_filter(sys.argv[2] if len(sys.argv) > 2 else None)
+    with open(sys.argv[1], 'r', encoding='utf-8-sig') as file:
+        print("Keyword;Search Volume")
+        for phrase, volume in keyword_filter.filter_lines(file):
+            print(f"{phrase};{volume}")
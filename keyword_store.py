@@ -0,0 +1,219 @@
+"""
+Keyword Store
+SQLite knowledge base of all keyword research (KEYWORD_STORE, default
+runs/keywords.sqlite). Every SEMrush report that was fetched is recorded as a
+harvest (topic, law, report, seed, database, fetch date) with all its rows
+(phrase, volume, database, fetch date, source topic and, once the phrase
+was clustered, the cluster representative).
+
+Rows are stored unfiltered, client keyword rules are applied when reading.
+Three indexes answer lookups without a SEMrush call:
+
+    related  harvests of other topics citing the same law; topics on the
+             same or the next paragraph are neighbours ("§ 29a BtMG" and
+             "§ 30 BtMG" of "§ 29 BtMG", not "§ 263 StGB" of "§ 212 StGB")
+    token    single normalized words of a phrase, selects the neighbour
+             keywords that name the topic's own words ("29a")
+    prefix   normalized phrase ("btm str" -> "btm strafe", "btm strafen"),
+             see python generator.py --lookup
+
+A harvest is reused while it is younger than SEMRUSH_CACHE_TTL.
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from config import KEYWORD_STORE, SEMRUSH_CACHE_TTL
+from keyword_clusters import normalize
+
+# Frequent words of topics that say nothing about the offense
+STOPWORDS = {
+    "nach", "und", "oder", "der", "die", "das", "des", "den", "dem", "ein", "eine", "einer",
+    "von", "vom", "bei", "beim", "im", "in", "mit", "fuer", "zu", "zum", "zur", "wegen",
+    "gemaess", "abs", "absatz", "satz", "nr", "stgb",
+}
+
+# Paragraph number and letter suffix of a citation ("§ 29a" -> "29", "a")
+PARAGRAPH_NUMBER_RE = re.compile(r'§§?\s*(\d+)([a-z]?)', re.IGNORECASE)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS harvests (
+    id INTEGER PRIMARY KEY,
+    topic TEXT NOT NULL,
+    law TEXT,
+    report TEXT NOT NULL,
+    seed TEXT NOT NULL,
+    database TEXT NOT NULL,
+    fetched REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS harvests_request ON harvests (report, seed, database, fetched);
+CREATE INDEX IF NOT EXISTS harvests_law ON harvests (law, topic);
+
+CREATE TABLE IF NOT EXISTS keywords (
+    id INTEGER PRIMARY KEY,
+    harvest_id INTEGER NOT NULL REFERENCES harvests (id) ON DELETE CASCADE,
+    phrase TEXT NOT NULL,
+    normalized TEXT NOT NULL,
+    volume INTEGER NOT NULL,
+    database TEXT NOT NULL,
+    fetched REAL NOT NULL,
+    topic TEXT NOT NULL,
+    cluster TEXT
+);
+CREATE INDEX IF NOT EXISTS keywords_harvest ON keywords (harvest_id);
+CREATE INDEX IF NOT EXISTS keywords_normalized ON keywords (normalized);
+
+CREATE TABLE IF NOT EXISTS keyword_tokens (
+    token TEXT NOT NULL,
+    keyword_id INTEGER NOT NULL REFERENCES keywords (id) ON DELETE CASCADE,
+    PRIMARY KEY (token, keyword_id)
+) WITHOUT ROWID;
+"""
+
+
+def topic_tokens(topic, law=None):
+    """Distinctive words of a topic including paragraph numbers ("29a"), no stopwords or the law itself"""
+    skip = STOPWORDS | ({normalize(law)} if law else set())
+    return sorted({word for word in normalize(topic).split()
+                   if (len(word) > 2 or word[0].isdigit()) and word not in skip})
+
+
+def topic_paragraph(topic):
+    """Paragraph number a topic cites (29 for "§ 29a BtMG"), None without citation"""
+    match = PARAGRAPH_NUMBER_RE.search(topic)
+    return int(match.group(1)) if match else None
+
+
+def adjacent_paragraphs(topic, other):
+    """Same paragraph (any letter suffix, "§ 29" and "§ 29a") or the one before or after"""
+    paragraph, other_paragraph = topic_paragraph(topic), topic_paragraph(other)
+    return paragraph is not None and other_paragraph is not None and abs(paragraph - other_paragraph) <= 1
+
+
+class KeywordStore:
+    """SQLite keyword knowledge base, one connection shared by all threads of a process"""
+
+    def __init__(self, path=KEYWORD_STORE, ttl=SEMRUSH_CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Processes share the file, WAL lets readers continue while another process writes
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA foreign_keys=ON")
+        self._db.executescript(SCHEMA)
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def _oldest_fresh(self):
+        return time.time() - self.ttl
+
+    def record(self, topic, law, report, seed, database, rows):
+        """Store the rows of one fetched report, replacing older harvests of the same request"""
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM harvests WHERE report = ? AND seed = ? AND database = ? AND topic = ?",
+                             (report, seed, database, topic))
+            harvest_id = self._db.execute(
+                "INSERT INTO harvests (topic, law, report, seed, database, fetched) VALUES (?, ?, ?, ?, ?, ?)",
+                (topic, law, report, seed, database, now)).lastrowid
+            for phrase, volume in rows:
+                normalized = normalize(phrase)
+                keyword_id = self._db.execute(
+                    "INSERT INTO keywords (harvest_id, phrase, normalized, volume, database, fetched, topic) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (harvest_id, phrase, normalized, volume, database, now, topic)).lastrowid
+                self._db.executemany("INSERT OR IGNORE INTO keyword_tokens (token, keyword_id) VALUES (?, ?)",
+                                     [(token, keyword_id) for token in set(normalized.split())])
+
+    def harvested_rows(self, report, seed, database):
+        """
+        Rows of the newest fresh harvest of a request, whichever topic fetched it
+
+        Returns:
+            list of (phrase, volume), None if the request was not harvested
+            within the TTL
+        """
+        harvest = self._query(
+            "SELECT id FROM harvests WHERE report = ? AND seed = ? AND database = ? AND fetched >= ? "
+            "ORDER BY fetched DESC LIMIT 1", (report, seed, database, self._oldest_fresh()))
+        if not harvest:
+            return None
+        return self._query("SELECT phrase, volume FROM keywords WHERE harvest_id = ?", (harvest[0][0],))
+
+    def neighbour_rows(self, topic, law):
+        """
+        Fresh keywords of neighbouring topics (adjacent paragraphs of the same
+        law) that contain one of the topic's distinctive words (topic_tokens)
+
+        Returns:
+            (results, topics): results is a list of (database, [(phrase,
+            volume), ...]) like merge_keywords expects, topics the neighbours
+        """
+        topics = self.neighbour_topics(topic, law)
+        tokens = topic_tokens(topic, law)
+        if not topics or not tokens:
+            return [], topics
+        rows = self._query(
+            f"SELECT k.database, k.phrase, k.volume FROM keywords k JOIN harvests h ON h.id = k.harvest_id "
+            f"WHERE h.law = ? AND h.topic IN ({','.join('?' * len(topics))}) AND h.fetched >= ? "
+            f"AND EXISTS (SELECT 1 FROM keyword_tokens t WHERE t.keyword_id = k.id "
+            f"AND t.token IN ({','.join('?' * len(tokens))}))",
+            (law, *topics, self._oldest_fresh(), *tokens))
+        by_database = {}
+        for database, phrase, volume in rows:
+            by_database.setdefault(database, []).append((phrase, volume))
+        return list(by_database.items()), topics
+
+    def neighbour_topics(self, topic, law):
+        """Topics with fresh harvests on an adjacent paragraph of the same law, most recent first"""
+        if not law:
+            return []
+        return [other for other in self.related_topics(law, exclude=topic) if adjacent_paragraphs(topic, other)]
+
+    def related_topics(self, law, exclude=None):
+        """Topics with fresh harvests citing a law, most recent first"""
+        return [topic for topic, in self._query(
+            "SELECT topic FROM harvests WHERE law = ? AND topic != ? AND fetched >= ? "
+            "GROUP BY topic ORDER BY MAX(fetched) DESC", (law, exclude or "", self._oldest_fresh()))]
+
+    def lookup_prefix(self, prefix, limit=50):
+        """Known (phrase, volume) rows starting with a prefix, highest volume first"""
+        prefix = normalize(prefix)
+        return self._query(
+            "SELECT phrase, MAX(volume) AS volume FROM keywords WHERE normalized >= ? AND normalized < ? "
+            "GROUP BY normalized ORDER BY volume DESC LIMIT ?", (prefix, prefix + "\uffff", limit))
+
+    def assign_clusters(self, clusters):
+        """
+        Remember the cluster representative of every clustered keyword (see
+        keyword_clusters), the latest clustering a phrase took part in wins
+        """
+        with self._lock, self._db:
+            self._db.executemany(
+                "UPDATE keywords SET cluster = ? WHERE normalized = ?",
+                [(cluster["representative"], normalize(phrase))
+                 for cluster in clusters for phrase, _ in cluster["keywords"]])
+
+    def stats(self):
+        (harvests, topics), = self._query("SELECT COUNT(*), COUNT(DISTINCT topic) FROM harvests")
+        (keywords,), = self._query("SELECT COUNT(DISTINCT normalized) FROM keywords")
+        return {"harvests": harvests, "topics": topics, "keywords": keywords}
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_keyword_store():
+    """Process-wide keyword store"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = KeywordStore()
+        return _store
@@ -0,0 +1,223 @@
+"""
+Claude Text Generation
+Single entry point for Claude calls. Every request goes through the shared
+rate limiter, which reserves budget, reads the rate-limit headers and retries
+with backoff. Identical requests are answered from the response cache, and
+requests that cannot fit the context window are rejected before they are
+sent (see token_budget).
+
+Prompts are split into a static system prefix (instructions, tone reference,
+intro example) and a dynamic user message (topic, outline, text). The
+prefix is marked for Anthropic prompt caching, so repeated instruction
+blocks are read from the provider cache instead of being processed again.
+A prefix given as a list of parts gets one cache breakpoint per part, so
+stages that open with the same part share its cache entry.
+usage_stats() reports the cache reads per stage.
+
+The model of a request follows its stage (see model_routing). The pipeline
+sets stage_settings for each stage task, so a profile can change model,
+temperature, max_tokens or caching of every call a stage makes.
+
+Streamed responses report progress to stream_listener (set per article run)
+while they are written. Responses that stop at max_tokens or break off
+mid-stream are continued from their last clean boundary (see continuation).
+
+In bulk mode (message_batches.BatchCollector active) requests are queued into
+message batches instead of being sent one by one; streaming is not used there.
+"""
+import contextvars
+import threading
+import rate_limiter
+import token_budget
+from continuation import (MAX_CONTINUATIONS, TextDelivery, clean_boundary, continuation_params,
+                          splice)
+from message_batches import active_collector
+from model_routing import model_for_stage
+from response_cache import get_cache, make_key
+from streaming import StreamCollector
+from clients import get_async_claude_client
+
+# Overrides ("model", "temperature", "max_tokens", "cache") for the current stage task
+stage_settings = contextvars.ContextVar("stage_settings", default={})
+
+# Callback(progress dict) for streamed responses, see streaming.StreamCollector.progress
+stream_listener = contextvars.ContextVar("stream_listener", default=None)
+
+USAGE_FIELDS = ("requests", "input_tokens", "cache_read_input_tokens", "cache_creation_input_tokens",
+                "output_tokens", "first_token_seconds", "streamed_requests")
+
+_usage = {}
+_usage_lock = threading.Lock()
+
+
+def _record_usage(stage, usage, first_token_seconds=None):
+    with _usage_lock:
+        stats = _usage.setdefault(stage, dict.fromkeys(USAGE_FIELDS, 0))
+        stats["requests"] += 1
+        for field in ("input_tokens", "cache_read_input_tokens", "cache_creation_input_tokens", "output_tokens"):
+            stats[field] += getattr(usage, field, None) or 0
+        if first_token_seconds is not None:
+            stats["first_token_seconds"] += first_token_seconds
+            stats["streamed_requests"] += 1
+
+
+def usage_stats():
+    """
+    Token usage per stage since process start
+
+    Returns:
+        dict: stage -> counters plus "cache_read_share" (share of prompt
+              tokens read from the prompt cache) and "avg_first_token_seconds"
+              (streamed requests only)
+    """
+    with _usage_lock:
+        stages = {stage: dict(stats) for stage, stats in _usage.items()}
+    for stats in stages.values():
+        prompt_tokens = (stats["input_tokens"] + stats["cache_read_input_tokens"]
+                         + stats["cache_creation_input_tokens"])
+        stats["cache_read_share"] = stats["cache_read_input_tokens"] / prompt_tokens if prompt_tokens else 0.0
+        stats["avg_first_token_seconds"] = (stats["first_token_seconds"] / stats["streamed_requests"]
+                                            if stats["streamed_requests"] else None)
+    return stages
+
+
+def format_usage_stats():
+    """One line per stage for logs and summaries"""
+    lines = []
+    for stage, stats in usage_stats().items():
+        line = (f"{stage}: {stats['requests']} Anfragen, {stats['input_tokens']:,} Input-Tokens, "
+                f"{stats['cache_read_input_tokens']:,} aus Prompt-Cache ({stats['cache_read_share']:.0%}), "
+                f"{stats['output_tokens']:,} Output-Tokens")
+        if stats["avg_first_token_seconds"] is not None:
+            line += f", erstes Token nach {stats['avg_first_token_seconds']:.1f}s"
+        lines.append(line)
+    return lines
+
+
+async def complete(prompt, max_tokens, temperature, stream=False, stage="default", system=None,
+                   expected_tokens=None, on_text=None, model=None):
+    """
+    Send a single-turn prompt to Claude and return the response text
+
+    Args:
+        prompt: User message (the parts that change per request)
+        max_tokens: Output token limit
+        temperature: Sampling temperature
+        stream: Stream the response (needed for long outputs)
+        stage: Pipeline stage name, part of the cache key and used for
+               per-stage cache opt-out and hit/miss counters
+        system: Static instructions sent as a prompt-cached system prefix,
+                or a list of parts sent as separate cached blocks, so
+                requests sharing the first part share its cache entry
+        expected_tokens: Expected output size, used for the ETA of stream progress
+        on_text: Optional coroutine function awaited with the streamed text,
+                 paragraph by paragraph (with the whole text for cached,
+                 batched and non-streamed responses). Consumers never see
+                 text twice, also across continuations.
+        model: Claude model id, overrides the profile setting and the stage
+               routing (see model_routing)
+
+    Returns:
+        str: Generated text (not stripped)
+
+    Raises:
+        TokenBudgetExceeded: Prompt plus max_tokens do not fit the context window
+    """
+    overrides = stage_settings.get()
+    model = model or overrides.get("model") or model_for_stage(stage)
+    max_tokens = overrides.get("max_tokens") or max_tokens
+    temperature = overrides.get("temperature", temperature)
+    system_parts = [system] if isinstance(system, str) else list(system or [])
+    input_tokens = token_budget.prompt_tokens(prompt, "".join(system_parts))
+    token_budget.check(input_tokens, max_tokens, stage)
+
+    cache = get_cache()
+    use_cache = overrides.get("cache", True) and cache.enabled_for(stage)
+    if use_cache:
+        key = make_key(kind="claude", model=model, system=system, prompt=prompt, temperature=temperature,
+                       max_tokens=max_tokens, stage=stage)
+        cached = cache.get(key, stage)
+        if cached is not None:
+            if on_text is not None:
+                await on_text(cached)
+            return cached
+
+    params = {
+        "model": model,
+        "max_tokens": max_tokens,
+        "temperature": temperature,
+        "messages": [{"role": "user", "content": prompt}],
+    }
+    if system_parts:
+        # Prefixes below the model's minimum cacheable length are simply not cached
+        params["system"] = [{"type": "text", "text": part, "cache_control": {"type": "ephemeral"}}
+                            for part in system_parts]
+
+    collector = active_collector.get()
+    chunks = StreamCollector(stage, stream_listener.get(), expected_tokens) if stream and collector is None else None
+    delivery = TextDelivery(on_text)
+
+    async def request(request_params, kept):
+        """One Messages API call: ((text, stop_reason, error), headers, usage)"""
+        client = get_async_claude_client()
+        first_token_seconds = None
+        if chunks is not None:
+            chunks.restart(kept)
+            delivery.restart(kept)
+            received = []
+            try:
+                async with client.messages.stream(**request_params) as message_stream:
+                    async for text in message_stream.text_stream:
+                        chunks.add(text)
+                        received.append(text)
+                        await delivery.add(text)
+                    message = await message_stream.get_final_message()
+                    headers = message_stream.response.headers
+            except Exception as e:
+                if not received:
+                    raise
+                # Not retried from scratch: the continuation only asks for the missing tail
+                return ("".join(received), None, e), None, None
+            result = "".join(received)
+            first_token_seconds = chunks.first_token_seconds
+        else:
+            raw = await client.messages.with_raw_response.create(**request_params)
+            message = await raw.parse()
+            headers = raw.headers
+            result = message.content[0].text
+        _record_usage(stage, message.usage, first_token_seconds)
+        # Cache writes count against the input budget, cache reads do not
+        input_tokens = message.usage.input_tokens + (getattr(message.usage, "cache_creation_input_tokens", None) or 0)
+        usage = (input_tokens, message.usage.output_tokens)
+        return (result, message.stop_reason, None), headers, usage
+
+    kept = ""
+    for continuation in range(MAX_CONTINUATIONS + 1):
+        request_params = continuation_params(params, kept) if kept else params
+        request_tokens = input_tokens + (token_budget.prompt_tokens(kept) if kept else 0)
+        token_budget.check(request_tokens, max_tokens, stage)
+        if collector is not None:
+            message = await collector.submit(request_params)
+            _record_usage(stage, message.usage)
+            text, stop_reason, error = message.content[0].text, message.stop_reason, None
+        else:
+            text, stop_reason, error = await rate_limiter.call(
+                "anthropic", model, lambda: request(request_params, kept), input_tokens=request_tokens)
+        result = splice(kept, text) if kept else text
+        if error is None and stop_reason != "max_tokens":
+            break
+
+        boundary = clean_boundary(result)
+        if continuation == MAX_CONTINUATIONS or boundary <= len(kept):
+            if error is not None:
+                raise RuntimeError(f"Stream interrupted after {len(result)} characters: {error}") from error
+            print(f"[WARN] {stage}: Antwort auch nach {continuation} Fortsetzungen bei max_tokens abgeschnitten")
+            break
+        reason = "max_tokens erreicht" if error is None else f"Stream abgebrochen ({type(error).__name__})"
+        print(f"[WARN] {stage}: {reason} nach {len(result):,} Zeichen - setze ab Zeichen {boundary:,} fort")
+        kept = result[:boundary]
+
+    await delivery.finish(result)
+    if use_cache:
+        cache.put(key, result, stage)
+    return result
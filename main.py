@@ -1,16 +1,26 @@
-import os
 from dotenv import load_dotenv
-import anthropic
-import time
-import requests
+import asyncio
+import math
+import sys
+import llm
+import model_routing
+import rate_limiter
+import token_budget
+from token_budget import TOKENS_PER_WORD
 from urllib.parse import urlparse
-from generator import get_seo_keywords_for_topic
+from generator import get_seo_keywords_for_topic_async
+from pipeline import Stage, mark_degraded, run_stages
+from sections import (parse_outline, format_part, remove_duplicate_paragraphs, chunk_article, headings,
+                      SectionStream, MAX_CHUNK_CHARS)
+from edits import parse_edits, resolve_edits, apply_changes, format_change, locked_matches, LEGAL_PATTERNS
+from config import VERIFICATION_MODE, SEO_MODE
+from profiles import get_profile, resolve_settings, profile_names, DEFAULT_PROFILE
+from checkpoints import RunCheckpoint, new_run_id, list_runs
 from prompts_and_texts import REFERENCE_TONE_TEXT, CLIENT_INTRO_EXAMPLE
-from pick_strongest_model import pick_strongest_model
+from clients import get_http_session
+from aio import run_sync, run_sync_with_events
 
 load_dotenv()
-client = anthropic.Anthropic(api_key=os.getenv("CLAUDE_API_KEY"))
-CLAUDE_MODEL = pick_strongest_model(client)
 # Global variables to store reference data and SEO data
 reference_information = None
 reference_style = REFERENCE_TONE_TEXT  # Hardcoded reference tone
@@ -42,26 +52,48 @@ def ask_for_reference_inputs():
     
     return ref_info_source
 
-def fetch_reference_information(source):
+def ask_for_profile():
+    """Ask which pipeline profile to run"""
+    names = profile_names()
+    print("\n--- Pipeline-Profil ---")
+    for name in names:
+        print(f"  {name}: {get_profile(name)['description']}")
+    profile = input(f"Profil wählen ({'/'.join(names)}) [{DEFAULT_PROFILE}]: ").strip() or DEFAULT_PROFILE
+    if profile not in names:
+        print(f"Unbekanntes Profil '{profile}', verwende '{DEFAULT_PROFILE}'")
+        profile = DEFAULT_PROFILE
+    return profile
+
+def _read_text_file(path):
+    with open(path, 'r', encoding='utf-8') as file:
+        return file.read()
+
+async def fetch_reference_information_async(source):
     """Fetch reference information from URL or file path"""
     try:
         # Check if it's a URL
         parsed = urlparse(source)
         if parsed.scheme in ['http', 'https']:
             print("Lade Referenz-Information von URL...")
-            response = requests.get(source, timeout=10)
+            response = await asyncio.to_thread(get_http_session().get, source, timeout=10)
             response.raise_for_status()
             return response.text
         else:
             # Treat as file path
             print("Lade Referenz-Information aus Datei...")
-            with open(source, 'r', encoding='utf-8') as file:
-                return file.read()
+            return await asyncio.to_thread(_read_text_file, source)
     except Exception as e:
         print(f"Fehler beim Laden der Referenz-Information: {e}")
         return None
 
-def analyze_reference_information(content, topic):
+async def load_reference_information_async(source, topic):
+    """Fetch reference information and extract what is relevant for the topic"""
+    content = await fetch_reference_information_async(source)
+    if not content:
+        return None
+    return await analyze_reference_information_async(content, topic)
+
+async def analyze_reference_information_async(content, topic):
     """Analyze content to extract only relevant legal information for a specific topic"""
     if not content:
         return None
@@ -92,20 +124,15 @@ Gib NUR die relevanten Rechtsinformationen zurück, die für das Schreiben von R
 """
     
     try:
-        response = client.messages.create(
-            model=CLAUDE_MODEL,
-            max_tokens=2000,
-            temperature=0.2,
-            messages=[{"role": "user", "content": prompt}]
-        )
-        return response.content[0].text.strip()
+        result = await llm.complete(prompt, max_tokens=2000, temperature=0.2,
+                                    stage="reference_information")
+        return result.strip()
     except Exception as e:
         print(f"Fehler bei der Informationsanalyse: {e}")
         return None
 
-def generate_outline(topic):
-    """Generate comprehensive outline focused purely on legal content - NO SEO keywords"""
-    base_prompt = f"""
+def _outline_prompt(topic):
+    return f"""
 Du bist ein erfahrener Anwalt und SEO-Experte. Erstelle eine vollständige Gliederung mit H1- und H2-Überschriften zu dem Thema "{topic}".
 
 Die Gliederung muss relevanten juristischen Aspekte enthalten, die ein Mandant wissen muss oder wonach er suchen könnte.
@@ -126,36 +153,48 @@ Beispiel:
 # Hauptthema 2
 ## Unterthema 2.1
 """
-    
-    response = client.messages.create(
-        model=CLAUDE_MODEL,
-        max_tokens=2500,
-        temperature=0.4,
-        messages=[{"role": "user", "content": base_prompt}]
-    )
-    return response.content[0].text.strip()
 
-def generate_complete_content(topic, outline, target_length=None):
-    """Generate complete informational content - NO SEO integration here"""
-    
-    base_prompt = f"""
-Du bist ein professioneller SEO- und Rechtstext-Autor, spezialisiert auf Strafrecht. 
-Schreibe einen informativen, überzeugenden Text zu dem Thema "{topic}".
+# Output limits of requests whose answer does not grow with the article
+OUTLINE_MAX_TOKENS = 2500
+LEGAL_REVIEW_MAX_TOKENS = 4000
+SEO_EDITS_MAX_TOKENS = 6000
 
-Verwende folgende Gliederung:
-{outline}
-"""
-    
-    # Only add length instruction if user specified one
-    if target_length:
-        length_guides = {
-            "short": "LÄNGE: Maximal 1500-2000 Wörter. Konzentriere dich auf das Wesentliche.",
-            "medium": "LÄNGE: Etwa 2500-3500 Wörter. Ausgewogene Tiefe und Übersichtlichkeit.",
-            "long": "LÄNGE: Etwa 4000-5000 Wörter. Umfassende und detaillierte Behandlung."
-        }
-        base_prompt += f"\n{length_guides.get(target_length, '')}\n"
-    
-    base_prompt += f"""
+async def generate_outline_async(topic):
+    """Generate comprehensive outline focused purely on legal content - NO SEO keywords"""
+    result = await llm.complete(_outline_prompt(topic), max_tokens=OUTLINE_MAX_TOKENS,
+                                temperature=0.4, stage="outline")
+    return result.strip()
+
+LENGTH_GUIDES = {
+    "short": "LÄNGE: Maximal 1500-2000 Wörter. Konzentriere dich auf das Wesentliche.",
+    "medium": "LÄNGE: Etwa 2500-3500 Wörter. Ausgewogene Tiefe und Übersichtlichkeit.",
+    "long": "LÄNGE: Etwa 4000-5000 Wörter. Umfassende und detaillierte Behandlung."
+}
+
+# Target word counts used to split the length across sections
+LENGTH_WORDS = {"short": 1750, "medium": 3000, "long": 4500}
+
+# Drafts without a length setting are budgeted like long articles
+DEFAULT_DRAFT_WORDS = LENGTH_WORDS["long"]
+
+def target_words(target_length):
+    """Word count of a length setting ("short", "medium", "long" or a number of words), None without one"""
+    if target_length in LENGTH_WORDS:
+        return LENGTH_WORDS[target_length]
+    if isinstance(target_length, int) and target_length > 0:
+        return target_length
+    return None
+
+def length_guide(target_length):
+    """Length instruction of the draft prompt ("" without a length setting)"""
+    if target_length in LENGTH_GUIDES:
+        return LENGTH_GUIDES[target_length]
+    words = target_words(target_length)
+    return f"LÄNGE: Etwa {words} Wörter." if words else ""
+
+def _writing_requirements():
+    """Content, focus and style rules shared by full and section drafts"""
+    return """
 Anforderungen:
 - Juristisch korrekt und vollständig
 - Alle relevanten Paragraphen und Gesetze nennen
@@ -165,148 +204,332 @@ Anforderungen:
 - Informiere Betroffene und zeige den Wert professioneller Verteidigung
 
 FOKUS & RELEVANZ:
-- Bleibe STRENG beim Thema "{topic}" - keine allgemeinen Rechtsbelehrungen
+- Bleibe STRENG beim Thema des Artikels - keine allgemeinen Rechtsbelehrungen
 - Vermeide generische Verteidigungsstrategien, die für jedes Delikt gelten
 - Keine Abschnitte über allgemeine Rechtfertigungsgründe (Notwehr, Notstand) - diese gehören auf eigene Seiten
-- KEIN generischer "Anwalt-Bot-Content" - alles muss spezifisch für "{topic}" sein
-- Google-Bot-Optimierung: Jeder Absatz muss direkt mit "{topic}" zu tun haben
+- KEIN generischer "Anwalt-Bot-Content" - alles muss spezifisch für das Thema sein
+- Google-Bot-Optimierung: Jeder Absatz muss direkt mit dem Thema zu tun haben
 
 Stil: Sachlich, fachkompetent, ultra ansprechend. 
 Verwende gelegentlich "wir"-Formulierungen (z.B. "Wir helfen Ihnen", "Gemeinsam entwickeln wir Ihre Verteidigung").
 Vermeide akademische Ausschweifungen und Redundanz.
 """
 
-    global reference_information, reference_style
-    
-    if reference_information:
-        base_prompt += f"""
+def _reference_block(reference_info):
+    if not reference_info:
+        return ""
+    return f"""
 Berücksichtige diese relevanten Rechtsinformationen, aber beschränke dich nicht darauf:
-{reference_information}
+{reference_info}
 """
 
-    # Client intro instruction
-    base_prompt += f"""
-EINLEITUNG: Beginne den Artikel mit einer empathischen Mandanten-Einleitung nach diesem Muster (als INSPIRATION, nicht zum Kopieren):
+def _intro_instruction():
+    return f"""
+EINLEITUNG (wenn du den Artikel oder seine Einleitung schreibst): Beginne mit einer empathischen Mandanten-Einleitung nach diesem Muster (als INSPIRATION, nicht zum Kopieren):
 {CLIENT_INTRO_EXAMPLE}
-Schreibe eine ähnliche Einleitung für das Thema "{topic}". Passe alle Details an (Delikt, Paragraphen, spezifische Situation), variiere die Formulierungen und Struktur.
+Schreibe eine ähnliche Einleitung für das Thema des Artikels. Passe alle Details an (Delikt, Paragraphen, spezifische Situation), variiere die Formulierungen und Struktur.
 """
 
+def _tone_block():
     # Reference style is always available (hardcoded)
-    base_prompt += f"""
+    return f"""
 TONALITÄT: Orientiere dich am Ton und Schreibstil des folgenden Referenztextes. Übernimm NUR den Ton und Stil, NICHT die rechtlichen Inhalte, weil es um ein anderes Thema da geht.
 REFERENZTEXT:
 {reference_style}
+"""
+
+def _house_style():
+    """
+    Stable system prefix of every text stage (draft, verification, SEO,
+    humanization): only what applies to all of them, the tone reference.
+    Stage rules such as the drafting requirements follow in the stage's own
+    block. Behind this prefix the short stage instructions reach the
+    1024-token minimum for prompt caching.
+    """
+    return f"""HAUSSTIL: Alle Texte sind Rechtsartikel einer Strafrechtskanzlei für Betroffene und Mandanten.
+{_tone_block()}"""
+
+def _stage_system(instructions):
+    """System prompt of a text stage: the shared house style, then the stage's own instructions"""
+    return [_house_style(), instructions]
+
+def _draft_system():
+    """Static prefix of every drafting prompt, kept identical across topics for prompt caching"""
+    return _stage_system(f"""Du bist ein professioneller SEO- und Rechtstext-Autor, spezialisiert auf Strafrecht.
+{_writing_requirements()}{_intro_instruction()}""")
+
+async def generate_complete_content_async(topic, outline, target_length=None, reference_info=None,
+                                          parallel_sections=False, on_text=None):
+    """
+    Generate complete informational content - NO SEO integration here
+    
+    on_text (coroutine function) receives the draft while it streams, see
+    pipelined_article_async
+    """
+    
+    global reference_information, reference_style
+    
+    if reference_info is None:
+        reference_info = reference_information
+    
+    if parallel_sections:
+        try:
+            result = await generate_sectioned_content_async(topic, outline, target_length, reference_info)
+            if result:
+                return result
+            print("[INFO] Gliederung hat nur einen Abschnitt - verwende Einzel-Generierung")
+        except Exception as e:
+            print(f"[ERROR] Section drafting failed, falling back to single request: {e}")
+    
+    base_prompt = f"""
+Schreibe einen informativen, überzeugenden Text zu dem Thema "{topic}".
+Jeder Absatz muss direkt mit "{topic}" zu tun haben.
+
+Verwende folgende Gliederung:
+{outline}
 """
     
-    # Use streaming to show progress
+    # Only add length instruction if user specified one
+    words = target_words(target_length)
+    if words:
+        base_prompt += f"\n{length_guide(target_length)}\n"
+    
+    base_prompt += _reference_block(reference_info)
+    max_tokens = token_budget.for_words(words or DEFAULT_DRAFT_WORDS)
+    
+    # Use streaming to show progress; truncated or interrupted streams are continued by llm.complete
     print("Starte Content-Generierung mit Streaming...")
     try:
-        with client.messages.stream(
-            model=CLAUDE_MODEL,
-            max_tokens=15000,
-            temperature=0.4,
-            messages=[{"role": "user", "content": base_prompt}]
-        ) as stream:
-            result = ""
-            char_count = 0
-            for text in stream.text_stream:
-                result += text
-                char_count += len(text)
-                # Print progress every 1000 characters
-                if char_count % 1000 == 0:
-                    print(f"  ... {char_count} Zeichen generiert")
-        
-        print(f"✅ Content-Generierung abgeschlossen: {len(result)} Zeichen")
-        return result.strip()
-        
+        result = await llm.complete(base_prompt, max_tokens=max_tokens, temperature=0.4, stream=True,
+                                    stage="draft", system=_draft_system(),
+                                    expected_tokens=words * TOKENS_PER_WORD if words else None, on_text=on_text)
     except Exception as e:
         print(f"[ERROR] Content generation failed: {e}")
-        # Fallback to non-streaming if streaming fails
-        response = client.messages.create(
-            model=CLAUDE_MODEL,
-            max_tokens=20000,
-            temperature=0.4,
-            messages=[{"role": "user", "content": base_prompt}]
-        )
-        return response.content[0].text.strip()
-    
-def verify_and_fix_legal_content(content, topic):
-    """Verify legal accuracy and fix any errors found"""
+        raise
     
-    print("Prüfe rechtliche Korrektheit und behebe Fehler...")
+    print(f"✅ Content-Generierung abgeschlossen: {len(result)} Zeichen")
+    return result.strip()
+
+async def _draft_intro_async(topic, outline):
+    """Client intro for a section-drafted article"""
+    prompt = f"""
+Schreibe NUR die Einleitung eines Artikels zum Thema "{topic}" (ca. 120-200 Wörter, ohne Überschrift).
+
+Der Artikel folgt dieser Gliederung:
+{outline}
+
+Gib NUR die Einleitung zurück:
+"""
+    result = await llm.complete(prompt, max_tokens=1500, temperature=0.4, stage="draft",
+                                system=_draft_system())
+    return result.strip()
+
+async def _draft_section_async(topic, outline, parts, index, words, reference_info):
+    """Draft one outline part, knowing what the neighbouring parts cover"""
+    part = parts[index]
+    previous_part = format_part(parts[index - 1]) if index > 0 else "- (dein Abschnitt ist der erste)"
+    next_part = format_part(parts[index + 1]) if index + 1 < len(parts) else "- (dein Abschnitt ist der letzte)"
+    length = f"LÄNGE: Etwa {words} Wörter für diesen Abschnitt.\n" if words else ""
     
     prompt = f"""
-Deine Aufgabe: Prüfe diesen rechtlichen Text zum Thema "{topic}" auf Fehler und korrigiere sie DIREKT im Text.
+Mehrere Autoren schreiben gleichzeitig je einen Abschnitt eines Artikels zum Thema "{topic}".
 
-TEXT:
-{content}
+GESAMTGLIEDERUNG:
+{outline}
+
+DEIN ABSCHNITT (schreibe NUR diesen, mit genau diesen Überschriften):
+{format_part(part)}
+
+VORHERIGER ABSCHNITT (schreibt ein Kollege - Inhalte NICHT wiederholen):
+{previous_part}
+
+NÄCHSTER ABSCHNITT (schreibt ein Kollege - Inhalte NICHT vorwegnehmen):
+{next_part}
+
+{length}{_reference_block(reference_info)}
+KEINE Einleitung und KEIN Fazit für den Gesamtartikel - die Mandanten-Einleitung wird separat geschrieben.
+Jeder Absatz muss direkt mit "{topic}" zu tun haben.
+
+Gib NUR deinen Abschnitt in Markdown zurück, beginnend mit seiner ersten Überschrift:
+"""
+    # Without a length setting a section is budgeted like half a default article
+    result = await llm.complete(prompt, max_tokens=token_budget.for_words(words or DEFAULT_DRAFT_WORDS // 2),
+                                temperature=0.4, stream=True, stage="draft", system=_draft_system(),
+                                expected_tokens=words * TOKENS_PER_WORD if words else None)
+    return result.strip()
 
-KRITISCHE PRÜFPUNKTE FÜR "{topic}":
+async def generate_sectioned_content_async(topic, outline, target_length=None, reference_info=None):
+    """
+    Draft every H1 section (or group of H2s) concurrently and stitch the article
+    
+    Returns:
+        str: Intro followed by all sections in outline order, or None if the
+             outline has fewer than two parts
+    """
+    parts = parse_outline(outline)
+    if len(parts) < 2:
+        return None
+    
+    words = target_words(target_length) // len(parts) if target_words(target_length) else None
+    print(f"Starte parallele Content-Generierung ({len(parts)} Abschnitte + Einleitung)...")
+    
+    intro, *section_texts = await asyncio.gather(
+        _draft_intro_async(topic, outline),
+        *[_draft_section_async(topic, outline, parts, i, words, reference_info) for i in range(len(parts))]
+    )
+    
+    section_texts, removed = remove_duplicate_paragraphs(section_texts)
+    if removed:
+        print(f"[INFO] {removed} doppelte Absätze zwischen Abschnitten entfernt")
+    
+    result = "\n\n".join([intro] + section_texts)
+    print(f"✅ Content-Generierung abgeschlossen: {len(result)} Zeichen")
+    return result
+    
+VERIFICATION_CHECKLIST = """
+Deine Aufgabe: Prüfe Ausschnitte rechtlicher Artikel auf Fehler. Jeder Ausschnitt gehört zu einem Artikel über ein bestimmtes Thema; andere Abschnitte des Artikels werden separat geprüft.
+
+KRITISCHE PRÜFPUNKTE:
 
 1. PARAGRAPHEN & GESETZE:
    - Falsche oder nicht existierende Paragraphen
-   - Falsche Zuordnungen zum Thema "{topic}"
+   - Falsche Zuordnungen zum Thema des Artikels
 
-2. RECHTLICHE DEFINITIONEN ZU "{topic}":
+2. RECHTLICHE DEFINITIONEN ZUM THEMA:
    - Unvollständige oder unpräzise Definitionen
    - Fehlende Tatbestandsmerkmale
 
 3. STRAFMASSE & RECHTSFOLGEN:
-   - Falsche Mindest- oder Höchststrafen bei "{topic}"
+   - Falsche Mindest- oder Höchststrafen
    - Fehlende Qualifikationen oder minder schwere Fälle
 
 4. IRRELEVANTER INHALT:
-   - Entferne Abschnitte ohne direkten Bezug zu "{topic}"
+   - Entferne Abschnitte ohne direkten Bezug zum Thema
    - Streiche Wiederholungen
 
 WENN UNSICHER → LÖSCHEN
 - Bei zweifelhafter Korrektheit → ENTFERNEN
-- Bei fehlendem Bezug zu "{topic}" → ENTFERNEN
+- Bei fehlendem Bezug zum Thema → ENTFERNEN
 - Grundregel: Lieber löschen als Fehler stehen lassen
 
 NICHT ÄNDERN:
 - Stil und Tonalität
-- Korrekte Inhalte zu "{topic}"
+- Korrekte Inhalte zum Thema
+- Überschriften des Ausschnitts und Überleitungen zu anderen Abschnitten des Artikels
+"""
+
+VERIFICATION_REWRITE_FORMAT = """
+AUSGABE: Korrigiere die Fehler DIREKT im Text und gib nur den korrigierten Ausschnitt zurück.
+"""
+
+VERIFICATION_EDIT_FORMAT = """
+AUSGABE: Gib NICHT den ganzen Text zurück, sondern NUR eine Liste der nötigen Korrekturen als JSON-Array:
+[
+  {"action": "replace", "find": "exakter Originaltext", "replace": "korrigierter Text", "reason": "kurze Begründung"},
+  {"action": "delete", "find": "exakter Originaltext", "reason": "kurze Begründung"}
+]
+
+REGELN:
+- "find" wird wörtlich aus dem AUSSCHNITT kopiert und kommt dort genau einmal vor
+- "find" so kurz wie möglich, aber eindeutig (z.B. der Satz mit dem falschen Paragraphen)
+- Ganze irrelevante Absätze mit "delete" entfernen
+- Keine Korrekturen nötig → []
+"""
+
+def _verification_context(topic, chunk, article_headings, reference_info):
+    return f"""
+Prüfe diesen Ausschnitt eines rechtlichen Artikels zum Thema "{topic}" auf Fehler.
 
-Gib nur den korrigierten Text zurück:
+AUFBAU DES GESAMTARTIKELS (andere Abschnitte werden separat geprüft):
+{chr(10).join(article_headings)}
+{_reference_block(reference_info)}
+AUSSCHNITT:
+{chunk}
 """
+
+async def _rewrite_chunk_async(chunk, topic, article_headings, reference_info):
+    """Rewrite mode: the model returns the corrected chunk"""
+    prompt = _verification_context(topic, chunk, article_headings, reference_info) + """
+Gib nur den korrigierten Ausschnitt zurück:
+"""
+    result = await llm.complete(prompt, max_tokens=token_budget.for_rewrite(chunk),
+                                temperature=0.3, stream=True,
+                                stage="legal_review",
+                                system=_stage_system(VERIFICATION_CHECKLIST + VERIFICATION_REWRITE_FORMAT),
+                                expected_tokens=rate_limiter.estimate_tokens(chunk))
+    return [{"action": "replace", "find": chunk.strip(), "replace": result.strip(),
+             "reason": "Abschnitt neu geschrieben"}]
+
+async def _edit_chunk_async(chunk, topic, article_headings, reference_info):
+    """Edit mode: the model returns only the corrections"""
+    prompt = _verification_context(topic, chunk, article_headings, reference_info) + """
+Gib NUR das JSON-Array zurück:
+"""
+    result = await llm.complete(prompt, max_tokens=LEGAL_REVIEW_MAX_TOKENS, temperature=0.3,
+                                stage="legal_review",
+                                system=_stage_system(VERIFICATION_CHECKLIST + VERIFICATION_EDIT_FORMAT))
+    return parse_edits(result)
+
+async def _review_chunk_async(chunk, offset, topic, article_headings, reference_info):
+    """Corrections for one chunk, positioned in the full article (none if the request fails)"""
+    if not chunk.strip():
+        return []
     
+    review = _rewrite_chunk_async if VERIFICATION_MODE == "rewrite" else _edit_chunk_async
     try:
-        print("Starte rechtliche Prüfung (Streaming)...")
-        with client.messages.stream(
-            model=CLAUDE_MODEL,
-            max_tokens=30000,
-            temperature=0.3,
-            messages=[{"role": "user", "content": prompt}]
-        ) as stream:
-            result = ""
-            for text in stream.text_stream:
-                result += text
-        
-        print(f"✅ Rechtliche Prüfung abgeschlossen (Länge: {len(result)} Zeichen)")
-        return result.strip()
-        
+        raw_edits = await review(chunk, topic, article_headings, reference_info)
     except Exception as e:
-        print(f"[ERROR] Verification failed: {e}")
-        return content
-
+        print(f"[ERROR] Verification of chunk failed, keeping original: {e}")
+        # The article goes on unchecked in this chunk, the stage gets no checkpoint
+        mark_degraded(f"Abschnitt ab Zeichen {offset} ungeprüft ({type(e).__name__})")
+        return []
+    
+    changes, rejected = resolve_edits(chunk, raw_edits, offset)
+    for edit in rejected:
+        print(f"[WARN] Korrektur verworfen ({edit['error']}): {str(edit.get('find', ''))[:80]}")
+    return changes
 
-def rework_complete_content(corrected_content, topic, keywords):
-    """Integrate SEO keywords into legally-correct content"""
-    print(f"Starte SEO-Integration mit {len(keywords) if keywords else 0} Keywords...")
+async def find_legal_errors_async(content, topic, reference_info=None):
+    """
+    Review the article for legal errors, one chunk of sections at a time
     
-    if not keywords:
-        return corrected_content
+    Returns:
+        list: Changes (start, end, old, new, reason) for apply_legal_fixes_async
+    """
+    if reference_info is None:
+        reference_info = reference_information
     
-    # Add rate limiting delay
-    time.sleep(3)
-    print(f"Keywords to integrate: {keywords}")
-    keywords_text = ", ".join(keywords)
+    chunks = chunk_article(content)
+    print(f"Prüfe rechtliche Korrektheit ({len(chunks)} Abschnitte parallel, Modus: {VERIFICATION_MODE})...")
     
-    prompt = f"""
-Du bist SEO-Experte. Integriere Keywords NATÜRLICH in diesen KORREKTEN rechtlichen Text.
+    offsets = [0]
+    for chunk in chunks[:-1]:
+        offsets.append(offsets[-1] + len(chunk))
+    article_headings = headings(content)
+    results = await asyncio.gather(*[
+        _review_chunk_async(chunk, offset, topic, article_headings, reference_info)
+        for chunk, offset in zip(chunks, offsets)
+    ])
+    
+    changes = [change for chunk_changes in results for change in chunk_changes]
+    print(f"✅ Rechtliche Prüfung abgeschlossen ({len(changes)} Korrekturen)")
+    return changes
+
+async def apply_legal_fixes_async(content, changes):
+    """Apply the corrections found by find_legal_errors_async"""
+    return apply_changes(content, changes).strip()
+
+async def verify_and_fix_legal_content_async(content, topic, reference_info=None):
+    """Verify legal accuracy and fix any errors found"""
+    changes = await find_legal_errors_async(content, topic, reference_info)
+    return await apply_legal_fixes_async(content, changes)
 
-KEYWORDS für "{topic}": {keywords_text}
+
+# SEO rewrites come back longer than their input (added keyword sentences and lists)
+SEO_GROWTH = 1.15
+
+SEO_INSTRUCTIONS = """
+Du bist SEO-Experte. Integriere die angegebenen KEYWORDS NATÜRLICH in einen KORREKTEN rechtlichen Text.
 
 WICHTIG - NICHT ÄNDERN:
 - Rechtliche Fakten
@@ -328,41 +551,80 @@ VERMEIDE:
 - Zu viel Fettdruck (maximal 3-5 Stellen im gesamten Text)
 
 Der rechtliche Inhalt muss identisch bleiben!
+"""
+
+SEO_EDIT_FORMAT = """
+AUSGABE: Gib NICHT den ganzen Text zurück, sondern NUR eine Liste gezielter Änderungen als JSON-Array:
+[
+  {"action": "replace", "find": "## Alte Überschrift", "replace": "## Überschrift mit Keyword", "reason": "Keyword in Überschrift"},
+  {"action": "replace", "find": "exakter Originalsatz", "replace": "Satz mit eingebautem Keyword", "reason": "Keyword im Fließtext"},
+  {"action": "replace", "find": "exakter Originalabsatz", "replace": "• Punkt 1\\n• Punkt 2", "reason": "Aufzählung"},
+  {"action": "bold", "find": "§ 29 BtMG", "reason": "Paragraph hervorheben"},
+  {"action": "delete", "find": "exakter Originalsatz", "reason": "Wiederholung"}
+]
+
+REGELN:
+- "find" wird wörtlich aus dem TEXT kopiert und kommt dort genau einmal vor
+- Ändere nur einzelne Überschriften, Sätze oder Absätze, nie ganze Abschnitte
+- Paragraphen (§§) und Strafmaße müssen in "replace" wörtlich erhalten bleiben, sonst wird die Änderung verworfen
+"""
+
+def _seo_request(corrected_content, topic, keywords_text):
+    return f"""
+KEYWORDS für "{topic}": {keywords_text}
 
 TEXT:
 {corrected_content}
+"""
 
+async def _seo_rewrite_async(corrected_content, topic, keywords_text):
+    """Rewrite mode: the model returns the complete reworked article"""
+    prompt = _seo_request(corrected_content, topic, keywords_text) + """
 Gib NUR den überarbeiteten Text zurück, ohne Erklärungen:
 """
+    result = (await llm.complete(prompt, max_tokens=token_budget.for_rewrite(corrected_content, SEO_GROWTH),
+                                 temperature=0.5, stream=True,
+                                 stage="seo", system=_stage_system(SEO_INSTRUCTIONS),
+                                 expected_tokens=rate_limiter.estimate_tokens(corrected_content))).strip()
+    if locked_matches(result) != locked_matches(corrected_content):
+        print("[WARN] SEO-Überarbeitung hat Paragraphen oder Strafmaße verändert")
+    return result
+
+async def _seo_edits_async(corrected_content, topic, keywords_text):
+    """Edit mode: the model returns targeted edits that are applied locally"""
+    prompt = _seo_request(corrected_content, topic, keywords_text) + """
+Gib NUR das JSON-Array zurück:
+"""
+    result = await llm.complete(prompt, max_tokens=SEO_EDITS_MAX_TOKENS, temperature=0.5, stage="seo",
+                                system=_stage_system(SEO_INSTRUCTIONS + SEO_EDIT_FORMAT))
+    changes, rejected = resolve_edits(corrected_content, parse_edits(result), locked_patterns=LEGAL_PATTERNS)
+    for edit in rejected:
+        print(f"[WARN] SEO-Änderung verworfen ({edit['error']}): {str(edit.get('find', ''))[:80]}")
+    print(f"SEO-Änderungen: {len(changes)} übernommen, {len(rejected)} verworfen")
+    return apply_changes(corrected_content, changes).strip()
+
+async def rework_complete_content_async(corrected_content, topic, keywords):
+    """Integrate SEO keywords into legally-correct content"""
+    print(f"Starte SEO-Integration mit {len(keywords) if keywords else 0} Keywords...")
     
+    if not keywords:
+        return corrected_content
+    
+    print(f"Keywords to integrate: {keywords}")
+    keywords_text = ", ".join(keywords)
+    
+    rework = _seo_rewrite_async if SEO_MODE == "rewrite" else _seo_edits_async
     try:
-        with client.messages.stream(
-            model=CLAUDE_MODEL,
-            max_tokens=30000,
-            temperature=0.5,
-            messages=[{"role": "user", "content": prompt}]
-        ) as stream:
-            result = ""
-            for text in stream.text_stream:
-                result += text
+        result = await rework(corrected_content, topic, keywords_text)
         
         print(f"✅ SEO-Integration abgeschlossen (Länge: {len(result)} Zeichen)")
-        return result.strip()
+        return result
         
     except Exception as e:
-        if "rate_limit" in str(e):
-            print("Rate limit erreicht, warte 10 Sekunden...")
-            time.sleep(10)
-            return rework_complete_content(corrected_content, topic, keywords)
-        else:
-            print(f"[ERROR] SEO integration failed: {e}")
-            return corrected_content
+        print(f"[ERROR] SEO integration failed: {e}")
+        raise
         
-def humanize_content(content, topic, deep_mode=False):
-    """Reduce AI detection while maintaining legal accuracy and readability"""
-    
-    print(f"Humanisiere Text {'(Deep Mode)' if deep_mode else ''}...")
-    
+def _humanize_techniques(deep_mode=False):
     # Concise humanization guidelines
     base_techniques = """
 Du bist ein professioneller Rechtstext-Autor. Überarbeite den Text, um natürlicher zu wirken.
@@ -398,15 +660,9 @@ TIEFE HUMANISIERUNG:
 - Eliminiere alle verbliebenen KI-typischen Phrasen
 - Mehr natürliche Übergänge, weniger formale Konstruktionen
 """
-    
-    prompt = f"""
-Überarbeite diesen Rechtstext zum Thema "{topic}" für natürlichere Sprache.
-
-TEXT:
-{content}
-
-{base_techniques}
+    return base_techniques
 
+HUMANIZE_CONSTRAINTS = """
 KRITISCH - NICHT ÄNDERN:
 - Rechtliche Fakten (Paragraphen, Strafmaße, Definitionen, Verfahren)
 - Fachbegriffe und juristische Terminologie
@@ -414,103 +670,579 @@ KRITISCH - NICHT ÄNDERN:
 - Inhaltliche Aussagen
 
 BLEIBE PROFESSIONELL: Dies ist ein Rechtstext für Mandanten. Fachlich korrekt, verständlich, aber niemals unprofessionell oder zu locker.
+"""
+
+async def humanize_content_async(content, topic, deep_mode=False):
+    """Reduce AI detection while maintaining legal accuracy and readability"""
+    
+    print(f"Humanisiere Text {'(Deep Mode)' if deep_mode else ''}...")
+    
+    prompt = f"""
+Überarbeite diesen Rechtstext zum Thema "{topic}" für natürlichere Sprache.
+
+TEXT:
+{content}
 
 Gib NUR den überarbeiteten Text zurück:
 """
     
     try:
-        with client.messages.stream(
-            model=CLAUDE_MODEL,
-            max_tokens=30000,
-            temperature=0.80 if deep_mode else 0.75,
-            messages=[{"role": "user", "content": prompt}]
-        ) as stream:
-            result = ""
-            for text in stream.text_stream:
-                result += text
+        result = await llm.complete(prompt, max_tokens=token_budget.for_rewrite(content),
+                                    temperature=0.80 if deep_mode else 0.75, stream=True,
+                                    stage="humanized_deep" if deep_mode else "humanized",
+                                    system=_stage_system(_humanize_techniques(deep_mode) + HUMANIZE_CONSTRAINTS),
+                                    expected_tokens=rate_limiter.estimate_tokens(content))
         
         print(f"✅ Humanisierung abgeschlossen (Länge: {len(result)} Zeichen)")
         return result.strip()
         
     except Exception as e:
-        if "rate_limit" in str(e):
-            print("Rate limit erreicht, warte 10 Sekunden...")
-            time.sleep(10)
-            return humanize_content(content, topic, deep_mode)
-        else:
-            print(f"[ERROR] Humanization failed: {e}")
-            return content
+        print(f"[ERROR] Humanization failed: {e}")
+        raise
         
+async def rework_and_humanize_content_async(corrected_content, topic, keywords):
+    """Fused fast path: SEO integration and humanization in one rewrite"""
+    if not keywords:
+        return await humanize_content_async(corrected_content, topic)
+    
+    print(f"Starte SEO-Integration und Humanisierung in einem Durchgang ({len(keywords)} Keywords)...")
+    
+    system = _stage_system(f"""
+Überarbeite KORREKTE rechtliche Texte in EINEM Durchgang:
+1. Integriere die Keywords NATÜRLICH
+2. Überarbeite die Sprache, damit sie natürlicher wirkt
+{SEO_INSTRUCTIONS}
+{_humanize_techniques()}
+{HUMANIZE_CONSTRAINTS}""")
+    prompt = _seo_request(corrected_content, topic, ", ".join(keywords)) + """
+Gib NUR den überarbeiteten Text zurück, ohne Erklärungen:
+"""
+    
+    try:
+        result = await llm.complete(prompt,
+                                    max_tokens=token_budget.for_rewrite(corrected_content, SEO_GROWTH),
+                                    temperature=0.75, stream=True, stage="seo_humanized", system=system,
+                                    expected_tokens=rate_limiter.estimate_tokens(corrected_content))
+        result = result.strip()
+        if locked_matches(result) != locked_matches(corrected_content):
+            print("[WARN] Überarbeitung hat Paragraphen oder Strafmaße verändert")
+        
+        print(f"✅ SEO-Integration und Humanisierung abgeschlossen (Länge: {len(result)} Zeichen)")
+        return result
+        
+    except Exception as e:
+        print(f"[ERROR] SEO integration and humanization failed: {e}")
+        raise
+        
+# Sections waiting between two pipelined stages (the producer waits when full)
+SECTION_QUEUE_SIZE = 2
+
+async def pipelined_article_async(topic, outline, target_length=None, reference_info=None):
+    """
+    Draft, verify and humanize the article section by section
+    
+    Every H1 section that is complete in the draft stream goes straight to
+    verification and verified sections to humanization, through bounded
+    queues. All stages work at the same time, so the run takes about as long
+    as the slowest stage instead of the sum. The sections are reassembled in
+    article order.
+    
+    SEO integration is not done here: it runs once on the reassembled article
+    (see PROFILE_STEPS["pipelined"]), so keyword research overlaps the whole
+    pipeline instead of delaying the draft, and the keyword and bold rules
+    apply to the whole text rather than to every section.
+    """
+    if reference_info is None:
+        reference_info = reference_information
+    article_headings = headings(outline)
+    
+    async def verify(section):
+        changes = await _review_chunk_async(section, 0, topic, article_headings, reference_info)
+        return apply_changes(section, changes)
+    
+    async def humanize(section):
+        return await humanize_content_async(section, topic)
+    
+    steps = [verify, humanize]
+    queues = [asyncio.Queue(maxsize=SECTION_QUEUE_SIZE) for _ in range(len(steps) + 1)]
+    splitter = SectionStream()
+    count = 0
+    
+    async def on_text(chunk):
+        nonlocal count
+        for section in splitter.feed(chunk):
+            await queues[0].put((count, section))
+            count += 1
+    
+    async def draft():
+        nonlocal count
+        await generate_complete_content_async(topic, outline, target_length, reference_info, on_text=on_text)
+        for section in splitter.close():
+            await queues[0].put((count, section))
+            count += 1
+        print(f"[INFO] Entwurf fertig: {count} Abschnitte")
+        await queues[0].put(None)
+    
+    async def work(step, source, sink):
+        while True:
+            item = await source.get()
+            if item is None:
+                await sink.put(None)
+                return
+            index, section = item
+            await sink.put((index, (await step(section)).strip()))
+    
+    async def collect():
+        results = {}
+        while True:
+            item = await queues[-1].get()
+            if item is None:
+                return [results[index] for index in sorted(results)]
+            results[item[0]] = item[1]
+    
+    print("Starte Pipeline-Modus (Entwurf → Prüfung → Humanisierung pro Abschnitt)...")
+    tasks = [asyncio.ensure_future(draft())]
+    tasks += [asyncio.ensure_future(work(step, queues[i], queues[i + 1])) for i, step in enumerate(steps)]
+    tasks.append(asyncio.ensure_future(collect()))
+    try:
+        *_, sections = await asyncio.gather(*tasks)
+    finally:
+        # One failed stage would leave the others waiting on their queues
+        for task in tasks:
+            task.cancel()
+    
+    result = "\n\n".join(sections)
+    print(f"✅ Pipeline-Modus abgeschlossen ({len(sections)} Abschnitte, {len(result)} Zeichen)")
+    return result
+
+# ============================================================================
+# SYNC API - thin wrappers running the async stages on the shared event loop
+# ============================================================================
+def fetch_reference_information(source):
+    """Fetch reference information from URL or file path"""
+    return run_sync(fetch_reference_information_async(source))
+
+def load_reference_information(source, topic):
+    """Fetch reference information and extract what is relevant for the topic"""
+    return run_sync(load_reference_information_async(source, topic))
+
+def analyze_reference_information(content, topic):
+    """Analyze content to extract only relevant legal information for a specific topic"""
+    return run_sync(analyze_reference_information_async(content, topic))
+
+def generate_outline(topic):
+    """Generate comprehensive outline focused purely on legal content - NO SEO keywords"""
+    return run_sync(generate_outline_async(topic))
+
+def generate_complete_content(topic, outline, target_length=None, reference_info=None, parallel_sections=False):
+    """Generate complete informational content - NO SEO integration here"""
+    return run_sync(generate_complete_content_async(topic, outline, target_length, reference_info, parallel_sections))
+
+def verify_and_fix_legal_content(content, topic, reference_info=None):
+    """Verify legal accuracy and fix any errors found"""
+    return run_sync(verify_and_fix_legal_content_async(content, topic, reference_info))
+
+def rework_complete_content(corrected_content, topic, keywords):
+    """Integrate SEO keywords into legally-correct content"""
+    return run_sync(rework_complete_content_async(corrected_content, topic, keywords))
+
+def humanize_content(content, topic, deep_mode=False):
+    """Reduce AI detection while maintaining legal accuracy and readability"""
+    return run_sync(humanize_content_async(content, topic, deep_mode))
+
+def rework_and_humanize_content(corrected_content, topic, keywords):
+    """Integrate SEO keywords and humanize in a single rewrite"""
+    return run_sync(rework_and_humanize_content_async(corrected_content, topic, keywords))
+
+# ============================================================================
+# ARTICLE PIPELINE
+# ============================================================================
+# Dependency graph of the stages: keyword research only feeds the SEO
+# stage, so it runs alongside outline, draft and verification.
+# Profiles (profiles.json) pick the steps; TEXT stands for the article text
+# produced by the previous step, so skipped steps are bridged automatically.
+TEXT = "<text>"
+REFERENCE_STAGE = Stage("reference_information", load_reference_information_async, ["reference_source", "topic"])
+KEYWORD_STAGE = Stage("keywords", get_seo_keywords_for_topic_async, ["keyword_topic"])
+PROFILE_STEPS = {
+    "outline": [Stage("outline", generate_outline_async, ["topic"])],
+    "draft": [Stage("draft", generate_complete_content_async,
+                    ["topic", "outline", "target_length", "reference_information", "parallel_sections"])],
+    "verification": [Stage("legal_review", find_legal_errors_async, [TEXT, "topic", "reference_information"]),
+                     Stage("verified", apply_legal_fixes_async, [TEXT, "legal_review"])],
+    "seo": [Stage("seo", rework_complete_content_async, [TEXT, "topic", "keywords"])],
+    "humanize": [Stage("humanized", humanize_content_async, [TEXT, "topic"])],
+    "seo+humanize": [Stage("seo_humanized", rework_and_humanize_content_async, [TEXT, "topic", "keywords"])],
+    # Only the SEO pass on the finished article waits for keyword research
+    "pipelined": [Stage("pipelined", pipelined_article_async,
+                        ["topic", "outline", "target_length", "reference_information"]),
+                  Stage("seo", rework_complete_content_async, ["pipelined", "topic", "keywords"])],
+}
+
+# Request stages (see model_routing) of every pipeline stage
+STAGE_REQUESTS = {
+    "reference_information": ["reference_information"],
+    "keywords": ["keyword_selection"],
+    "outline": ["outline"],
+    "draft": ["draft"],
+    "legal_review": ["legal_review"],
+    "seo": ["seo"],
+    "humanized": ["humanized"],
+    "seo_humanized": ["seo_humanized", "humanized"],
+    "pipelined": ["draft", "legal_review", "humanized"],
+}
+
+def _stage_params(name, settings):
+    """Checkpoint params of a stage: its settings plus the model of each of its
+    requests, so a run with another model does not restore the old outputs"""
+    models = {request: settings.get("model") or model_routing.model_for_stage(request)
+              for request in STAGE_REQUESTS.get(name, [])}
+    return dict(settings, models=models) if models else settings
+
+def _with_settings(func, settings):
+    """Run a stage with the profile's model settings for all of its Claude calls"""
+    if not settings:
+        return func
+    async def run(*args):
+        # Each stage runs in its own task (and context copy), so this stays local to the stage
+        llm.stage_settings.set(settings)
+        return await func(*args)
+    return run
+
+def build_stages(profile):
+    """
+    Concrete stage graph for a profile (see profiles.get_profile), with the
+    models of the current selection (model_routing.selected_model) in the params
+    
+    Returns:
+        (list of Stage, name of the stage producing the final article)
+    """
+    stages = [Stage(REFERENCE_STAGE.name, REFERENCE_STAGE.func, REFERENCE_STAGE.inputs,
+                    params=_stage_params(REFERENCE_STAGE.name, {}))]
+    text = None
+    for step in profile["stages"]:
+        settings = resolve_settings(profile["settings"].get(step, {}))
+        for stage in PROFILE_STEPS[step]:
+            inputs = [text if name == TEXT else name for name in stage.inputs]
+            stages.append(Stage(stage.name, _with_settings(stage.func, settings), inputs,
+                                params=_stage_params(stage.name, settings)))
+        if step != "outline":
+            text = PROFILE_STEPS[step][-1].name
+    if any("keywords" in stage.inputs for stage in stages):
+        stages.append(Stage(KEYWORD_STAGE.name, KEYWORD_STAGE.func, KEYWORD_STAGE.inputs,
+                            params=_stage_params(KEYWORD_STAGE.name, {})))
+    return stages, text
+
+async def generate_article(topic, keyword_topic=None, target_length=None, reference_source=None,
+                           outline=None, keywords=None, parallel_sections=False, profile=None,
+                           model=None, run_id=None, on_event=None):
+    """
+    Run the complete article pipeline through the stage scheduler
+    
+    Many articles can be awaited concurrently from one event loop. Every stage
+    output is checkpointed under run_id, see resume_article.
+    
+    Args:
+        topic: Legal topic of the article
+        keyword_topic: Topic for SEMrush research (defaults to topic)
+        target_length: "short", "medium", "long", a word count or None
+        reference_source: URL or file path with reference information
+        outline: Existing (edited) outline, skips outline generation
+        keywords: Already selected SEO keywords, skips keyword research
+        parallel_sections: Draft the outline sections concurrently (faster for long articles)
+        profile: Pipeline profile name from profiles.json (default "full")
+        model: Model id or family for the stages routed to the selected model
+               (default: the session's selection, else the strongest model), see model_routing
+        run_id: Checkpoint ID (default: a new one, see checkpoints.new_run_id)
+        on_event: Optional callback(stage_name, event, result), see pipeline.run_stages.
+                  Streamed stages additionally send "progress" events whose result
+                  is a streaming.StreamCollector progress dict
+    
+    Returns:
+        dict: Values of all stages that ran ("outline", "draft", "verified", "keywords", "seo",
+              "humanized", ...) plus "article", the final text of the profile, "run_id" and
+              "degraded", stage -> reasons for stages that kept a fallback (not checkpointed)
+    """
+    params = {
+        "topic": topic,
+        "keyword_topic": keyword_topic or topic,
+        "target_length": target_length,
+        "reference_source": reference_source,
+        "parallel_sections": parallel_sections,
+        "profile": profile or DEFAULT_PROFILE,
+        "model": model or model_routing.selected_model.get(),
+        "outline": outline or None,
+        "keywords": keywords,
+        # Reference information analysed in the app, kept so a resume sees the same input
+        "reference_information": None if reference_source else reference_information,
+    }
+    return await _run_article(params, run_id or new_run_id(topic), on_event)
+
+async def resume_article(run_id, on_event=None):
+    """
+    Continue an interrupted (or finished) run from its checkpoints
+    
+    Stages with a checkpoint for the same inputs are restored ("restored"
+    event), the first missing or stale stage and everything after it runs.
+    
+    Raises:
+        ValueError: If no run with this ID exists
+    """
+    run = RunCheckpoint(run_id).load_run()
+    if run is None:
+        raise ValueError(f"Unknown run '{run_id}'")
+    print(f"Setze Lauf {run_id} fort (Status: {run.get('status')})...")
+    return await _run_article(run["params"], run_id, on_event)
+
+async def _run_article(params, run_id, on_event):
+    checkpoint = RunCheckpoint(run_id)
+    checkpoint.save_run(params, "running")
+    
+    values = {key: params[key] for key in
+              ("topic", "keyword_topic", "target_length", "reference_source", "parallel_sections")}
+    if not params["reference_source"]:
+        values["reference_information"] = params["reference_information"]
+    if params["outline"]:
+        values["outline"] = params["outline"]
+    if params["keywords"] is not None:
+        values["keywords"] = params["keywords"]
+    
+    if params.get("model"):
+        # Stage tasks inherit the selection, a resumed run keeps the model it started with
+        model_routing.selected_model.set(params["model"])
+    stages, final_stage = build_stages(get_profile(params["profile"]))
+    if on_event is not None:
+        on_event("tokens", "projection", project_tokens(params["profile"], params["target_length"],
+                                                        params["outline"], params["reference_information"]))
+        # Stage tasks inherit the listener, streamed text reaches the caller while it is written
+        llm.stream_listener.set(lambda progress: on_event(progress["stage"], "progress", progress))
+    try:
+        values = await run_stages(stages, values, on_event=on_event, checkpoint=checkpoint)
+    except BaseException as e:
+        # Also covers cancellation (closed Streamlit session, Ctrl+C)
+        checkpoint.save_run(params, "failed", f"{type(e).__name__}: {e}")
+        raise
+    if checkpoint.degraded_stages:
+        # Not "done": the run stays in the unfinished list and a resume repeats these stages
+        checkpoint.save_run(params, "degraded", "Unvollständig: " + ", ".join(checkpoint.degraded_stages))
+    else:
+        checkpoint.save_run(params, "done")
+    values["degraded"] = checkpoint.degraded_stages
+    values["article"] = values[final_stage]
+    values["run_id"] = run_id
+    return values
+
+def generate_article_sync(topic, on_event=None, **kwargs):
+    """Blocking generate_article, stage events are delivered on the calling thread"""
+    if on_event is None:
+        return run_sync(generate_article(topic, **kwargs))
+    return run_sync_with_events(
+        lambda emit: generate_article(topic, on_event=emit, **kwargs),
+        on_event,
+    )
+
+def resume_article_sync(run_id, on_event=None):
+    """Blocking resume_article, stage events are delivered on the calling thread"""
+    if on_event is None:
+        return run_sync(resume_article(run_id))
+    return run_sync_with_events(
+        lambda emit: resume_article(run_id, on_event=emit),
+        on_event,
+    )
+
+def _preview(text):
+    return text[:500] + "..." if len(text) > 500 else text
+
+def format_progress(progress):
+    """One-line stream status, e.g. draft: 12,345 Zeichen • 48 Tokens/s • noch ca. 40s"""
+    line = f"{progress['stage']}: {progress['chars']:,} Zeichen • {progress['tokens_per_second']:.0f} Tokens/s"
+    if progress["eta_seconds"] is not None:
+        line += f" • noch ca. {progress['eta_seconds']:.0f}s"
+    return line
+
+# Share of the article an edit list (verification, SEO edits) is expected to take
+EDIT_OUTPUT_SHARE = 0.15
+
+def project_tokens(profile=None, target_length=None, outline=None, reference_info=None):
+    """
+    Projected tokens of every step of a profile, estimated before anything is sent
+    
+    Assumes the article reaches its target length (without one the default
+    draft length), rewrites re-emit it and edit lists take EDIT_OUTPUT_SHARE of it.
+    Keyword research and reference analysis are not included.
+    
+    Returns:
+        dict: step -> {"input_tokens", "output_tokens", "max_tokens"} in profile order
+    """
+    def estimate(prompt, system=()):
+        return token_budget.prompt_tokens(prompt, "".join(system))
+    
+    article = (target_words(target_length) or DEFAULT_DRAFT_WORDS) * TOKENS_PER_WORD
+    edits = int(article * EDIT_OUTPUT_SHARE)
+    outline_text = outline or ""
+    chunks = max(1, math.ceil(article * rate_limiter.CHARS_PER_TOKEN / MAX_CHUNK_CHARS))
+    
+    verification_system = _stage_system(VERIFICATION_CHECKLIST + (
+        VERIFICATION_REWRITE_FORMAT if VERIFICATION_MODE == "rewrite" else VERIFICATION_EDIT_FORMAT))
+    verification_context = estimate(_verification_context("", "", headings(outline_text), reference_info),
+                                    verification_system)
+    seo_system = _stage_system(SEO_INSTRUCTIONS + ("" if SEO_MODE == "rewrite" else SEO_EDIT_FORMAT))
+    steps = {
+        "outline": (estimate(_outline_prompt("")), OUTLINE_MAX_TOKENS // 2, OUTLINE_MAX_TOKENS),
+        "draft": (estimate(outline_text + _reference_block(reference_info), _draft_system()), article,
+                  token_budget.for_tokens(article)),
+        "verification": (chunks * verification_context + article,
+                         article if VERIFICATION_MODE == "rewrite" else edits,
+                         token_budget.for_tokens(article) if VERIFICATION_MODE == "rewrite"
+                         else chunks * LEGAL_REVIEW_MAX_TOKENS),
+        "seo": (estimate("", seo_system) + article,
+                int(article * SEO_GROWTH) if SEO_MODE == "rewrite" else edits,
+                token_budget.for_tokens(article, SEO_GROWTH) if SEO_MODE == "rewrite" else SEO_EDITS_MAX_TOKENS),
+        "humanize": (estimate("", _stage_system(_humanize_techniques() + HUMANIZE_CONSTRAINTS)) + article, article,
+                     token_budget.for_tokens(article)),
+        "seo+humanize": (estimate("", _stage_system(SEO_INSTRUCTIONS + _humanize_techniques() + HUMANIZE_CONSTRAINTS))
+                         + article,
+                         int(article * SEO_GROWTH), token_budget.for_tokens(article, SEO_GROWTH)),
+    }
+    # The pipelined step runs draft, verification and humanization per section, then SEO on the article
+    steps["pipelined"] = tuple(sum(values) for values in
+                               zip(*(steps[step] for step in ("draft", "verification", "seo", "humanize"))))
+    return {
+        step: dict(zip(("input_tokens", "output_tokens", "max_tokens"), steps[step]))
+        for step in get_profile(profile or DEFAULT_PROFILE)["stages"]
+        # An existing outline skips the outline step
+        if not (step == "outline" and outline)
+    }
+
+def format_projection(projection):
+    """One line per step plus the total, e.g. draft: ~1,200 Input • ~6,000 Output (max 7,800)"""
+    lines = [f"{step}: ~{tokens['input_tokens']:,} Input • ~{tokens['output_tokens']:,} Output "
+             f"(max {tokens['max_tokens']:,})" for step, tokens in projection.items()]
+    total_input = sum(tokens["input_tokens"] for tokens in projection.values())
+    total_output = sum(tokens["output_tokens"] for tokens in projection.values())
+    lines.append(f"Gesamt: ~{total_input:,} Input • ~{total_output:,} Output")
+    return lines
+
+_progress_line_open = False
+
+def print_stage_event(stage, event, result):
+    """Console progress output for the CLI pipeline run"""
+    global _progress_line_open
+    if event == "progress":
+        # Overwrite the same console line until the next stage event
+        print(f"\r[INFO] {format_progress(result)}", end="", flush=True)
+        _progress_line_open = True
+        return
+    if _progress_line_open:
+        print()
+        _progress_line_open = False
+    if event == "restored":
+        print(f"[INFO] Stage aus Checkpoint übernommen: {stage}")
+        return
+    if event == "projection":
+        print("[INFO] Token-Prognose:")
+        for line in format_projection(result):
+            print(f"  {line}")
+        return
+    if event != "done":
+        if event == "start":
+            print(f"[INFO] Stage gestartet: {stage}")
+        return
+    
+    if stage == "reference_information":
+        if result:
+            print("✅ Referenz-Information erfolgreich extrahiert!")
+            print("\n" + "="*50)
+            print("EXTRAHIERTE RECHTSINFORMATIONEN:")
+            print(result)
+            print("="*50)
+        else:
+            print("❌ Fehler bei der Informationsextraktion.")
+    elif stage == "outline":
+        print("\n== GLIEDERUNG ==")
+        print(result)
+    elif stage == "draft":
+        print(f"\n== ORIGINAL ARTIKEL ==")
+        print(_preview(result))
+    elif stage == "legal_review":
+        print(f"\n== RECHTLICHE PRÜFUNG: {len(result)} KORREKTUREN ==")
+        for change in result:
+            print(f"  - {format_change(change)}")
+    elif stage == "verified":
+        print(f"\n== KORRIGIERTER ARTIKEL ==")
+        print(_preview(result))
+    elif stage == "keywords":
+        print(f"\n== SEO KEYWORD RESEARCH ==")
+        if result:
+            print("✅ SEO Keywords erfolgreich generiert:")
+            for i, kw in enumerate(result, 1):
+                print(f"  {i}. {kw}")
+        else:
+            print("❌ Keine Keywords erhalten.")
+            print("💡 Tipp: Versuchen Sie ein breiteres Keyword-Thema (z.B. 'betäubungsmittelstrafrecht' statt '§ 29 BtMG')")
+    elif stage == "seo":
+        print(f"\n== SEO-OPTIMIERUNG ==")
+        print(_preview(result))
+    elif stage == "seo_humanized":
+        print(f"\n== SEO-OPTIMIERUNG UND HUMANISIERUNG ==")
+        print(_preview(result))
+    elif stage == "pipelined":
+        print(f"\n== PIPELINE (ENTWURF, PRÜFUNG, HUMANISIERUNG) ==")
+        print(_preview(result))
+    elif stage == "humanized":
+        print("\n== FINALER HUMANISIERTER ARTIKEL ==")
+        print(result)
+
+def resume_cli(run_id):
+    """Continue an interrupted run, or list unfinished runs if no ID is given"""
+    if not run_id:
+        runs = list_runs(unfinished_only=True)
+        if not runs:
+            print("Keine unterbrochenen Läufe gefunden.")
+        for run in runs:
+            print(f"{run['run_id']}  [{run['status']}]  {run['params']['topic']}  "
+                  f"fertig: {', '.join(run['stages']) or '-'}")
+        return
+    values = resume_article_sync(run_id, on_event=print_stage_event)
+    if "humanized" not in values:
+        print("\n== FINALER ARTIKEL ==")
+        print(values["article"])
+
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--resume":
+        # python main.py --resume [RUN_ID]
+        resume_cli(sys.argv[2] if len(sys.argv) > 2 else None)
+        sys.exit(0)
+    
     # Step 1: Topic Input & Reference Inputs
     topic, keyword_topic = get_topic_input()
     
     # Get reference inputs (only info, style is hardcoded)
     ref_info_source = ask_for_reference_inputs()
-    
-    # Process reference information (for analysis)
-    if ref_info_source:
-        content = fetch_reference_information(ref_info_source)
-        if content:
-            info = analyze_reference_information(content)
-            if info:
-                reference_information = info
-                print("✅ Referenz-Information erfolgreich extrahiert!")
-                print("\n" + "="*50)
-                print("EXTRAHIERTE RECHTSINFORMATIONEN:")
-                print(info)
-                print("="*50)
-            else:
-                print("❌ Fehler bei der Informationsextraktion.")
-        else:
-            print("❌ Referenz-Information konnte nicht geladen werden.")
+    profile = ask_for_profile()
     
     print(f"\n✅ Standard-Referenz-Ton aktiv (Körperverletzung-Stil)")
+    print(f"Keyword-Recherche (Thema: '{keyword_topic}') läuft parallel zur Artikel-Erstellung...")
     
-    # Step 2: Generate outline
-    print("\n== GLIEDERUNG ==")
-    outline = generate_outline(topic)
-    print(outline)
-
-    # Step 3: Generate complete content
-    print(f"\n== ORIGINAL ARTIKEL ==")
-    print("Generiere vollständigen Artikel...")
-    complete_content = generate_complete_content(topic, outline)
-    print(complete_content[:500] + "..." if len(complete_content) > 500 else complete_content)
-    
-    # Step 4: Verify and fix legal errors
-    print(f"\n== RECHTLICHE PRÜFUNG UND KORREKTUR ==")
-    corrected_content = verify_and_fix_legal_content(complete_content, topic)
-    print(corrected_content[:500] + "..." if len(corrected_content) > 500 else corrected_content)
-    
-    # Step 5: SEO Keyword Research
-    print(f"\n== SEO KEYWORD RESEARCH (Thema: '{keyword_topic}') ==")
-    seo_keywords = get_seo_keywords_for_topic(keyword_topic)
-    if seo_keywords:
-        print("✅ SEO Keywords erfolgreich generiert:")
-        for i, kw in enumerate(seo_keywords, 1):
-            print(f"  {i}. {kw}")
-    else:
-        print("❌ Keine Keywords erhalten.")
-        print("💡 Tipp: Versuchen Sie ein breiteres Keyword-Thema (z.B. 'betäubungsmittelstrafrecht' statt '§ 29 BtMG')")
+    run_id = new_run_id(topic)
+    print(f"Lauf-ID: {run_id} (fortsetzen mit: python main.py --resume {run_id})")
     
-    # Step 6: SEO Integration
-    if seo_keywords:
-        print(f"\n== SEO-OPTIMIERUNG ==")
-        print("Integriere Keywords in korrigierten Text...")
-        seo_optimized_content = rework_complete_content(corrected_content, topic, seo_keywords)
-        print(seo_optimized_content[:500] + "..." if len(seo_optimized_content) > 500 else seo_optimized_content)
-    else:
-        print(f"\n== NACH RECHTLICHER KORREKTUR ==")
-        seo_optimized_content = corrected_content
-        print(corrected_content[:500] + "..." if len(corrected_content) > 500 else corrected_content)
-    
-    # Step 7: Humanization (NEW!)
-    print(f"\n== HUMANISIERUNG ==")
-    print("Reduziere KI-Erkennbarkeit...")
-    humanized_content = humanize_content(seo_optimized_content, topic)
+    # Steps 2-7: outline, draft, verification, keyword research, SEO integration, humanization
+    # (as selected by the profile)
+    values = generate_article_sync(
+        topic,
+        keyword_topic=keyword_topic,
+        reference_source=ref_info_source,
+        profile=profile,
+        run_id=run_id,
+        on_event=print_stage_event,
+    )
+    if "humanized" not in values:
+        print("\n== FINALER ARTIKEL ==")
+        print(values["article"])
     
-    print("\n== FINALER HUMANISIERTER ARTIKEL ==")
-    print(humanized_content)
+    print("\n== TOKEN-VERBRAUCH ==")
+    for line in llm.format_usage_stats():
+        print(line)
     
     print("\n" + "="*50)
\ No newline at end of file
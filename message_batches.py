@@ -0,0 +1,199 @@
+"""
+Message Batches
+Bulk mode for large topic lists (batch.py --bulk). While a BatchCollector is
+active, llm.complete does not call the Messages API directly but queues its
+request. Requests arriving within BULK_FLUSH_SECONDS of each other are
+submitted as one message batch (half price, outside the interactive rate
+limits), so each pipeline stage of all topics lands in the same batch and
+the results fan out into the next stage's batch.
+
+Every submitted batch is saved under RUNS_DIR/batches with the custom IDs it
+contains. A restarted process that sends the same request again attaches to
+the saved batch instead of paying for it a second time.
+
+The client honours ANTHROPIC_BASE_URL, so bulk mode can be pointed at a local
+fake batch endpoint.
+"""
+import asyncio
+import contextvars
+import os
+import time
+import rate_limiter
+from clients import get_async_claude_client
+from config import RUNS_DIR, BULK_FLUSH_SECONDS, BULK_POLL_SECONDS
+from response_cache import make_key
+from storage import read_json, write_json
+
+BATCH_DIR = os.path.join(RUNS_DIR, "batches")
+
+# API limit per batch
+MAX_BATCH_REQUESTS = 100000
+
+# Results can be downloaded for 29 days after a batch was created
+RESULTS_RETENTION = 29 * 24 * 60 * 60
+
+# Collector of the current bulk run, None for interactive calls
+active_collector = contextvars.ContextVar("bulk_collector", default=None)
+
+
+def request_id(params):
+    """custom_id of a request: identical requests share one batch entry"""
+    return make_key(kind="batch", **params)
+
+
+async def _api(request):
+    # Batch management calls share retries and backoff with everything else
+    async def call():
+        return await request(), None, None
+    return await rate_limiter.call("anthropic", "message-batches", call)
+
+
+class BatchCollector:
+    """Queues Messages API requests and resolves them from message batches"""
+
+    def __init__(self, directory=BATCH_DIR, flush_seconds=BULK_FLUSH_SECONDS, poll_seconds=BULK_POLL_SECONDS):
+        self.directory = directory
+        self.flush_seconds = flush_seconds
+        self.poll_seconds = poll_seconds
+        self._queued = {}
+        self._waiting = {}
+        self._polling = set()
+        self._tasks = set()
+        self._timer = None
+        self.submitted = []
+        # batch_id -> custom_ids of every batch this collector submitted or attached to
+        self._batch_ids = {}
+        self._saved = self._load_saved()
+
+    def _record_path(self, batch_id):
+        return os.path.join(self.directory, f"{batch_id}.json")
+
+    def _load_saved(self):
+        """custom_id -> batch_id of saved batches whose results were not collected yet"""
+        saved = {}
+        if not os.path.isdir(self.directory):
+            return saved
+        now = time.time()
+        for name in os.listdir(self.directory):
+            record = read_json(os.path.join(self.directory, name))
+            if not record or record.get("collected") or now - record["created"] > RESULTS_RETENTION:
+                continue
+            for custom_id in record["custom_ids"]:
+                saved[custom_id] = record["batch_id"]
+            self._batch_ids[record["batch_id"]] = list(record["custom_ids"])
+        return saved
+
+    def _spawn(self, coroutine):
+        task = asyncio.ensure_future(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def submit(self, params):
+        """
+        Queue one Messages API request and wait for its batch result
+
+        Args:
+            params: Keyword arguments of messages.create (no streaming)
+
+        Returns:
+            The Message of the request
+        """
+        custom_id = request_id(params)
+        future = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(custom_id, []).append(future)
+
+        batch_id = self._saved.get(custom_id)
+        if batch_id:
+            self._watch(batch_id)
+        elif len(self._waiting[custom_id]) == 1:
+            self._queued[custom_id] = params
+            self._schedule_flush()
+        return await future
+
+    def _schedule_flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+        if len(self._queued) >= MAX_BATCH_REQUESTS:
+            self._timer = None
+            self._spawn(self.flush())
+            return
+        # Wait for a quiet moment, so all topics reaching a stage share one batch
+        self._timer = asyncio.get_running_loop().call_later(
+            self.flush_seconds, lambda: self._spawn(self.flush()))
+
+    async def flush(self):
+        """Submit all queued requests as one message batch"""
+        queued, self._queued, self._timer = self._queued, {}, None
+        if not queued:
+            return
+        client = get_async_claude_client()
+        try:
+            batch = await _api(lambda: client.messages.batches.create(requests=[
+                {"custom_id": custom_id, "params": params} for custom_id, params in queued.items()
+            ]))
+        except Exception as e:
+            self._fail(list(queued), e)
+            return
+
+        write_json(self._record_path(batch.id), {
+            "batch_id": batch.id,
+            "created": time.time(),
+            "custom_ids": list(queued),
+            "collected": False,
+        })
+        for custom_id in queued:
+            self._saved[custom_id] = batch.id
+        self._batch_ids[batch.id] = list(queued)
+        self.submitted.append(batch.id)
+        print(f"[INFO] Message Batch {batch.id} mit {len(queued)} Anfragen eingereicht")
+        self._watch(batch.id)
+
+    def _watch(self, batch_id):
+        if batch_id not in self._polling:
+            self._polling.add(batch_id)
+            self._spawn(self._collect(batch_id))
+
+    async def _collect(self, batch_id):
+        """Poll a batch until it has ended, then resolve its waiting requests"""
+        client = get_async_claude_client()
+        # Kept in memory, a lost or damaged record file must not leave requests waiting
+        custom_ids = self._batch_ids.get(batch_id, [])
+        try:
+            while True:
+                batch = await _api(lambda: client.messages.batches.retrieve(batch_id))
+                if batch.processing_status == "ended":
+                    break
+                await asyncio.sleep(self.poll_seconds)
+
+            results = await _api(lambda: client.messages.batches.results(batch_id))
+            async for entry in results:
+                self._saved.pop(entry.custom_id, None)
+                futures = self._waiting.pop(entry.custom_id, [])
+                for future in futures:
+                    if future.done():
+                        continue
+                    if entry.result.type == "succeeded":
+                        future.set_result(entry.result.message)
+                    else:
+                        error = getattr(getattr(entry.result, "error", None), "error", None)
+                        future.set_exception(RuntimeError(
+                            f"Batch request {entry.result.type}: {getattr(error, 'message', '') or batch_id}"))
+        except Exception as e:
+            self._fail(custom_ids, e)
+            return
+        finally:
+            self._polling.discard(batch_id)
+
+        record = read_json(self._record_path(batch_id)) or {"batch_id": batch_id, "custom_ids": custom_ids}
+        record.update(collected=True)
+        write_json(self._record_path(batch_id), record)
+        # Requests missing from the results would otherwise wait forever
+        self._fail(custom_ids, RuntimeError(f"No result in batch {batch_id}"))
+        print(f"✅ Message Batch {batch_id} abgeschlossen")
+
+    def _fail(self, custom_ids, error):
+        for custom_id in custom_ids:
+            self._saved.pop(custom_id, None)
+            for future in self._waiting.pop(custom_id, []):
+                if not future.done():
+                    future.set_exception(error)
@@ -0,0 +1,116 @@
+"""
+Model Registry
+Fetches the Anthropic model catalog once and shares it between processes
+through a TTL-bounded on-disk cache. Lookups are answered from memory and
+never wait for the API: a cold start without cache serves the last known
+list, and a failed refresh is only retried after REFRESH_RETRY_SECONDS.
+"""
+import os
+import threading
+import time
+from config import CACHE_DIR, MODEL_CACHE_TTL
+from storage import read_json, write_json
+from clients import get_claude_client
+from pick_strongest_model import list_model_ids, strongest_of, strongest_in_family_of
+
+CACHE_FILE = os.path.join(CACHE_DIR, "models.json")
+
+# Last known catalog, used when neither the cache nor the API is available
+FALLBACK_MODEL_IDS = [
+    "claude-sonnet-4-5-20250929",
+    "claude-opus-4-1-20250805",
+    "claude-haiku-4-5-20251001",
+]
+
+# Seconds before a failed catalog refresh is attempted again
+REFRESH_RETRY_SECONDS = 5 * 60
+
+_lock = threading.Lock()
+_model_ids = None
+_fetched_at = 0.0
+_refreshing = False
+_retry_at = 0.0
+
+
+def _fetch_from_api():
+    """Fetch the model catalog without retries so a dead endpoint fails fast"""
+    client = get_claude_client().with_options(timeout=10.0, max_retries=0)
+    return list_model_ids(client)
+
+
+def _store(ids, fetched_at):
+    global _model_ids, _fetched_at
+    with _lock:
+        _model_ids = ids
+        _fetched_at = fetched_at
+
+
+def refresh():
+    """Fetch the catalog from the API and update memory and disk cache"""
+    ids = _fetch_from_api()
+    fetched_at = time.time()
+    _store(ids, fetched_at)
+    try:
+        write_json(CACHE_FILE, {"fetched_at": fetched_at, "ids": ids})
+    except OSError as e:
+        print(f"[WARN] Model cache could not be written: {e}")
+    print(f"[INFO] Model catalog refreshed ({len(ids)} models)")
+    return ids
+
+
+def _load_cache_file():
+    """Adopt the disk cache if it is newer than the catalog in memory"""
+    cached = read_json(CACHE_FILE)
+    if cached and cached.get("ids") and cached.get("fetched_at", 0.0) > _fetched_at:
+        _store(cached["ids"], cached["fetched_at"])
+
+
+def _refresh_in_background():
+    global _refreshing
+    with _lock:
+        if _refreshing or time.time() < _retry_at:
+            return
+        _refreshing = True
+
+    def run():
+        global _refreshing, _retry_at
+        try:
+            # Another process may have refreshed the shared cache in the meantime
+            _load_cache_file()
+            if time.time() - _fetched_at >= MODEL_CACHE_TTL:
+                refresh()
+        except Exception as e:
+            with _lock:
+                _retry_at = time.time() + REFRESH_RETRY_SECONDS
+            print(f"[WARN] Background model refresh failed, keeping last known list "
+                  f"(next attempt in {REFRESH_RETRY_SECONDS // 60} min): {e}")
+        finally:
+            with _lock:
+                _refreshing = False
+
+    threading.Thread(target=run, name="model-registry-refresh", daemon=True).start()
+
+
+def get_model_ids():
+    """
+    Return the model catalog without blocking: memory, then the disk cache,
+    else the last known list. Stale catalogs are refreshed in the background.
+    """
+    if _model_ids is None:
+        _load_cache_file()
+        if _model_ids is None:
+            # Marked as stale so the API is asked in the background
+            _store(list(FALLBACK_MODEL_IDS), 0.0)
+    if time.time() - _fetched_at >= MODEL_CACHE_TTL:
+        _refresh_in_background()
+    return _model_ids
+
+
+def strongest_model():
+    """Strongest model overall (Sonnet > Opus > Haiku, newest first)"""
+    return strongest_of(get_model_ids())
+
+
+def strongest_in_family(family):
+    """Newest model of the given family ("sonnet", "opus", "haiku")"""
+    return strongest_in_family_of(get_model_ids(), family)
@@ -0,0 +1,58 @@
+"""
+Model Routing
+Picks the Claude model of every request from its stage. Each stage maps to a
+model family ("opus", "sonnet", "haiku") or to SELECTED, the model chosen in
+the app's Agent Settings or for the run (default: the strongest model).
+Families resolve to their newest model through the model registry, at
+request time, so a choice made in a running session takes effect at once.
+
+The small stages (keyword grouping, reference analysis, image prompt
+suggestions) run on Haiku; the legal stages (outline, draft, verification,
+SEO, humanization) on the selected model. STAGE_MODELS overrides single
+stages, e.g. STAGE_MODELS="outline=haiku,humanized=opus". Profile settings
+("model" per step) take precedence over the routing.
+"""
+import contextvars
+import model_registry
+from config import STAGE_MODELS
+
+SELECTED = "selected"
+FAMILIES = ("opus", "sonnet", "haiku")
+
+STAGE_ROUTES = {
+    "keyword_selection": "haiku",
+    "reference_information": "haiku",
+    "image_prompt": "haiku",
+    "outline": SELECTED,
+    "draft": SELECTED,
+    "legal_review": SELECTED,
+    "seo": SELECTED,
+    "humanized": SELECTED,
+    "humanized_deep": SELECTED,
+    "seo_humanized": SELECTED,
+}
+STAGE_ROUTES.update(STAGE_MODELS)
+
+# Model (id or family) chosen for the current session or run, None: strongest model
+selected_model = contextvars.ContextVar("selected_model", default=None)
+
+
+def resolve(model):
+    """Model id of a family name (newest model of the family), ids are returned unchanged"""
+    if model in FAMILIES:
+        return model_registry.strongest_in_family(model)
+    return model
+
+
+def model_for_stage(stage):
+    """Model id for a request of this stage (unknown stages use the selected model)"""
+    route = STAGE_ROUTES.get(stage, SELECTED)
+    if route == SELECTED:
+        chosen = selected_model.get()
+        return resolve(chosen) if chosen else model_registry.strongest_model()
+    return resolve(route)
+
+
+def describe_routes():
+    """stage -> model id, as requests would be routed right now"""
+    return {stage: model_for_stage(stage) for stage in STAGE_ROUTES}
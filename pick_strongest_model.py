@@ -3,12 +3,14 @@ import os
 from dotenv import load_dotenv
 import re
 
-def pick_strongest_model(client: Anthropic):
+family_rank = {"sonnet": 3, "opus": 2, "haiku": 1}
+
+def list_model_ids(client: Anthropic):
     try:
         raw = client.models.list()
     except Exception as e:
         raise RuntimeError(f"Failed to fetch models: {e}")
-    
+
     ids = []
     for item in raw:
         mid = getattr(item, "id", None) or (item.get("id") if isinstance(item, dict) else item)
@@ -17,34 +19,45 @@ def pick_strongest_model(client: Anthropic):
 
     if not ids:
         raise RuntimeError("No models returned by API.")
+    return ids
+
+def extract_date(model_id: str) -> int:
+    m = re.search(r'(\d{8})', model_id)
+    return int(m.group(1)) if m else 0
+
+def score(model_id: str):
+    lid = model_id.lower()
+    fam_score = max((v for k, v in family_rank.items() if k in lid), default=0)
+    date = extract_date(model_id)
+    return (fam_score, date)
+
+def strongest_of(ids):
+    """Pick the strongest model from a list of model ids"""
+    return sorted(ids, key=score, reverse=True)[0]
+
+def strongest_in_family_of(ids, family):
+    """Pick the newest model of one family from a list of model ids"""
+    family_models = [m for m in ids if family.lower() in m.lower()]
+    if not family_models:
+        raise RuntimeError(f"No {family} models available.")
+    # Sort by date, newest first
+    return sorted(family_models, key=extract_date, reverse=True)[0]
 
-    def extract_date(model_id: str) -> int:
-        m = re.search(r'(\d{8})', model_id)
-        return int(m.group(1)) if m else 0
-
-    family_rank = {"sonnet": 3, "opus": 2, "haiku": 1}
-
-    def score(model_id: str):
-        lid = model_id.lower()
-        fam_score = max((v for k, v in family_rank.items() if k in lid), default=0)
-        date = extract_date(model_id)
-        return (fam_score, date)
-
-    best = sorted(ids, key=score, reverse=True)[0]
-    return best
+def pick_strongest_model(client: Anthropic):
+    return strongest_of(list_model_ids(client))
 
 
 if __name__ == "__main__":
     load_dotenv()
     client = Anthropic(api_key=os.getenv("CLAUDE_API_KEY"))
-    
+
     best_model = pick_strongest_model(client)
-    
+
     response = client.messages.create(
         model=best_model,
         max_tokens=50,
         messages=[{"role": "user", "content": "Say something short."}]
     )
-    
+
     print("API confirms model:", response.model)
-    print("Content:", response.content[0].text)
\ No newline at end of file
+    print("Content:", response.content[0].text)
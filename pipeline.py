@@ -0,0 +1,118 @@
+"""
+Pipeline Scheduler
+Runs a small dependency graph of stages and starts every stage as soon as
+all of its inputs exist, so independent work (e.g. keyword research while
+the article is drafted) happens concurrently. With a checkpoint store,
+stages whose inputs are unchanged since a previous run are restored instead
+of executed again. A stage that fell back to a partial result (see
+mark_degraded) is not checkpointed, so a resume runs it again.
+"""
+import asyncio
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List
+
+# Reasons why the running stage is incomplete, one list per stage task
+_degraded: ContextVar = ContextVar("degraded_stage", default=None)
+
+
+@dataclass
+class Stage:
+    """One pipeline step: func is a coroutine function called with the values
+    of inputs (in order), its result is stored under name for downstream stages.
+    params holds settings that change the result (e.g. model overrides) so
+    they invalidate checkpoints like changed inputs do."""
+    name: str
+    func: Callable
+    inputs: List[str] = field(default_factory=list)
+    params: Dict = field(default_factory=dict)
+
+
+def mark_degraded(reason):
+    """Record that the current stage kept going with a fallback (e.g. an
+    unchecked chunk), its result is then used but never checkpointed"""
+    reasons = _degraded.get()
+    if reasons is not None:
+        reasons.append(reason)
+
+
+async def run_stages(stages, values, on_event=None, checkpoint=None):
+    """
+    Execute stages in dependency order with maximal overlap
+
+    Args:
+        stages: List of Stage objects
+        values: Known inputs; stages whose name is already present are skipped
+        on_event: Optional callback(stage_name, event, result) with event in
+                  "skipped", "restored", "start", "done". Called on the event
+                  loop, use aio.run_sync_with_events to receive events on
+                  another thread.
+        checkpoint: Optional store with lookup(name, args, params) ->
+                    (found, value), store(name, args, params, value) and
+                    degraded(name, reasons) for stages that called
+                    mark_degraded, see checkpoints.RunCheckpoint
+
+    Returns:
+        dict: All input and stage values
+    """
+    values = dict(values)
+    emit = on_event or (lambda name, event, result: None)
+
+    names = {stage.name for stage in stages}
+    for stage in stages:
+        missing = [i for i in stage.inputs if i not in values and i not in names]
+        if missing:
+            raise ValueError(f"Stage '{stage.name}' has unresolvable inputs: {missing}")
+
+    pending = []
+    for stage in stages:
+        if stage.name in values:
+            emit(stage.name, "skipped", values[stage.name])
+        else:
+            pending.append(stage)
+
+    running = {}
+    try:
+        while pending or running:
+            restored = False
+            for stage in [s for s in pending if all(i in values for i in s.inputs)]:
+                pending.remove(stage)
+                args = [values[i] for i in stage.inputs]
+                if checkpoint is not None:
+                    found, value = checkpoint.lookup(stage.name, args, stage.params)
+                    if found:
+                        values[stage.name] = value
+                        emit(stage.name, "restored", value)
+                        restored = True
+                        continue
+                emit(stage.name, "start", None)
+                reasons = []
+                token = _degraded.set(reasons)
+                try:
+                    # The task copies the context, so the stage reports into its own list
+                    running[asyncio.ensure_future(stage.func(*args))] = (stage, args, reasons)
+                finally:
+                    _degraded.reset(token)
+
+            if restored:
+                # Restored values may make further stages ready right away
+                continue
+            if not running:
+                raise ValueError(f"Dependency cycle between stages: {[s.name for s in pending]}")
+
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            # Keep the results of stages that finished alongside a failing one
+            for task in sorted(done, key=lambda t: t.exception() is not None):
+                stage, args, reasons = running.pop(task)
+                values[stage.name] = task.result()
+                if checkpoint is not None and reasons:
+                    checkpoint.degraded(stage.name, reasons)
+                elif checkpoint is not None:
+                    checkpoint.store(stage.name, args, stage.params, values[stage.name])
+                emit(stage.name, "done", values[stage.name])
+    finally:
+        # A failed stage aborts the run, don't leave siblings running
+        for task in running:
+            task.cancel()
+
+    return values
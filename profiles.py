@@ -0,0 +1,88 @@
+"""
+Pipeline Profiles
+Named selections of pipeline steps with per-step model, temperature and
+token budget, defined in profiles.json (path overridable via
+PIPELINE_PROFILES). Steps:
+
+    outline, draft, verification, seo, humanize, seo+humanize (fused rewrite),
+    pipelined (draft, verification and humanization overlapped per section,
+              then SEO integration of the whole article)
+
+Settings per step: "model" (model id or family "opus" / "sonnet" / "haiku"),
+"temperature", "max_tokens" (output limit per request of the step) and
+"cache" (false to always call the API, e.g. for sampling-heavy steps).
+"""
+from config import PROFILES_FILE
+from storage import read_json
+import model_registry
+
+DEFAULT_PROFILE = "full"
+STEPS = ("outline", "draft", "verification", "seo", "humanize", "seo+humanize", "pipelined")
+REQUIRED_STEPS = ("outline", "draft")
+# Steps that do the work of other steps, which a profile then must not list
+COMBINED_STEPS = {
+    "seo+humanize": ("seo", "humanize"),
+    "pipelined": ("draft", "verification", "seo", "humanize", "seo+humanize"),
+}
+SETTING_KEYS = ("model", "temperature", "max_tokens", "cache")
+MODEL_FAMILIES = ("opus", "sonnet", "haiku")
+
+
+def load_profiles():
+    """
+    Read and validate all profiles
+
+    Raises:
+        ValueError: If the file is missing or a profile is invalid
+    """
+    profiles = read_json(PROFILES_FILE)
+    if not isinstance(profiles, dict) or not profiles:
+        raise ValueError(f"No pipeline profiles in {PROFILES_FILE}")
+
+    for name, profile in profiles.items():
+        steps = profile.get("stages", [])
+        unknown = [step for step in steps if step not in STEPS]
+        if unknown:
+            raise ValueError(f"Profile '{name}': unknown steps {unknown}")
+        covered = {step for combined in steps for step in COMBINED_STEPS.get(combined, ())}
+        missing = [step for step in REQUIRED_STEPS if step not in steps and step not in covered]
+        if missing:
+            raise ValueError(f"Profile '{name}': required steps missing {missing}")
+        for combined in steps:
+            replaced = [step for step in COMBINED_STEPS.get(combined, ()) if step in steps]
+            if replaced:
+                raise ValueError(f"Profile '{name}': '{combined}' replaces {replaced}")
+        for step, settings in profile.get("settings", {}).items():
+            if step not in steps:
+                raise ValueError(f"Profile '{name}': settings for unused step '{step}'")
+            unknown = [key for key in settings if key not in SETTING_KEYS]
+            if unknown:
+                raise ValueError(f"Profile '{name}': unknown settings {unknown} for '{step}'")
+    return profiles
+
+
+def profile_names():
+    return list(load_profiles())
+
+
+def get_profile(name=None):
+    """Profile dict with "stages", "settings" and "description" """
+    profiles = load_profiles()
+    name = name or DEFAULT_PROFILE
+    if name not in profiles:
+        raise ValueError(f"Unknown pipeline profile '{name}' (available: {', '.join(profiles)})")
+    profile = profiles[name]
+    return {
+        "name": name,
+        "description": profile.get("description", ""),
+        "stages": list(profile["stages"]),
+        "settings": profile.get("settings", {}),
+    }
+
+
+def resolve_settings(settings):
+    """Replace a model family name by the newest model of that family"""
+    settings = dict(settings)
+    if settings.get("model") in MODEL_FAMILIES:
+        settings["model"] = model_registry.strongest_in_family(settings["model"])
+    return settings
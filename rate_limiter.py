@@ -0,0 +1,237 @@
+"""
+Rate Limiter
+One shared limiter per provider and model. Each limiter keeps token buckets
+for requests, input tokens and output tokens per minute, learns the real
+limits from the response headers and retries failed calls with bounded
+exponential backoff plus jitter (honouring Retry-After).
+
+Limits can be preset via .env, e.g. CLAUDE_RPM=50, CLAUDE_INPUT_TPM=40000,
+CLAUDE_OUTPUT_TPM=8000, OPENAI_RPM=7, SEMRUSH_RPM=600. Token budgets without
+a preset are unlimited until the first response headers arrive.
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+import requests
+
+MAX_ATTEMPTS = 5
+BASE_BACKOFF = 1.0
+MAX_BACKOFF = 60.0
+RETRY_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+
+# Rough average for German prose
+CHARS_PER_TOKEN = 3.5
+
+DEFAULT_LIMITS = {
+    "anthropic": {"requests": 50},
+    "openai": {"requests": 7},
+    "semrush": {"requests": 600},
+}
+ENV_PREFIX = {"anthropic": "CLAUDE", "openai": "OPENAI", "semrush": "SEMRUSH"}
+
+# Response header -> (bucket, "limit" | "remaining")
+HEADER_MAP = {
+    "anthropic-ratelimit-requests-limit": ("requests", "limit"),
+    "anthropic-ratelimit-requests-remaining": ("requests", "remaining"),
+    "anthropic-ratelimit-input-tokens-limit": ("input_tokens", "limit"),
+    "anthropic-ratelimit-input-tokens-remaining": ("input_tokens", "remaining"),
+    "anthropic-ratelimit-output-tokens-limit": ("output_tokens", "limit"),
+    "anthropic-ratelimit-output-tokens-remaining": ("output_tokens", "remaining"),
+    "x-ratelimit-limit-requests": ("requests", "limit"),
+    "x-ratelimit-remaining-requests": ("requests", "remaining"),
+    "x-ratelimit-limit-tokens": ("input_tokens", "limit"),
+    "x-ratelimit-remaining-tokens": ("input_tokens", "remaining"),
+}
+
+
+def estimate_tokens(text):
+    """Rough token count for German prose (about 3.5 characters per token)"""
+    return int(len(text) / CHARS_PER_TOKEN) + 1
+
+
+class TokenBucket:
+    """Per-minute budget that refills continuously. The level may go negative
+    when actual usage exceeds the reservation; later callers then wait longer."""
+
+    def __init__(self, per_minute=None):
+        self.capacity = per_minute
+        self.level = per_minute or 0.0
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        if self.capacity:
+            rate = self.capacity / 60.0
+            self.level = min(self.capacity, self.level + (now - self.updated) * rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until amount is available (0 if it is available now)"""
+        if not self.capacity:
+            return 0.0
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / (self.capacity / 60.0)
+
+    def consume(self, amount):
+        if self.capacity:
+            self.level -= amount
+
+    def sync(self, limit=None, remaining=None):
+        """Adopt the limit / remaining budget reported by the provider"""
+        now = time.monotonic()
+        if limit and not self.capacity:
+            # First time we learn this budget: start from what is left
+            self.capacity = limit
+            self.level = remaining if remaining is not None else limit
+            self.updated = now
+            return
+        if limit:
+            self.capacity = limit
+        self._refill(now)
+        if remaining is not None and self.capacity:
+            self.level = min(self.level, remaining)
+
+
+class Limiter:
+    """Request and token budgets for one (provider, model) pair"""
+
+    def __init__(self, provider, model):
+        self.provider = provider
+        self.model = model
+        limits = dict(DEFAULT_LIMITS.get(provider, {}))
+        prefix = ENV_PREFIX.get(provider, provider.upper())
+        for bucket, suffix in (("requests", "RPM"), ("input_tokens", "INPUT_TPM"), ("output_tokens", "OUTPUT_TPM")):
+            value = os.getenv(f"{prefix}_{suffix}")
+            if value:
+                limits[bucket] = int(value)
+        self.buckets = {name: TokenBucket(limits.get(name)) for name in ("requests", "input_tokens", "output_tokens")}
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    async def acquire(self, input_tokens=0):
+        """Wait until a request with the given input size fits all budgets"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = max(
+                    self.paused_until - now,
+                    self.buckets["requests"].wait_time(1, now),
+                    self.buckets["input_tokens"].wait_time(input_tokens, now),
+                    # Output size is unknown up front, only wait for past overuse
+                    self.buckets["output_tokens"].wait_time(0, now),
+                )
+                if wait <= 0:
+                    self.buckets["requests"].consume(1)
+                    self.buckets["input_tokens"].consume(input_tokens)
+                    return
+            await asyncio.sleep(wait)
+
+    def record(self, headers=None, usage=None, reserved_input=0):
+        """Account actual token usage and adopt limits from response headers"""
+        with self._lock:
+            if headers:
+                reported = {}
+                for header, (bucket, kind) in HEADER_MAP.items():
+                    value = headers.get(header)
+                    if value is not None and str(value).isdigit():
+                        reported.setdefault(bucket, {})[kind] = int(value)
+                for bucket, values in reported.items():
+                    self.buckets[bucket].sync(values.get("limit"), values.get("remaining"))
+            if usage:
+                input_tokens, output_tokens = usage
+                self.buckets["input_tokens"].consume(input_tokens - reserved_input)
+                self.buckets["output_tokens"].consume(output_tokens)
+
+    def pause(self, seconds):
+        """Hold back every caller of this model, e.g. after a 429"""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(provider, model="default"):
+    """Shared limiter for a provider/model pair"""
+    key = (provider, model)
+    with _limiters_lock:
+        if key not in _limiters:
+            _limiters[key] = Limiter(provider, model)
+        return _limiters[key]
+
+
+def _status_code(error):
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status
+
+
+def is_retryable(error):
+    """Rate limits, overload, server errors and connection problems are retried"""
+    status = _status_code(error)
+    if status is not None:
+        return status in RETRY_STATUS
+    if isinstance(error, (ConnectionError, TimeoutError, asyncio.TimeoutError,
+                          requests.ConnectionError, requests.Timeout)):
+        return True
+    return type(error).__name__ in ("APIConnectionError", "APITimeoutError")
+
+
+def retry_after(error):
+    """Delay requested by the server in seconds, if any"""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000.0
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    return None
+
+
+def backoff_delay(attempt):
+    """Exponential backoff with jitter, capped at MAX_BACKOFF"""
+    delay = min(MAX_BACKOFF, BASE_BACKOFF * 2 ** attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+async def call(provider, model, request, input_tokens=0, max_attempts=MAX_ATTEMPTS):
+    """
+    Run request() under the provider/model limiter with bounded retries
+
+    Args:
+        provider: "anthropic", "openai" or "semrush"
+        model: Model name (budgets are tracked per model)
+        request: Coroutine function returning (result, headers, usage) where
+                 usage is (input_tokens, output_tokens) or None
+        input_tokens: Estimated prompt size reserved before sending
+        max_attempts: Attempts before the last error is raised
+
+    Returns:
+        The result of request()
+    """
+    limiter = get_limiter(provider, model)
+    for attempt in range(max_attempts):
+        await limiter.acquire(input_tokens)
+        try:
+            result, headers, usage = await request()
+        except Exception as e:
+            limiter.record(getattr(getattr(e, "response", None), "headers", None))
+            if attempt == max_attempts - 1 or not is_retryable(e):
+                raise
+            delay = retry_after(e) or backoff_delay(attempt)
+            if _status_code(e) == 429:
+                limiter.pause(delay)
+            print(f"[WARN] {provider}/{model}: {type(e).__name__}, neuer Versuch in {delay:.1f}s "
+                  f"({attempt + 1}/{max_attempts - 1})")
+            await asyncio.sleep(delay)
+            continue
+        limiter.record(headers, usage, reserved_input=input_tokens if usage else 0)
+        return result
@@ -0,0 +1,176 @@
+"""
+Response Cache
+Content-addressed cache for Claude and DALL-E responses. Requests are keyed
+by a hash of (model, prompt, temperature, max_tokens, stage), so repeating
+an identical request (Streamlit reruns, regenerating an article while
+editing) is answered instantly and for free.
+
+Lookups go to an in-memory LRU first and then to an on-disk store in
+CACHE_DIR/responses shared by all processes. The disk store is bounded by
+size (oldest entries are evicted first) and entries expire after a maximum
+age. Stages listed in RESPONSE_CACHE_SKIP_STAGES (or with "cache": false in
+a pipeline profile) always call the API.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from config import (CACHE_DIR, RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_MAX_AGE,
+                    RESPONSE_CACHE_MEMORY_ITEMS, RESPONSE_CACHE_SKIP_STAGES)
+from storage import read_json, write_json
+
+CACHE_SUBDIR = os.path.join(CACHE_DIR, "responses")
+
+# Evict down to this share of the size limit, so not every write prunes
+PRUNE_TARGET = 0.9
+
+
+def make_key(**parts):
+    """Stable hash of the request parts"""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """In-memory LRU in front of a size- and age-bounded directory of JSON files"""
+
+    def __init__(self, directory=CACHE_SUBDIR, max_bytes=RESPONSE_CACHE_MAX_BYTES,
+                 max_age=RESPONSE_CACHE_MAX_AGE, memory_items=RESPONSE_CACHE_MEMORY_ITEMS,
+                 skip_stages=RESPONSE_CACHE_SKIP_STAGES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.memory_items = memory_items
+        self.skip_stages = set(skip_stages)
+        self._memory = OrderedDict()
+        self._disk_bytes = None
+        self._lock = threading.Lock()
+        self.counters = {}
+
+    def enabled_for(self, stage):
+        return self.max_bytes > 0 and stage not in self.skip_stages
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _count(self, stage, outcome):
+        with self._lock:
+            counter = self.counters.setdefault(stage, {"hits": 0, "misses": 0})
+            counter[outcome] += 1
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def get(self, key, stage="default", max_age=None):
+        """
+        Cached value for key, or None on a miss
+
+        Args:
+            max_age: Stricter age limit in seconds for this lookup (e.g. for
+                     image URLs that expire on the provider side)
+        """
+        max_age = min(self.max_age, max_age) if max_age else self.max_age
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+        if entry is None:
+            entry = read_json(self._path(key))
+            if entry is not None:
+                self._remember(key, entry)
+                try:
+                    # Recently used entries survive size eviction longer
+                    os.utime(self._path(key))
+                except OSError:
+                    pass
+
+        if entry is None or now - entry["created"] > max_age:
+            self._count(stage, "misses")
+            return None
+        self._count(stage, "hits")
+        return entry["value"]
+
+    def put(self, key, value, stage="default"):
+        entry = {"created": time.time(), "stage": stage, "value": value}
+        self._remember(key, entry)
+        path = self._path(key)
+        try:
+            write_json(path, entry)
+            size = os.path.getsize(path)
+        except OSError as e:
+            print(f"[WARN] Response cache could not be written: {e}")
+            return
+
+        with self._lock:
+            if self._disk_bytes is not None:
+                self._disk_bytes += size
+            needs_prune = self._disk_bytes is None or self._disk_bytes > self.max_bytes
+        if needs_prune:
+            self.prune()
+
+    def prune(self):
+        """Delete entries unused for max_age, then the least recently used until under the size limit"""
+        now = time.time()
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        target = self.max_bytes * PRUNE_TARGET
+        for mtime, size, path in sorted(files):
+            expired = now - mtime > self.max_age
+            if not expired and total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+        with self._lock:
+            self._disk_bytes = total
+
+    def clear(self):
+        """Drop all cached responses"""
+        with self._lock:
+            self._memory.clear()
+        max_bytes, self.max_bytes = self.max_bytes, 0
+        try:
+            self.prune()
+        finally:
+            self.max_bytes = max_bytes
+
+    def stats(self):
+        """Hit/miss counters overall and per stage"""
+        with self._lock:
+            per_stage = {stage: dict(counter) for stage, counter in self.counters.items()}
+        hits = sum(c["hits"] for c in per_stage.values())
+        misses = sum(c["misses"] for c in per_stage.values())
+        return {"hits": hits, "misses": misses, "stages": per_stage}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Process-wide response cache"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
@@ -0,0 +1,183 @@
+"""
+Markdown Section Helpers
+Splits outlines and articles at heading boundaries so stages can work on
+sections independently and reassemble them in order.
+"""
+import re
+
+HEADING_RE = re.compile(r'^(#{1,6})\s+(.*\S)\s*$')
+
+# A lone H1 with many H2s is drafted in parts of this many H2s
+MAX_SUBHEADINGS_PER_PART = 3
+
+# Upper size of a chunk processed in one request (one section may exceed it)
+MAX_CHUNK_CHARS = 6000
+
+
+def parse_outline(outline):
+    """
+    Group a #/## outline into draftable parts
+
+    Returns:
+        list of dicts with "title" (H1 text or None for a continuation part of
+        the previous H1) and "subheadings" (H2 texts)
+    """
+    groups = []
+    for line in outline.splitlines():
+        match = HEADING_RE.match(line.strip())
+        if not match:
+            continue
+        level, title = len(match.group(1)), match.group(2)
+        if level == 1 or not groups:
+            groups.append({"title": title, "subheadings": []})
+        else:
+            groups[-1]["subheadings"].append(title)
+
+    if len(groups) > 1:
+        return groups
+
+    # Single H1: split its H2s into several parts instead
+    parts = []
+    for group in groups:
+        subheadings = group["subheadings"]
+        for start in range(0, max(len(subheadings), 1), MAX_SUBHEADINGS_PER_PART):
+            parts.append({
+                "title": group["title"] if start == 0 else None,
+                "subheadings": subheadings[start:start + MAX_SUBHEADINGS_PER_PART],
+            })
+    return parts
+
+
+def format_part(part):
+    """Render a parsed outline part back to #/## markdown"""
+    lines = [f"# {part['title']}"] if part["title"] else []
+    lines += [f"## {sub}" for sub in part["subheadings"]]
+    return "\n".join(lines)
+
+
+def split_sections(text, max_level=1):
+    """
+    Split markdown before every heading of level <= max_level
+
+    The split is lossless: "".join(split_sections(text)) == text. Text before
+    the first heading (e.g. the client intro) becomes its own chunk.
+    """
+    chunks = []
+    current = []
+    for line in text.splitlines(keepends=True):
+        match = HEADING_RE.match(line.strip())
+        if match and len(match.group(1)) <= max_level and current:
+            chunks.append("".join(current))
+            current = []
+        current.append(line)
+    if current:
+        chunks.append("".join(current))
+    return chunks
+
+
+class SectionStream:
+    """
+    Incremental split_sections for streamed text
+
+    feed() returns the sections completed by a chunk (a section is complete
+    once the next heading of level <= max_level starts), close() the rest.
+    Leading blank lines are kept with the first section.
+    """
+
+    def __init__(self, max_level=1):
+        self.max_level = max_level
+        self._partial = ""
+        self._lines = []
+
+    def _add_line(self, line):
+        match = HEADING_RE.match(line.strip())
+        completed = None
+        if match and len(match.group(1)) <= self.max_level and "".join(self._lines).strip():
+            completed = "".join(self._lines)
+            self._lines = []
+        self._lines.append(line)
+        return completed
+
+    def feed(self, chunk):
+        lines = (self._partial + chunk).splitlines(keepends=True)
+        # The last line may continue in the next chunk
+        self._partial = lines.pop() if lines and not lines[-1].endswith("\n") else ""
+        return [section for section in map(self._add_line, lines) if section is not None]
+
+    def close(self):
+        sections = []
+        if self._partial:
+            completed = self._add_line(self._partial)
+            if completed is not None:
+                sections.append(completed)
+            self._partial = ""
+        if "".join(self._lines).strip():
+            sections.append("".join(self._lines))
+        self._lines = []
+        return sections
+
+
+def chunk_article(text, max_chars=MAX_CHUNK_CHARS):
+    """
+    Split an article into chunks of whole sections for per-chunk processing
+
+    Splits at H1 headings (at H2 if the article has a single H1) and merges
+    neighbouring sections while the chunk stays under max_chars. Lossless like
+    split_sections.
+    """
+    sections = split_sections(text, max_level=1)
+    if len(sections) <= 2 and len(text) > max_chars:
+        sections = split_sections(text, max_level=2)
+
+    chunks = []
+    for section in sections:
+        if chunks and len(chunks[-1]) + len(section) <= max_chars:
+            chunks[-1] += section
+        else:
+            chunks.append(section)
+    return chunks
+
+
+def headings(text):
+    """All markdown heading lines of a text, in order"""
+    return [line.strip() for line in text.splitlines() if HEADING_RE.match(line.strip())]
+
+
+def _shingles(paragraph, size=5):
+    words = re.findall(r'\w+', paragraph.lower())
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def remove_duplicate_paragraphs(section_texts, threshold=0.8):
+    """
+    Drop paragraphs that repeat content of an earlier section
+
+    Paragraphs are compared by Jaccard similarity of 5-word shingles, headings
+    are never removed. Only duplicates across sections are checked.
+
+    Returns:
+        (cleaned section texts, number of removed paragraphs)
+    """
+    seen = []
+    cleaned = []
+    removed = 0
+    for text in section_texts:
+        kept = []
+        section_shingles = []
+        for paragraph in re.split(r'\n\s*\n', text):
+            stripped = paragraph.strip()
+            shingles = _shingles(stripped)
+            is_heading = bool(HEADING_RE.match(stripped.splitlines()[0])) if stripped else False
+            if shingles and not is_heading and any(
+                len(shingles & other) / len(shingles | other) >= threshold for other in seen
+            ):
+                removed += 1
+                continue
+            kept.append(paragraph)
+            if shingles and not is_heading:
+                section_shingles.append(shingles)
+        seen.extend(section_shingles)
+        cleaned.append("\n\n".join(kept))
+    return cleaned, removed
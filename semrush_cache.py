@@ -0,0 +1,174 @@
+"""
+SEMrush Cache
+Raw SEMrush report responses are kept on disk under CACHE_DIR/semrush, keyed
+by (type, phrase, database, display_limit). Search volumes change monthly,
+so entries stay fresh for SEMRUSH_CACHE_TTL (default 30 days). Only data
+and "ERROR 50 :: NOTHING FOUND" are cached; other error bodies (wrong key,
+exhausted units) raise SemrushError and are never stored.
+
+API units are counted per day. Every request reserves its worst-case cost
+in the ledger before it is sent, so concurrent requests see each other's
+reservations; the reservation is settled to the actual cost afterwards. With
+SEMRUSH_DAILY_UNITS set, a request whose reservation would exceed the budget
+fails fast with SemrushBudgetExceeded; callers then fall back to a stale
+cache entry if there is one.
+"""
+import os
+import threading
+import time
+from config import CACHE_DIR, SEMRUSH_CACHE_TTL, SEMRUSH_DAILY_UNITS
+from response_cache import make_key
+from storage import read_json, write_json
+
+CACHE_SUBDIR = os.path.join(CACHE_DIR, "semrush")
+
+# API units per returned line (SEMrush price list), unknown reports count as the most expensive
+UNIT_COSTS = {
+    "phrase_related": 40,
+    "phrase_fullsearch": 20,
+    "phrase_questions": 40,
+    "phrase_this": 10,
+}
+DEFAULT_UNIT_COST = 40
+
+
+class SemrushBudgetExceeded(RuntimeError):
+    """The daily unit budget does not cover another request"""
+
+
+class SemrushError(RuntimeError):
+    """SEMrush answered with an error other than an empty result"""
+
+
+# Error body of a valid request without results, cached like data
+NOTHING_FOUND = "ERROR 50 :: NOTHING FOUND"
+
+
+def unit_cost(report_type, rows):
+    return UNIT_COSTS.get(report_type, DEFAULT_UNIT_COST) * rows
+
+
+def check_response(text):
+    """Raise SemrushError for error bodies like "ERROR 120 :: WRONG KEY", NOTHING_FOUND is a valid answer"""
+    first_line = text.strip().split("\n", 1)[0].strip()
+    if first_line.startswith("ERROR") and first_line != NOTHING_FOUND:
+        raise SemrushError(first_line)
+
+
+def response_rows(text):
+    """Data lines of a SEMrush CSV response (NOTHING_FOUND has none)"""
+    lines = [line for line in text.strip().splitlines() if line.strip()]
+    if not lines or lines[0].startswith("ERROR"):
+        return 0
+    return len(lines) - 1
+
+
+class SemrushCache:
+    """Disk cache of SEMrush responses plus the per-day unit ledger"""
+
+    def __init__(self, directory=CACHE_SUBDIR, ttl=SEMRUSH_CACHE_TTL, daily_units=SEMRUSH_DAILY_UNITS):
+        self.directory = directory
+        self.ttl = ttl
+        self.daily_units = daily_units
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "stale": 0}
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _ledger_path(self):
+        return os.path.join(self.directory, "units", f"{time.strftime('%Y-%m-%d')}.json")
+
+    def _count(self, outcome):
+        with self._lock:
+            self.counters[outcome] += 1
+
+    def lookup(self, request):
+        """
+        Cached entry for a request dict (type, phrase, database, display_limit)
+
+        Returns:
+            (entry, fresh): entry is None on a miss, fresh is False once the
+            entry is older than the TTL
+        """
+        entry = read_json(self._path(make_key(**request)))
+        try:
+            if entry is not None:
+                check_response(entry["text"])
+        except SemrushError:
+            # Written before errors were kept out of the cache
+            entry = None
+        if entry is None:
+            self._count("misses")
+            return None, False
+        fresh = time.time() - entry["created"] <= self.ttl
+        self._count("hits" if fresh else "misses")
+        return entry, fresh
+
+    def serve_stale(self, entry, reason):
+        self._count("stale")
+        age_days = (time.time() - entry["created"]) / 86400
+        print(f"[WARN] SEMrush: {reason} - verwende Cache-Eintrag von vor {age_days:.0f} Tagen")
+        return entry["text"]
+
+    def store(self, request, text):
+        try:
+            write_json(self._path(make_key(**request)), {"created": time.time(), "request": request, "text": text})
+        except OSError as e:
+            print(f"[WARN] SEMrush cache could not be written: {e}")
+
+    def units_used_today(self):
+        return (read_json(self._ledger_path()) or {}).get("units", 0)
+
+    def _read_ledger(self):
+        return read_json(self._ledger_path()) or {"units": 0, "requests": 0}
+
+    def reserve_units(self, request):
+        """
+        Reserve the worst-case cost of a request (display_limit full lines)
+
+        Raises:
+            SemrushBudgetExceeded: The reservation does not fit today's budget
+
+        Returns:
+            int: Reserved units, pass them to settle_units once the request is done
+        """
+        projected = unit_cost(request["type"], request["display_limit"])
+        # Processes sharing the cache directory may race here, the ledger is a guard rail, not billing
+        with self._lock:
+            ledger = self._read_ledger()
+            if self.daily_units and ledger["units"] + projected > self.daily_units:
+                raise SemrushBudgetExceeded(
+                    f"SEMrush daily budget exhausted ({ledger['units']} of {self.daily_units} units used "
+                    f"or reserved, request needs up to {projected})")
+            ledger["units"] += projected
+            write_json(self._ledger_path(), ledger)
+        return projected
+
+    def settle_units(self, reserved, units, answered=True):
+        """Replace a reservation by the actual cost (0 and answered=False if the request failed)"""
+        with self._lock:
+            ledger = self._read_ledger()
+            ledger["units"] = max(0, ledger["units"] + units - reserved)
+            ledger["requests"] += 1 if answered else 0
+            write_json(self._ledger_path(), ledger)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+        stats["units_today"] = self.units_used_today()
+        stats["daily_units"] = self.daily_units
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_semrush_cache():
+    """Process-wide SEMrush cache"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SemrushCache()
+        return _cache
@@ -0,0 +1,31 @@
+"""
+On-disk JSON helpers shared by the caches
+Writes are atomic so several processes can share one cache directory
+"""
+import json
+import os
+import tempfile
+
+
+def read_json(path, default=None):
+    """Read a JSON file, returning default if it is missing or corrupt"""
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return default
+
+
+def write_json(path, data):
+    """Write JSON via a temp file + rename so readers never see partial files"""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            json.dump(data, file, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
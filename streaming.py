@@ -0,0 +1,82 @@
+"""
+Stream Collector
+Consumes a streamed Claude response: chunks are kept in a list and joined
+once at the end (no string copy per chunk), and progress is reported at
+fixed time intervals with characters, tokens/s and an ETA, so the app and
+the CLI can show each stage's text while it is being written.
+"""
+import itertools
+import time
+from rate_limiter import CHARS_PER_TOKEN
+
+# Seconds between two progress events of one stream
+PROGRESS_INTERVAL = 0.5
+
+_stream_ids = itertools.count(1)
+
+
+class StreamCollector:
+    """
+    Collects the chunks of one stream
+
+    Args:
+        stage: Pipeline stage name reported with every progress event
+        on_progress: Optional callback(progress dict), see progress()
+        expected_tokens: Expected output size for the ETA (None: no ETA)
+    """
+
+    def __init__(self, stage="default", on_progress=None, expected_tokens=None):
+        self.stage = stage
+        self.on_progress = on_progress
+        self.expected_tokens = expected_tokens
+        self.stream_id = next(_stream_ids)
+        self.chunks = []
+        self.chars = 0
+        self.started = time.perf_counter()
+        self.first_token_seconds = None
+        self._last_event = self.started
+
+    def add(self, chunk):
+        now = time.perf_counter()
+        if self.first_token_seconds is None:
+            self.first_token_seconds = now - self.started
+        self.chunks.append(chunk)
+        self.chars += len(chunk)
+        if self.on_progress is not None and now - self._last_event >= PROGRESS_INTERVAL:
+            self._last_event = now
+            self.on_progress(self.progress(now))
+
+    def restart(self, text):
+        """Continue the stream after text (a continuation request, see continuation)"""
+        self.chunks = [text] if text else []
+        self.chars = len(text)
+
+    def text(self):
+        return "".join(self.chunks)
+
+    def progress(self, now=None):
+        """
+        Current state of the stream
+
+        Returns:
+            dict: stage, stream (ID, parallel streams of one stage differ),
+                  chars, tokens (estimated), tokens_per_second, eta_seconds
+                  (None without expected_tokens) and text received so far
+        """
+        now = now or time.perf_counter()
+        tokens = int(self.chars / CHARS_PER_TOKEN)
+        # Rate from the first token on, the wait before it is latency
+        writing = now - self.started - (self.first_token_seconds or 0)
+        tokens_per_second = tokens / writing if writing > 0 else 0.0
+        eta = None
+        if self.expected_tokens and tokens_per_second:
+            eta = max(self.expected_tokens - tokens, 0) / tokens_per_second
+        return {
+            "stage": self.stage,
+            "stream": self.stream_id,
+            "chars": self.chars,
+            "tokens": tokens,
+            "tokens_per_second": tokens_per_second,
+            "eta_seconds": eta,
+            "text": self.text(),
+        }
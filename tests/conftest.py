@@ -0,0 +1,15 @@
+"""
+Tests run offline against local fakes (tests/fake_batches.py,
+tests/semrush_stub.py). Caches, runs and the keyword store go to a temporary
+directory; config reads these paths at import, so they are set here before
+any module of the app is imported.
+"""
+import os
+import tempfile
+
+_work_dir = tempfile.mkdtemp(prefix="seo-tests-")
+os.environ["SEO_CACHE_DIR"] = os.path.join(_work_dir, "cache")
+os.environ["SEO_RUNS_DIR"] = os.path.join(_work_dir, "runs")
+os.environ["RESPONSE_CACHE_MAX_MB"] = "0"
+os.environ.setdefault("CLAUDE_API_KEY", "test-key")
+os.environ.setdefault("SEMRUSH_API_KEY", "test-key")
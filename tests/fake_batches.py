@@ -0,0 +1,161 @@
+"""
+Fake Message Batches Endpoint
+Local HTTP server with the Message Batches routes the Anthropic SDK calls
+(create, retrieve, results). Clients reach it through ANTHROPIC_BASE_URL, the
+same base-URL config a real bulk run uses, so the SDK, message_batches and
+llm are exercised unchanged.
+
+A batch reports "in_progress" until it has been retrieved `polls` times,
+then "ended" with a results_url on this server. respond(params) produces
+the text of every request; a request whose respond raises is returned as
+"errored".
+
+    python -m tests.fake_batches 8766
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8766 python batch.py topics.csv --bulk
+"""
+import itertools
+import json
+import sys
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BATCHES_PATH = "/v1/messages/batches"
+
+
+def echo(params):
+    """Default responder: repeats the user message"""
+    return f"Antwort auf: {params['messages'][-1]['content']}"
+
+
+def _timestamp(offset_hours=0):
+    return (datetime.now(timezone.utc) + timedelta(hours=offset_hours)).isoformat()
+
+
+def _message(params, text):
+    return {
+        "id": "msg_fake",
+        "type": "message",
+        "role": "assistant",
+        "model": params["model"],
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": "end_turn",
+        "stop_sequence": None,
+        "usage": {"input_tokens": 10, "output_tokens": len(text.split())},
+    }
+
+
+class FakeBatchServer:
+    """Fake Message Batches API on 127.0.0.1, use as a context manager"""
+
+    def __init__(self, respond=echo, polls=2, port=0):
+        self.respond = respond
+        self.polls = polls
+        self.batches = {}
+        self.retrieves = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def create(self, requests):
+        with self._lock:
+            batch_id = f"msgbatch_fake{next(self._ids)}"
+            self.batches[batch_id] = {"requests": requests, "polls": 0, "created_at": _timestamp()}
+        return self.describe(batch_id)
+
+    def retrieve(self, batch_id):
+        with self._lock:
+            self.retrieves += 1
+            self.batches[batch_id]["polls"] += 1
+        return self.describe(batch_id)
+
+    def describe(self, batch_id):
+        batch = self.batches[batch_id]
+        ended = batch["polls"] >= self.polls
+        count = len(batch["requests"])
+        return {
+            "id": batch_id,
+            "type": "message_batch",
+            "processing_status": "ended" if ended else "in_progress",
+            "request_counts": {"processing": 0 if ended else count, "succeeded": count if ended else 0,
+                               "errored": 0, "canceled": 0, "expired": 0},
+            "created_at": batch["created_at"],
+            "expires_at": _timestamp(24),
+            "ended_at": _timestamp() if ended else None,
+            "cancel_initiated_at": None,
+            "archived_at": None,
+            "results_url": f"{self.url}{BATCHES_PATH}/{batch_id}/results" if ended else None,
+        }
+
+    def results(self, batch_id):
+        lines = []
+        for request in self.batches[batch_id]["requests"]:
+            try:
+                result = {"type": "succeeded", "message": _message(request["params"], self.respond(request["params"]))}
+            except Exception as e:
+                result = {"type": "errored", "error": {"type": "error", "error": {
+                    "type": "invalid_request_error", "message": str(e)}}}
+            lines.append(json.dumps({"custom_id": request["custom_id"], "result": result}))
+        return "\n".join(lines) + "\n"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _send(self, status, body, content_type="application/json"):
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                if self.path.split("?")[0] != BATCHES_PATH:
+                    return self._send(404, json.dumps({"type": "error", "error": {"type": "not_found_error"}}))
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                self._send(200, json.dumps(server.create(body["requests"])))
+
+            def do_GET(self):
+                parts = self.path.split("?")[0][len(BATCHES_PATH):].strip("/").split("/")
+                if not self.path.startswith(BATCHES_PATH) or parts[0] not in server.batches:
+                    return self._send(404, json.dumps({"type": "error", "error": {"type": "not_found_error"}}))
+                if parts[1:] == ["results"]:
+                    return self._send(200, server.results(parts[0]), "application/binary")
+                self._send(200, json.dumps(server.retrieve(parts[0])))
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8766
+    fake = FakeBatchServer(port=port)
+    print(f"Fake Message Batches endpoint: ANTHROPIC_BASE_URL={fake.url}")
+    try:
+        fake._server.serve_forever()
+    except KeyboardInterrupt:
+        fake._server.server_close()
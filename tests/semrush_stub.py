@@ -0,0 +1,110 @@
+"""
+SEMrush Stub Server
+Local HTTP server answering SEMrush Analytics API requests
+(?type=...&phrase=...&database=...&display_limit=...) with "Keyword;Search
+Volume" CSV, so keyword research runs offline. Point generator.py at it with
+SEMRUSH_API_URL.
+
+Answers come from `reports`, a dict (type, phrase, database) -> [(phrase,
+volume), ...]; unknown requests get rows derived from the seed, so any topic
+returns something. `errors` maps a seed to an error body such as
+"ERROR 120 :: WRONG KEY - ID PAIR". Every request is logged in `requests`.
+
+    python -m tests.semrush_stub 8765
+    SEMRUSH_API_URL=http://127.0.0.1:8765/ python generator.py
+"""
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+HEADER = "Keyword;Search Volume"
+
+
+def derived_rows(report_type, phrase, database):
+    """Rows for requests without a prepared answer: variants of the seed, volume by database"""
+    base = {"de": 100, "at": 20, "ch": 10}.get(database, 5)
+    seed = phrase.lower()
+    suffixes = {"phrase_related": ["strafe", "anwalt"], "phrase_fullsearch": ["strafe", "urteil"],
+                "phrase_questions": ["was ist"]}.get(report_type, ["info"])
+    return [(f"{seed} {suffix}", base * (len(suffixes) - i)) for i, suffix in enumerate(suffixes)]
+
+
+class SemrushStub:
+    """SEMrush API stub on 127.0.0.1, use as a context manager"""
+
+    def __init__(self, reports=None, errors=None, delay=0.0, port=0):
+        self.reports = reports or {}
+        self.errors = errors or {}
+        self.delay = delay
+        self.requests = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def answer(self, query):
+        request = (query["type"], query["phrase"], query["database"])
+        with self._lock:
+            self.requests.append(request)
+        if self.delay:
+            time.sleep(self.delay)
+        if query["phrase"] in self.errors:
+            return self.errors[query["phrase"]]
+        rows = self.reports.get(request)
+        if rows is None:
+            rows = derived_rows(*request)
+        if not rows:
+            return "ERROR 50 :: NOTHING FOUND"
+        rows = rows[:int(query.get("display_limit", len(rows)))]
+        return "\n".join([HEADER] + [f"{phrase};{volume}" for phrase, volume in rows])
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                query = {key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()}
+                if not {"type", "phrase", "database"} <= query.keys():
+                    body, status = "ERROR 30 :: QUERY TYPE NOT FOUND", 400
+                else:
+                    body, status = stub.answer(query), 200
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "text/plain; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    stub = SemrushStub(port=port)
+    print(f"SEMrush stub: SEMRUSH_API_URL={stub.url}")
+    try:
+        stub._server.serve_forever()
+    except KeyboardInterrupt:
+        stub._server.server_close()
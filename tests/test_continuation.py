@@ -0,0 +1,84 @@
+"""Streamed text delivery and continuation of interrupted responses"""
+import asyncio
+import types
+import pytest
+import llm
+from continuation import TextDelivery
+
+
+class FakeStream:
+    """messages.stream() stand-in yielding scripted chunks, optionally breaking off"""
+
+    def __init__(self, chunks, stop_reason, fail_at=None):
+        self.chunks, self.stop_reason, self.fail_at = chunks, stop_reason, fail_at
+        self.response = types.SimpleNamespace(headers={})
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    @property
+    async def text_stream(self):
+        for i, chunk in enumerate(self.chunks):
+            if i == self.fail_at:
+                raise ConnectionError("connection reset")
+            yield chunk
+
+    async def get_final_message(self):
+        usage = types.SimpleNamespace(input_tokens=10, output_tokens=5, cache_read_input_tokens=0,
+                                      cache_creation_input_tokens=0)
+        return types.SimpleNamespace(usage=usage, stop_reason=self.stop_reason)
+
+
+@pytest.fixture
+def script(monkeypatch):
+    streams, requests = [], []
+
+    def stream(**params):
+        requests.append(params)
+        return FakeStream(*streams.pop(0))
+    client = types.SimpleNamespace(messages=types.SimpleNamespace(stream=stream))
+    monkeypatch.setattr(llm, "get_async_claude_client", lambda: client)
+    return streams, requests
+
+
+def collect():
+    received = []
+
+    async def on_text(text):
+        received.append(text)
+    return received, on_text
+
+
+def test_interrupted_stream_is_continued_without_repeating_text(script):
+    streams, requests = script
+    streams[:] = [
+        (["# A\n\nAbsatz eins.\n\nAbsatz zw", "ei halb"], None, 1),
+        (["Absatz zwei.\n\nAbsatz dr"], "max_tokens"),
+        (["Absatz zwei.\n\nAbsatz drei.\n"], "end_turn"),
+    ]
+    received, on_text = collect()
+
+    result = asyncio.run(llm.complete("Artikel", 1000, 0.1, stream=True, stage="test", on_text=on_text,
+                                      model="claude-test"))
+
+    assert result == "# A\n\nAbsatz eins.\n\nAbsatz zwei.\n\nAbsatz drei.\n"
+    assert received == ["# A\n\nAbsatz eins.\n\n", "Absatz zwei.\n\n", "Absatz drei.\n"]
+    # The last request continues after the kept text
+    assert requests[2]["messages"][1] == {"role": "assistant", "content": "# A\n\nAbsatz eins.\n\nAbsatz zwei."}
+
+
+def test_delivery_stops_at_paragraph_breaks_once_there_is_one():
+    received, on_text = collect()
+    delivery = TextDelivery(on_text)
+
+    async def run():
+        for chunk in ["Zeile 1\n", "Zeile 2\n", "\nAbsatz\n", "Rest\n"]:
+            await delivery.add(chunk)
+        await delivery.finish("Zeile 1\nZeile 2\n\nAbsatz\nRest\n")
+    asyncio.run(run())
+
+    # A paragraph break spanning two chunks counts, later line breaks no longer do
+    assert received == ["Zeile 1\n", "Zeile 2\n", "\n", "Absatz\nRest\n"]
@@ -0,0 +1,49 @@
+"""Locked legal facts in model edits"""
+import pytest
+from edits import LEGAL_PATTERNS, locked_matches, resolve_edits
+
+TEXT = ("Der Handel nach § 29 Abs. 1 BtMG wird mit Freiheitsstrafe bis zu fünf Jahren oder Geldstrafe bestraft. "
+        "In besonders schweren Fällen droht Freiheitsstrafe nicht unter einem Jahr. "
+        "Das Fahrverbot dauert einen Monat bis drei Monate.")
+
+
+def resolve(find, replace):
+    return resolve_edits(TEXT, [{"action": "replace", "find": find, "replace": replace, "reason": "SEO"}],
+                         locked_patterns=LEGAL_PATTERNS)
+
+
+@pytest.mark.parametrize("penalty", [
+    "nicht unter einem Jahr", "einem Monat", "ein Jahr", "eine Woche", "einen Tag",
+    "bis zu fünf Jahren", "1 bis 15 Jahre", "mindestens 3 Monate", "90 Tagessätze", "2.500 Euro",
+])
+def test_singular_and_plural_penalties_are_locked(penalty):
+    assert locked_matches(f"Es droht {penalty}.") == {penalty: 1}
+
+
+@pytest.mark.parametrize("find, replace", [
+    # Minimum penalty removed
+    ("droht Freiheitsstrafe nicht unter einem Jahr", "droht eine empfindliche Freiheitsstrafe"),
+    # Minimum turned into a maximum
+    ("droht Freiheitsstrafe nicht unter einem Jahr", "droht Freiheitsstrafe bis zu einem Jahr"),
+    # Maximum penalty changed
+    ("Freiheitsstrafe bis zu fünf Jahren", "Freiheitsstrafe bis zu drei Jahren"),
+    # Maximum penalty removed
+    ("mit Freiheitsstrafe bis zu fünf Jahren oder Geldstrafe", "mit Freiheits- oder Geldstrafe"),
+    # Range changed
+    ("einen Monat bis drei Monate", "einen Monat bis sechs Monate"),
+    # Paragraph changed
+    ("§ 29 Abs. 1 BtMG", "§ 29a BtMG"),
+])
+def test_edits_that_alter_a_penalty_or_paragraph_are_rejected(find, replace):
+    changes, rejected = resolve(find, replace)
+
+    assert changes == []
+    assert rejected[0]["error"] == "changes locked text"
+
+
+def test_edits_that_keep_the_locked_facts_are_applied():
+    changes, rejected = resolve("In besonders schweren Fällen droht Freiheitsstrafe nicht unter einem Jahr.",
+                                "Bei einem besonders schweren Fall droht Freiheitsstrafe nicht unter einem Jahr.")
+
+    assert rejected == []
+    assert len(changes) == 1
@@ -0,0 +1,116 @@
+"""Keyword research fan-out against the SEMrush stub server"""
+import asyncio
+import time
+import pytest
+import generator
+from config import SEMRUSH_DATABASES, SEMRUSH_REPORTS
+from keyword_store import KeywordStore
+from semrush_cache import SemrushCache
+from tests.semrush_stub import SemrushStub
+
+TOPIC = "Strafen nach § 29 BtMG"
+SEEDS = ["Strafen nach § 29 BtMG", "§ 29 BtMG", "betäubungsmittelstrafrecht"]
+
+
+@pytest.fixture
+def stub(monkeypatch, tmp_path):
+    cache = SemrushCache(directory=str(tmp_path / "semrush"))
+    store = KeywordStore(str(tmp_path / "keywords.sqlite"))
+    with SemrushStub() as server:
+        monkeypatch.setattr(generator, "SEMRUSH_API_URL", server.url)
+        monkeypatch.setattr(generator, "get_semrush_cache", lambda: cache)
+        monkeypatch.setattr(generator, "get_keyword_store", lambda: store)
+        yield server
+
+
+def research(topic=TOPIC):
+    return asyncio.run(generator.expand_keywords_async(topic))
+
+
+def test_seeds_are_derived_from_topic_and_paragraph():
+    assert generator.derive_seeds(TOPIC) == SEEDS
+    assert generator.derive_seeds("Diebstahl") == ["Diebstahl"]
+
+
+def test_every_seed_report_and_database_is_requested_once(stub):
+    research()
+
+    expected = {(report, seed, database) for seed in SEEDS for report in SEMRUSH_REPORTS
+                for database in SEMRUSH_DATABASES}
+    assert sorted(stub.requests) == sorted(expected)
+
+
+def test_requests_run_concurrently(stub):
+    stub.delay = 0.2
+    started = time.monotonic()
+    research()
+    elapsed = time.monotonic() - started
+
+    assert len(stub.requests) == 27
+    # One request after the other would take 5.4s
+    assert elapsed < 3.0
+
+
+def test_results_are_merged_and_deduplicated(stub):
+    stub.reports.update({
+        ("phrase_related", "§ 29 BtMG", "de"): [("BtM Strafe", 100), ("btm besitz", 40)],
+        ("phrase_fullsearch", "§ 29 BtMG", "de"): [("btm  strafe", 80)],
+        ("phrase_related", "§ 29 BtMG", "at"): [("btm strafe", 30)],
+        ("phrase_questions", "betäubungsmittelstrafrecht", "ch"): [("BTM STRAFE", 5), ("btm besitz", 15)],
+    })
+
+    keywords = dict(research())
+
+    # Highest volume per database, summed over the databases; spelling of the first report wins
+    assert keywords["BtM Strafe"] == 100 + 30
+    assert keywords["btm besitz"] == 40 + 15
+    assert not {"btm  strafe", "btm strafe", "BTM STRAFE"} & keywords.keys()
+
+
+def test_results_are_sorted_by_volume(stub):
+    volumes = [volume for _, volume in research()]
+
+    assert volumes == sorted(volumes, reverse=True)
+
+
+def test_repeated_research_is_answered_without_requests(stub):
+    first = research()
+    stub.requests.clear()
+
+    assert research() == first
+    assert stub.requests == []
+
+
+def test_failed_requests_are_skipped_and_fetched_again(stub):
+    stub.errors["betäubungsmittelstrafrecht"] = "ERROR 120 :: WRONG KEY - ID PAIR"
+
+    keywords = dict(research())
+    assert "§ 29 btmg strafe" in keywords
+    assert not any(phrase.startswith("betäubungsmittelstrafrecht") for phrase in keywords)
+
+    del stub.errors["betäubungsmittelstrafrecht"]
+    stub.requests.clear()
+    keywords = dict(research())
+
+    assert {seed for _, seed, _ in stub.requests} == {"betäubungsmittelstrafrecht"}
+    assert "betäubungsmittelstrafrecht strafe" in keywords
+
+
+def test_keywords_of_unrelated_paragraphs_are_not_merged(stub):
+    research("§ 212 StGB Totschlag")
+
+    keywords = dict(research("§ 263 StGB Betrug"))
+
+    assert not any("totschlag" in phrase.lower() or "212" in phrase for phrase in keywords)
+
+
+def test_neighbour_keywords_naming_the_topic_are_merged(stub):
+    stub.reports[("phrase_related", "§ 29a BtMG Handel", "de")] = [
+        ("§ 29 btmg strafen handel", 70), ("handel unerlaubt", 50)]
+    research("§ 29a BtMG Handel")
+
+    keywords = dict(research())
+
+    # Neighbour "§ 29a BtMG": only rows with the topic's own words ("29", "strafen")
+    assert "§ 29 btmg strafen handel" in keywords
+    assert "handel unerlaubt" not in keywords
@@ -0,0 +1,130 @@
+"""Bulk mode against the fake Message Batches endpoint"""
+import asyncio
+import pytest
+import llm
+import message_batches
+from message_batches import BatchCollector, active_collector, request_id
+from tests.fake_batches import FakeBatchServer
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    with FakeBatchServer() as server:
+        monkeypatch.setenv("ANTHROPIC_BASE_URL", server.url)
+        yield server
+
+
+def params(prompt):
+    return {"model": "claude-test", "max_tokens": 100, "temperature": 0.2,
+            "messages": [{"role": "user", "content": prompt}]}
+
+
+def collector(tmp_path):
+    return BatchCollector(directory=str(tmp_path), flush_seconds=0.05, poll_seconds=0.01)
+
+
+def test_requests_of_a_quiet_moment_share_one_batch(fake, tmp_path):
+    async def run():
+        bulk = collector(tmp_path)
+        return await asyncio.gather(*[bulk.submit(params(f"Thema {i}")) for i in range(3)]), bulk
+
+    _, bulk = asyncio.run(run())
+
+    assert len(fake.batches) == 1
+    assert bulk.submitted == list(fake.batches)
+    (batch,) = fake.batches.values()
+    assert len(batch["requests"]) == 3
+
+
+def test_collector_polls_until_the_batch_has_ended(fake, tmp_path):
+    fake.polls = 4
+    asyncio.run(collector(tmp_path).submit(params("Thema")))
+
+    # Four polls, then results() looks up the results_url once more
+    assert fake.retrieves == 5
+
+
+def test_results_are_routed_to_their_waiting_requests(fake, tmp_path):
+    async def run():
+        bulk = collector(tmp_path)
+        return await asyncio.gather(bulk.submit(params("A")), bulk.submit(params("B")), bulk.submit(params("A")))
+
+    messages = asyncio.run(run())
+
+    assert [message.content[0].text for message in messages] == ["Antwort auf: A", "Antwort auf: B", "Antwort auf: A"]
+    # Identical requests are sent once
+    (batch,) = fake.batches.values()
+    assert len(batch["requests"]) == 2
+
+
+def test_errored_results_fail_only_their_request(fake, tmp_path):
+    def respond(request):
+        if request["messages"][0]["content"] == "kaputt":
+            raise ValueError("prompt is too long")
+        return "ok"
+    fake.respond = respond
+
+    async def run():
+        bulk = collector(tmp_path)
+        return await asyncio.gather(bulk.submit(params("kaputt")), bulk.submit(params("gut")),
+                                    return_exceptions=True)
+
+    failed, succeeded = asyncio.run(run())
+
+    assert isinstance(failed, RuntimeError) and "prompt is too long" in str(failed)
+    assert succeeded.content[0].text == "ok"
+
+
+def test_restarted_process_reattaches_to_the_saved_batch(fake, tmp_path):
+    fake.polls = 1000
+
+    async def interrupted():
+        bulk = collector(tmp_path)
+        task = asyncio.ensure_future(bulk.submit(params("Thema")))
+        while not bulk.submitted:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        for pending in list(bulk._tasks):
+            pending.cancel()
+
+    asyncio.run(interrupted())
+    (batch_id,) = fake.batches
+    fake.polls = 0
+
+    message = asyncio.run(collector(tmp_path).submit(params("Thema")))
+
+    assert message.content[0].text == "Antwort auf: Thema"
+    assert list(fake.batches) == [batch_id]
+    record = message_batches.read_json(str(tmp_path / f"{batch_id}.json"))
+    assert record["collected"] and record["custom_ids"] == [request_id(params("Thema"))]
+
+
+def test_llm_complete_goes_through_the_active_batch(fake, tmp_path):
+    async def run():
+        active_collector.set(collector(tmp_path))
+        return await asyncio.gather(
+            llm.complete("Gliederung", max_tokens=100, temperature=0.2, stage="outline", model="claude-test"),
+            llm.complete("Entwurf", max_tokens=100, temperature=0.2, stream=True, stage="draft", model="claude-test"),
+        )
+
+    assert asyncio.run(run()) == ["Antwort auf: Gliederung", "Antwort auf: Entwurf"]
+    assert len(fake.batches) == 1
+
+
+def test_failed_batch_fails_its_requests_without_a_readable_record(fake, tmp_path, monkeypatch):
+    fake.polls = 1000
+    bulk = collector(tmp_path)
+    # Record files read as missing or corrupt from here on
+    monkeypatch.setattr(message_batches, "read_json", lambda path, default=None: default)
+
+    async def run():
+        task = asyncio.ensure_future(bulk.submit(params("Thema")))
+        while not bulk.submitted:
+            await asyncio.sleep(0.01)
+        # The batch is gone on the server, polling fails with 404
+        fake.batches.clear()
+        return await asyncio.wait_for(task, timeout=5)
+
+    with pytest.raises(Exception) as failure:
+        asyncio.run(run())
+    assert not isinstance(failure.value, asyncio.TimeoutError)
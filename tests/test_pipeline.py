@@ -0,0 +1,113 @@
+"""Stage scheduling and checkpoints of partial results"""
+import asyncio
+import pytest
+import llm
+import main
+import model_routing
+import sections
+from checkpoints import RunCheckpoint
+from pipeline import Stage, mark_degraded, run_stages
+
+ARTICLE = "# Strafe\nText über die Strafe.\n# Verteidigung\nText über die Verteidigung.\n"
+
+
+def run(stages, checkpoint, values=None):
+    return asyncio.run(run_stages(stages, dict(values or {"topic": "BtMG"}), checkpoint=checkpoint))
+
+
+def test_degraded_stage_is_used_but_not_checkpointed(tmp_path):
+    calls = []
+
+    async def review(topic):
+        calls.append(topic)
+        if len(calls) == 1:
+            mark_degraded("Abschnitt ungeprüft")
+        return f"geprüft: {topic}"
+
+    async def seo(text):
+        return text.upper()
+
+    stages = [Stage("legal_review", review, ["topic"]), Stage("seo", seo, ["legal_review"])]
+    checkpoint = RunCheckpoint("run", str(tmp_path))
+    values = run(stages, checkpoint)
+
+    assert values["seo"] == "GEPRÜFT: BTMG"
+    assert checkpoint.degraded_stages == {"legal_review": ["Abschnitt ungeprüft"]}
+    assert checkpoint.finished_stages() == ["seo"]
+
+    # A resume repeats the stage, the complete result is checkpointed
+    checkpoint = RunCheckpoint("run", str(tmp_path))
+    run(stages, checkpoint)
+    assert len(calls) == 2
+    assert checkpoint.degraded_stages == {}
+    assert checkpoint.finished_stages() == ["legal_review", "seo"]
+
+
+def test_marks_stay_with_their_own_stage(tmp_path):
+    async def degraded(topic):
+        await asyncio.sleep(0.01)
+        mark_degraded("Fallback")
+        return "a"
+
+    async def complete(topic):
+        await asyncio.sleep(0.02)
+        return "b"
+
+    checkpoint = RunCheckpoint("run", str(tmp_path))
+    run([Stage("first", degraded, ["topic"]), Stage("second", complete, ["topic"])], checkpoint)
+
+    assert list(checkpoint.degraded_stages) == ["first"]
+    assert checkpoint.finished_stages() == ["second"]
+
+
+@pytest.fixture
+def failing_chunk(monkeypatch):
+    monkeypatch.setattr(main, "chunk_article", lambda text: sections.chunk_article(text, max_chars=30))
+
+    async def complete(prompt, **kwargs):
+        if "Verteidigung" in prompt:
+            raise RuntimeError("overloaded")
+        return "[]"
+    monkeypatch.setattr(llm, "complete", complete)
+
+
+def test_failed_chunk_keeps_original_and_skips_the_checkpoint(failing_chunk, tmp_path):
+    async def legal_review(text):
+        return await main.find_legal_errors_async(text, "BtMG", reference_info="")
+
+    checkpoint = RunCheckpoint("run", str(tmp_path))
+    values = run([Stage("legal_review", legal_review, ["draft"])], checkpoint, {"draft": ARTICLE})
+
+    assert values["legal_review"] == []
+    assert list(checkpoint.degraded_stages) == ["legal_review"]
+    assert checkpoint.finished_stages() == []
+
+
+@pytest.fixture
+def drafts(monkeypatch):
+    models = []
+
+    async def complete(prompt, stage=None, **kwargs):
+        models.append(model_routing.model_for_stage(stage))
+        return f"# Strafe\nEntwurf von {models[-1]}."
+    monkeypatch.setattr(llm, "complete", complete)
+    return models
+
+
+def generate(model, run_id):
+    events = []
+    values = asyncio.run(main.generate_article("BtMG", outline="# Strafe", profile="draft-only", model=model,
+                                               run_id=run_id, on_event=lambda *event: events.append(event[:2])))
+    return values, events
+
+
+def test_rerun_with_another_model_does_not_restore(drafts):
+    generate("claude-a", "model-run")
+    values, events = generate("claude-a", "model-run")
+    assert ("draft", "restored") in events
+    assert drafts == ["claude-a"]
+
+    values, events = generate("claude-b", "model-run")
+    assert ("draft", "restored") not in events
+    assert drafts == ["claude-a", "claude-b"]
+    assert values["article"].endswith("Entwurf von claude-b.")
@@ -0,0 +1,64 @@
+"""
+Token Budget
+Output limits sized from what a request has to produce instead of fixed
+ceilings: a draft from its target word count, a rewrite from the length of
+the text it re-emits. Prompt sizes are estimated locally (see
+rate_limiter.estimate_tokens), and a request whose prompt plus output limit
+does not fit the context window is rejected with TokenBudgetExceeded before
+it is sent.
+"""
+from rate_limiter import estimate_tokens
+
+CONTEXT_WINDOW = 200000
+
+# Output ceiling of the current models
+MAX_OUTPUT_TOKENS = 32000
+
+# German legal prose averages about two tokens per word
+TOKENS_PER_WORD = 2
+
+# Margin over the expected output, models overshoot length targets
+HEADROOM = 1.3
+
+MIN_OUTPUT_TOKENS = 1000
+
+
+class TokenBudgetExceeded(ValueError):
+    """Prompt plus output limit do not fit the context window"""
+
+
+def _cap(tokens):
+    return min(MAX_OUTPUT_TOKENS, max(MIN_OUTPUT_TOKENS, int(tokens)))
+
+
+def for_tokens(tokens, ratio=1.0):
+    """Output limit for producing about tokens * ratio tokens"""
+    return _cap(tokens * ratio * HEADROOM)
+
+
+def for_words(words):
+    """Output limit for writing about this many words"""
+    return for_tokens(words * TOKENS_PER_WORD)
+
+
+def for_rewrite(text, ratio=1.0):
+    """Output limit for re-emitting a text, ratio > 1 when the rewrite adds material"""
+    return for_tokens(estimate_tokens(text), ratio)
+
+
+def prompt_tokens(prompt, system=None):
+    return estimate_tokens((system or "") + prompt)
+
+
+def check(input_tokens, max_tokens, stage="default"):
+    """
+    Raise TokenBudgetExceeded if a request cannot fit the context window
+
+    Args:
+        input_tokens: Estimated prompt size (see prompt_tokens)
+        max_tokens: Output limit of the request
+    """
+    if input_tokens + max_tokens > CONTEXT_WINDOW:
+        raise TokenBudgetExceeded(
+            f"{stage}: prompt of about {input_tokens:,} tokens plus {max_tokens:,} output tokens "
+            f"exceeds the context window of {CONTEXT_WINDOW:,}")